@@ -0,0 +1,364 @@
+"""
+Асинхронные версии обработчиков каталога (FURNITURE_DB_MODE=async).
+
+Роутер подключается к приложению раньше синхронных маршрутов из main.py и
+перекрывает их по пути и методу; ответы совпадают с синхронным режимом.
+Запросы и расчёты общие — crud, cache, calc, versions.
+"""
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from .database import get_async_db, get_async_write_db
+from . import cache, calc, changes, config, costs, crud, models, scheduler, schemas, search, serialize, snapshot, sweep, versions, workload
+
+# схема OpenAPI строится по синхронным маршрутам с теми же параметрами
+router = APIRouter(include_in_schema=False)
+
+
+async def _get_product(db: AsyncSession, product_id: int) -> Optional[schemas.ProductOut]:
+    row = (await db.execute(crud.product_select(product_id))).first()
+    return crud.product_out(row) if row else None
+
+
+async def _find_product(db: AsyncSession, product_id: int) -> Optional[models.Product]:
+    return await db.scalar(select(models.Product).where(models.Product.product_id == product_id))
+
+
+async def _article_taken(db: AsyncSession, article: int, product_id: Optional[int] = None) -> bool:
+    stmt = select(models.Product.product_id).where(models.Product.article == article)
+    if product_id is not None:
+        stmt = stmt.where(models.Product.product_id != product_id)
+    return (await db.scalar(stmt.limit(1))) is not None
+
+
+@router.get("/products", response_model=List[schemas.ProductOut])
+async def get_products(
+    request: Request,
+    response: Response,
+    product_type_name: Optional[str] = None,
+    main_material_name: Optional[str] = None,
+    min_cost: Optional[float] = None,
+    max_cost: Optional[float] = None,
+    article_prefix: Optional[str] = Query(None, max_length=crud.ARTICLE_MAX_DIGITS),
+    sort: str = "product_id",
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    known = await versions.acurrent(db)
+    cached = versions.conditional(request, response, versions.make_etag(known, "Products", "ProductWorkshops"))
+    if cached:
+        return cached
+    selected = serialize.parse_fields(fields, serialize.PRODUCT_FIELDS)
+    filters = dict(
+        product_type_name=product_type_name,
+        main_material_name=main_material_name,
+        min_cost=min_cost,
+        max_cost=max_cost,
+        article_prefix=article_prefix,
+        sort=sort,
+        order=order,
+        limit=limit,
+        cursor=cursor,
+    )
+    snap = snapshot.get(known)
+    if snap is not None:
+        records, next_cursor = snap.products_page(selected, **filters)
+    else:
+        stmt = crud.products_page_select(with_time="total_production_time" in selected, **filters)
+        rows, next_cursor = crud.products_page((await db.execute(stmt)).all(), sort, order, limit)
+        records = serialize.product_records(rows, selected)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return serialize.json_response(records, response)
+
+
+@router.get("/products/search", response_model=List[schemas.ProductSearchOut])
+async def search_products(
+    q: str = Query(..., max_length=200), limit: int = Query(10, ge=1, le=100), db: AsyncSession = Depends(get_async_db)
+):
+    rows = []
+    for query in search.match_queries(q):
+        rows = (await db.execute(search.SEARCH_SQL, {"query": query})).all()
+        if len(rows) >= limit:
+            break
+    return search.rows_out(search.rank(rows, q, limit))
+
+
+@router.get("/products/{product_id}", response_model=schemas.ProductOut)
+async def get_product(product_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    cached = await versions.anot_modified(request, response, db, "Products", "ProductWorkshops")
+    if cached:
+        return cached
+    product = await _get_product(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+
+@router.post("/products", response_model=schemas.ProductOut)
+async def create_product(product_in: schemas.ProductCreate, db: AsyncSession = Depends(get_async_write_db)):
+    if await _article_taken(db, product_in.article):
+        raise HTTPException(status_code=400, detail="Артикул уже существует")
+
+    product = models.Product(
+        product_name=product_in.product_name,
+        article=product_in.article,
+        min_partner_cost=float(product_in.min_partner_cost),
+        product_type_name=product_in.product_type_name,
+        main_material_name=product_in.main_material_name,
+    )
+    db.add(product)
+    await versions.abump(db, "Products")
+    await db.commit()
+    await snapshot.aafter_write(db, product.product_id, "Products")
+    return await _get_product(db, product.product_id)
+
+
+@router.put("/products/{product_id}", response_model=schemas.ProductOut)
+async def update_product(product_id: int, product_in: schemas.ProductUpdate, db: AsyncSession = Depends(get_async_write_db)):
+    product = await _find_product(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if await _article_taken(db, product_in.article, product_id):
+        raise HTTPException(status_code=400, detail="Артикул уже существует")
+
+    product.product_name = product_in.product_name
+    product.article = product_in.article
+    product.min_partner_cost = float(product_in.min_partner_cost)
+    product.product_type_name = product_in.product_type_name
+    product.main_material_name = product_in.main_material_name
+
+    await versions.abump(db, "Products")
+    await db.commit()
+    await snapshot.aafter_write(db, product_id, "Products")
+    return await _get_product(db, product_id)
+
+
+@router.delete("/products/{product_id}")
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_write_db)):
+    product = await _find_product(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    # маршруты удаляются явно: ленивой загрузки product.workshops в async нет
+    await db.execute(delete(models.ProductWorkshop).where(models.ProductWorkshop.product_name == product.product_name))
+    await db.delete(product)
+    await versions.abump(db, "Products", "ProductWorkshops")
+    await db.commit()
+    await snapshot.aafter_write(db, product_id, "Products", "ProductWorkshops")
+    return {"detail": "Product deleted"}
+
+
+@router.get("/costs", response_model=List[schemas.ProductCostOut])
+async def get_costs(request: Request, response: Response, hourly_rate: Optional[float] = Query(None, gt=0)):
+    rollup = await costs.acurrent()
+    rate = config.LABOR_RATE if hourly_rate is None else hourly_rate
+    cached = versions.conditional(request, response, costs.etag(rollup, rate))
+    if cached:
+        return cached
+    return serialize.json_response(await run_in_threadpool(costs.records, rollup, rate), response)
+
+
+@router.get("/products/{product_id}/cost", response_model=schemas.ProductCostOut)
+async def get_product_cost(
+    product_id: int, request: Request, response: Response, hourly_rate: Optional[float] = Query(None, gt=0)
+):
+    rollup = await costs.acurrent()
+    rate = config.LABOR_RATE if hourly_rate is None else hourly_rate
+    cached = versions.conditional(request, response, costs.etag(rollup, rate))
+    if cached:
+        return cached
+    record = costs.record(rollup, product_id, rate)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return record
+
+
+@router.get("/changes", response_model=schemas.ProductChangesOut)
+async def get_changes(since: Optional[int] = Query(None, ge=0), db: AsyncSession = Depends(get_async_db)):
+    return await changes.aread(db, since)
+
+
+@router.get("/products/{product_id}/workshops", response_model=List[schemas.WorkshopOut])
+async def get_product_workshops(
+    product_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)
+):
+    known = await versions.acurrent(db)
+    cached = versions.conditional(
+        request, response, versions.make_etag(known, "Products", "ProductWorkshops", "Workshops")
+    )
+    if cached:
+        return cached
+    snap = snapshot.get(known)
+    if snap is not None:
+        workshops = snap.workshops_of(product_id)
+        if workshops is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return serialize.json_response(workshops, response)
+    product = await _find_product(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    rows = await db.execute(crud.product_workshops_select(product.product_name))
+    return crud.workshops_out(rows)
+
+
+@router.get("/products/{product_id}/production_time")
+async def get_production_time(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    snap = snapshot.get(await versions.acurrent(db)) if config.SNAPSHOT else None
+    if snap is not None:
+        total = snap.production_time(product_id)
+    else:
+        product = await _get_product(db, product_id)
+        total = product.total_production_time if product else None
+    if total is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return {"product_id": product_id, "total_production_time": total}
+
+
+@router.get("/product-types", response_model=List[schemas.ProductTypeOut])
+async def get_product_types(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    cached = await versions.anot_modified(request, response, db, "ProductTypes")
+    if cached:
+        return cached
+    return [schemas.ProductTypeOut(product_type_name=name) for name, _ in await cache.aproduct_types(db)]
+
+
+@router.get("/materials", response_model=List[schemas.MaterialOut])
+async def get_materials(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    cached = await versions.anot_modified(request, response, db, "Materials")
+    if cached:
+        return cached
+    return [schemas.MaterialOut(material_name=name) for name, _ in await cache.amaterials(db)]
+
+
+@router.get("/all-product-types", response_model=List[schemas.ProductTypeFullOut])
+async def get_all_product_types(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    cached = await versions.anot_modified(request, response, db, "ProductTypes")
+    if cached:
+        return cached
+    return [
+        schemas.ProductTypeFullOut(product_type_name=name, type_coefficient=coef)
+        for name, coef in await cache.aproduct_types(db)
+    ]
+
+
+@router.get("/all-materials", response_model=List[schemas.MaterialFullOut])
+async def get_all_materials(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    cached = await versions.anot_modified(request, response, db, "Materials")
+    if cached:
+        return cached
+    return [
+        schemas.MaterialFullOut(material_name=name, loss_percentage=loss) for name, loss in await cache.amaterials(db)
+    ]
+
+
+@router.get("/all-workshops", response_model=List[schemas.WorkshopFullOut])
+async def get_all_workshops(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    cached = await versions.anot_modified(request, response, db, "Workshops")
+    if cached:
+        return cached
+    return [
+        schemas.WorkshopFullOut(workshop_name=name, workshop_type=w_type, num_employees=employees)
+        for name, w_type, employees in await cache.aworkshops(db)
+    ]
+
+
+@router.get("/all-product-workshops", response_model=List[schemas.ProductWorkshopOut])
+async def get_all_product_workshops(
+    request: Request, response: Response, fields: Optional[str] = None, db: AsyncSession = Depends(get_async_db)
+):
+    cached = await versions.anot_modified(request, response, db, "ProductWorkshops")
+    if cached:
+        return cached
+    selected = serialize.parse_fields(fields, serialize.PRODUCT_WORKSHOP_FIELDS)
+    rows = (await db.execute(crud.PRODUCT_WORKSHOPS_SELECT)).all()
+    return serialize.json_response(serialize.records(rows, selected), response)
+
+
+@router.get("/product-workshops/{product_id}", response_model=List[schemas.ProductWorkshopOut])
+async def get_product_workshops_by_id(
+    product_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)
+):
+    known = await versions.acurrent(db)
+    cached = versions.conditional(request, response, versions.make_etag(known, "Products", "ProductWorkshops"))
+    if cached:
+        return cached
+    snap = snapshot.get(known)
+    if snap is not None:
+        routes = snap.routes_of(product_id)
+        if routes is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return serialize.json_response(routes, response)
+    product = await _find_product(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    rows = await db.execute(
+        crud.PRODUCT_WORKSHOPS_SELECT.where(models.ProductWorkshop.product_name == product.product_name)
+    )
+    return [
+        schemas.ProductWorkshopOut(product_name=name, workshop_name=workshop, coefficient=coef)
+        for name, workshop, coef in rows
+    ]
+
+
+@router.post("/calculate_raw_material", response_model=schemas.RawMaterialResponse)
+async def calculate_raw_material(req: schemas.RawMaterialRequest, db: AsyncSession = Depends(get_async_db)):
+    type_coefficient = (await cache.atype_coefficients(db)).get(req.product_type_name)
+    loss_percentage = (await cache.aloss_percentages(db)).get(req.material_name)
+    if type_coefficient is None or loss_percentage is None:
+        return schemas.RawMaterialResponse(required_raw_material=-1)
+
+    base_per_unit = req.param1 * req.param2 * type_coefficient
+    total_base = base_per_unit * req.quantity
+    loss_coeff = 1 + loss_percentage / 100.0
+    total_with_loss = total_base * loss_coeff
+    required_raw = int(round(max(total_with_loss, 0)))
+    return schemas.RawMaterialResponse(required_raw_material=required_raw)
+
+
+@router.post("/calculate_raw_material/batch", response_model=List[schemas.RawMaterialResponse])
+async def calculate_raw_material_batch(lines: List[schemas.RawMaterialRequest], db: AsyncSession = Depends(get_async_db)):
+    results = calc.raw_material_batch(lines, await cache.atype_coefficients(db), await cache.aloss_percentages(db))
+    return [schemas.RawMaterialResponse(required_raw_material=r) for r in results]
+
+
+@router.post("/calculate_raw_material/sweep", response_model=schemas.RawMaterialSweepResponse)
+async def calculate_raw_material_sweep(req: schemas.RawMaterialSweepRequest, db: AsyncSession = Depends(get_async_db)):
+    g = sweep.grid(req, await cache.atype_coefficients(db), await cache.aloss_percentages(db))
+    # небольшая сетка считается целиком — в пуле потоков, большую StreamingResponse
+    # и так перебирает там же
+    return await run_in_threadpool(sweep.response, g)
+
+
+@router.post("/schedule", response_model=schemas.ScheduleResponse)
+async def schedule_orders(req: schemas.ScheduleRequest, db: AsyncSession = Depends(get_async_db)):
+    routes = await scheduler.aload_routes(db, {o.product_id for o in req.orders})
+    # расчёт — чистый CPU, в цикле событий он задержал бы остальные запросы
+    return scheduler.render(await run_in_threadpool(scheduler.schedule, req, routes))
+
+
+@router.post("/workload", response_model=schemas.WorkloadResponse)
+async def get_workload(req: schemas.WorkloadRequest, db: AsyncSession = Depends(get_async_db)):
+    products, quantities = workload.product_quantities(req.orders)
+    rows = (await db.execute(crud.workload_select(products, quantities))).all()
+    return workload.workload(rows, req.horizon_hours)
+
+
+@router.post("/mrp", response_model=schemas.MRPResponse)
+async def material_requirements(req: schemas.MRPRequest, db: AsyncSession = Depends(get_async_db)):
+    orders = calc.order_arrays(req.orders)
+    known = dict((await db.execute(versions.VERSIONS_SELECT)).all())
+    key = calc.order_key(orders) + versions.make_etag(known, "ProductTypes", "Materials", "Products")
+    products = calc.order_products(orders)
+
+    async def load():
+        return calc.material_requirements(orders, (await db.execute(crud.material_select(products))).all())
+
+    return await cache.mrp_cache.aget_or_load(key, load)
@@ -0,0 +1,243 @@
+"""
+Кэш справочников в памяти процесса.
+
+ProductTypes, Materials и Workshops маленькие и почти не меняются, поэтому
+читаются из БД один раз на TTL. Любой коммит сессии, затронувший эти таблицы,
+сбрасывает кэш сразу; внешние писатели (импорт) вызывают invalidate() сами.
+
+Записи других процессов (воркеры run.py --prod, create_bd.py) ловит
+ChangeWatcher: не чаще CACHE_COHERENCE_INTERVAL он читает PRAGMA data_version
+на собственном соединении — число меняется после чужого коммита — и тогда
+сверяет версии справочников в DataVersions. Проверка — микросекунды, без
+обращения к диску, пока база не менялась.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import config, models
+
+REFERENCE_MODELS = (models.ProductType, models.Material, models.Workshop)
+REFERENCE_TABLES = tuple(m.__tablename__ for m in REFERENCE_MODELS)
+
+
+class ChangeWatcher:
+    """Следит за коммитами других соединений и сбрасывает кэш, если сменилась
+    версия одной из tables."""
+
+    def __init__(self, database: str, tables: Tuple[str, ...], interval: float):
+        self.database = database
+        self.tables = tables
+        self.interval = interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._checked = 0.0
+        self._data_version: Optional[int] = None
+        self._versions: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+
+    def _read_versions(self) -> Dict[str, int]:
+        placeholders = ", ".join("?" * len(self.tables))
+        rows = self._conn.execute(
+            f"SELECT table_name, version FROM DataVersions WHERE table_name IN ({placeholders})", self.tables
+        ).fetchall()
+        return dict(rows)
+
+    def changed(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked < self.interval:
+            return False
+        # проверку делает один поток, остальные не ждут: кэш проверят следующим
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._checked = now
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.database, check_same_thread=False, isolation_level=None)
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return False
+            self._data_version = data_version
+            versions = self._read_versions()
+            previous, self._versions = self._versions, versions
+            return previous is not None and versions != previous
+        except sqlite3.Error:
+            # база ещё не создана или занята: сверим в следующий раз
+            return False
+        finally:
+            self._lock.release()
+
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int, watcher: Optional[ChangeWatcher] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.watcher = watcher
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def _lookup(self, key: str):
+        if self.watcher is not None and self.watcher.changed():
+            self.invalidate()
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, item[1]
+            self.misses += 1
+            return False, self._generation
+
+    def _store(self, key: str, value, generation: int) -> None:
+        with self._lock:
+            # если за время загрузки кэш сбросили, значение могло устареть
+            if generation == self._generation:
+                self._data[key] = (time.monotonic() + self.ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def get_or_load(self, key: str, loader: Callable[[], object]):
+        found, value = self._lookup(key)
+        if found:
+            return value
+        generation = value
+        value = loader()
+        self._store(key, value, generation)
+        return value
+
+    async def aget_or_load(self, key: str, loader: Callable[[], Awaitable[object]]):
+        found, value = self._lookup(key)
+        if found:
+            return value
+        generation = value
+        value = await loader()
+        self._store(key, value, generation)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+
+_database = make_url(config.DATABASE_URL).database
+reference_cache = TTLCache(
+    config.REFERENCE_CACHE_TTL,
+    config.REFERENCE_CACHE_MAXSIZE,
+    ChangeWatcher(_database, REFERENCE_TABLES, config.CACHE_COHERENCE_INTERVAL) if _database else None,
+)
+# итоги /mrp; ключ — отпечаток заказа и версии таблиц, сбрасывать не нужно
+mrp_cache = TTLCache(config.MRP_CACHE_TTL, config.MRP_CACHE_MAXSIZE)
+
+
+def invalidate() -> None:
+    reference_cache.invalidate()
+
+
+PRODUCT_TYPES_SELECT = select(models.ProductType.product_type_name, models.ProductType.type_coefficient)
+MATERIALS_SELECT = select(models.Material.material_name, models.Material.loss_percentage)
+WORKSHOPS_SELECT = select(
+    models.Workshop.workshop_name, models.Workshop.workshop_type, models.Workshop.num_employees
+)
+
+
+def _rows(result) -> tuple:
+    return tuple(tuple(row) for row in result)
+
+
+async def _arows(db: AsyncSession, stmt) -> tuple:
+    return _rows(await db.execute(stmt))
+
+
+def product_types(db: Session) -> Tuple[Tuple[str, float], ...]:
+    return reference_cache.get_or_load("product_types", lambda: _rows(db.execute(PRODUCT_TYPES_SELECT)))
+
+
+def materials(db: Session) -> Tuple[Tuple[str, float], ...]:
+    return reference_cache.get_or_load("materials", lambda: _rows(db.execute(MATERIALS_SELECT)))
+
+
+def workshops(db: Session) -> Tuple[Tuple[str, str, int], ...]:
+    return reference_cache.get_or_load("workshops", lambda: _rows(db.execute(WORKSHOPS_SELECT)))
+
+
+def type_coefficients(db: Session) -> Dict[str, float]:
+    return reference_cache.get_or_load("type_coefficients", lambda: dict(product_types(db)))
+
+
+def loss_percentages(db: Session) -> Dict[str, float]:
+    return reference_cache.get_or_load("loss_percentages", lambda: dict(materials(db)))
+
+
+async def aproduct_types(db: AsyncSession) -> Tuple[Tuple[str, float], ...]:
+    return await reference_cache.aget_or_load("product_types", lambda: _arows(db, PRODUCT_TYPES_SELECT))
+
+
+async def amaterials(db: AsyncSession) -> Tuple[Tuple[str, float], ...]:
+    return await reference_cache.aget_or_load("materials", lambda: _arows(db, MATERIALS_SELECT))
+
+
+async def aworkshops(db: AsyncSession) -> Tuple[Tuple[str, str, int], ...]:
+    return await reference_cache.aget_or_load("workshops", lambda: _arows(db, WORKSHOPS_SELECT))
+
+
+async def atype_coefficients(db: AsyncSession) -> Dict[str, float]:
+    async def load():
+        return dict(await aproduct_types(db))
+
+    return await reference_cache.aget_or_load("type_coefficients", load)
+
+
+async def aloss_percentages(db: AsyncSession) -> Dict[str, float]:
+    async def load():
+        return dict(await amaterials(db))
+
+    return await reference_cache.aget_or_load("loss_percentages", load)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_reference_writes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, REFERENCE_MODELS):
+            session.info["reference_dirty"] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_reference_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, REFERENCE_MODELS):
+            orm_execute_state.session.info["reference_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("reference_dirty", False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_reference_writes(session):
+    session.info.pop("reference_dirty", None)
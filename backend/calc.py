@@ -0,0 +1,152 @@
+"""
+Векторные расчёты сырья на NumPy.
+
+Порядок операций повторяет /calculate_raw_material:
+param1 * param2 * коэффициент типа -> * количество -> * (1 + потери / 100),
+затем отрицательные значения обнуляются и округляются как round()
+(к ближайшему чётному), поэтому результаты совпадают со скалярным расчётом бит в бит.
+
+/mrp считает так же каждую строку портфеля заказов (тип и материал берутся
+из карточки продукта) и складывает строки по основному материалу.
+
+numpy импортируется в функциях: приложение стартует без него, модуль
+загружается при первом расчёте.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING, Dict, List, Sequence
+
+from fastapi import HTTPException
+
+from . import schemas
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+ORDER_COLUMNS = ("product_id", "quantity", "param1", "param2")
+
+NOT_FOUND = -1
+
+
+def raw_material(
+    quantity: np.ndarray,
+    param1: np.ndarray,
+    param2: np.ndarray,
+    type_coefficient: np.ndarray,
+    loss_percentage: np.ndarray,
+) -> np.ndarray:
+    import numpy as np
+
+    base_per_unit = param1 * param2 * type_coefficient
+    total_base = base_per_unit * quantity
+    loss_coeff = 1 + loss_percentage / 100.0
+    total_with_loss = total_base * loss_coeff
+    return np.rint(np.maximum(total_with_loss, 0))
+
+
+def raw_material_batch(
+    lines: Sequence[schemas.RawMaterialRequest],
+    type_coefficients: Dict[str, float],
+    loss_percentages: Dict[str, float],
+) -> List[int]:
+    import numpy as np
+
+    n = len(lines)
+    if not n:
+        return []
+    # float(int) даёт то же значение, что и неявное приведение в скалярном расчёте
+    quantity = np.fromiter((float(line.quantity) for line in lines), dtype=np.float64, count=n)
+    param1 = np.fromiter((line.param1 for line in lines), dtype=np.float64, count=n)
+    param2 = np.fromiter((line.param2 for line in lines), dtype=np.float64, count=n)
+    coef = np.fromiter(
+        (type_coefficients.get(line.product_type_name, np.nan) for line in lines), dtype=np.float64, count=n
+    )
+    loss = np.fromiter(
+        (loss_percentages.get(line.material_name, np.nan) for line in lines), dtype=np.float64, count=n
+    )
+    found = ~(np.isnan(coef) | np.isnan(loss))
+
+    result = np.full(n, NOT_FOUND, dtype=object)
+    values = raw_material(quantity[found], param1[found], param2[found], coef[found], loss[found])
+    result[found] = [int(v) for v in values]
+    return result.tolist()
+
+
+def order_arrays(lines: Sequence[schemas.MRPLine]) -> Dict[str, np.ndarray]:
+    import numpy as np
+
+    n = len(lines)
+    return {
+        "product_id": np.fromiter((line.product_id for line in lines), dtype=np.int64, count=n),
+        "quantity": np.fromiter((float(line.quantity) for line in lines), dtype=np.float64, count=n),
+        "param1": np.fromiter((line.param1 for line in lines), dtype=np.float64, count=n),
+        "param2": np.fromiter((line.param2 for line in lines), dtype=np.float64, count=n),
+    }
+
+
+def order_products(orders: Dict[str, np.ndarray]) -> List[int]:
+    import numpy as np
+
+    return np.unique(orders["product_id"]).tolist()
+
+
+def order_key(orders: Dict[str, np.ndarray]) -> str:
+    """Отпечаток портфеля: одинаковые строки в том же порядке дают тот же ключ."""
+    digest = hashlib.sha256()
+    for column in ORDER_COLUMNS:
+        digest.update(orders[column].tobytes())
+    return digest.hexdigest()
+
+
+def material_requirements(orders: Dict[str, np.ndarray], rows: Sequence[tuple]) -> schemas.MRPResponse:
+    """rows — строки crud.material_select по уникальным product_id заказа."""
+    import numpy as np
+
+    known = np.array([r[0] for r in rows], dtype=np.int64)
+    missing = np.setdiff1d(orders["product_id"], known)
+    if len(missing):
+        raise HTTPException(status_code=404, detail=f"Продукты не найдены: {missing[:20].tolist()}")
+
+    names = sorted({r[1] for r in rows if r[1] is not None})
+    code = {name: i for i, name in enumerate(names)}
+    material = np.array([code.get(r[1], -1) for r in rows], dtype=np.int64)
+    coefficient = np.array([np.nan if r[2] is None else r[2] for r in rows], dtype=np.float64)
+    loss = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=np.float64)
+    resolved = ~(np.isnan(coefficient) | np.isnan(loss))
+
+    # строка заказа -> позиция её продукта в rows (rows отсортированы по product_id)
+    pos = np.searchsorted(known, orders["product_id"])
+    line_resolved = resolved[pos]
+    unresolved = np.unique(orders["product_id"][~line_resolved])
+    pos = pos[line_resolved]
+    quantity = orders["quantity"][line_resolved]
+    param1 = orders["param1"][line_resolved]
+    param2 = orders["param2"][line_resolved]
+
+    net = param1 * param2 * coefficient[pos] * quantity
+    required = raw_material(quantity, param1, param2, coefficient[pos], loss[pos])
+    by_material = material[pos]
+    count = len(names)
+    net_total = np.bincount(by_material, weights=net, minlength=count)
+    required_total = np.bincount(by_material, weights=required, minlength=count)
+    lines = np.bincount(by_material, minlength=count)
+
+    losses = dict((r[1], r[3]) for r in rows if r[1] is not None)
+    materials = [
+        schemas.MaterialDemand(
+            material_name=name,
+            loss_percentage=losses[name],
+            lines=int(lines[i]),
+            net_quantity=round(float(net_total[i]), 4),
+            required_raw_material=int(required_total[i]),
+        )
+        for i, name in enumerate(names)
+        if lines[i]
+    ]
+    return schemas.MRPResponse(
+        materials=materials,
+        total_raw_material=int(required_total.sum()),
+        unresolved_products=unresolved.tolist(),
+    )
@@ -0,0 +1,184 @@
+"""
+Журнал изменений продукции: GET /changes?since=seq и поток GET /changes/stream.
+
+Таблицу ProductChanges пополняют триггеры на Products и ProductWorkshops
+(backend/migrations.py), поэтому в журнал попадает любая запись — обработчики
+API, /import/*, create_bd.py --incremental. Полная перезаливка оставляет одну
+запись сброса. Клиент держит у себя список продукции и номер seq, а вместо
+повторной загрузки /products спрашивает изменения после seq: в ответе текущие
+строки изменённых продуктов (по одной на продукт, сколько бы раз он ни
+менялся) и id удалённых — объём ответа по числу изменений, а не по размеру
+каталога.
+
+reset=true — журнал не покрывает since: since не передан, старые записи уже
+вытеснены, была перезаливка или изменений больше CHANGES_MAX. Тогда клиент
+перечитывает /products и продолжает с seq из ответа.
+
+Поток — Server-Sent Events: событие changes с тем же JSON, id события — seq,
+поэтому EventSource после обрыва продолжает с Last-Event-ID. Новые записи
+потоки замечают через общий LatestWatcher по PRAGMA data_version (как
+ChangeWatcher в cache.py): пока база не менялась, опрос не читает таблиц, а
+сама проверка идёт в пуле потоков и не останавливает цикл событий.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import AsyncIterator, Optional, Sequence, Tuple, Union
+
+from fastapi import Request
+from pydantic_core import to_json
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import config, crud, database, models, serialize
+
+LATEST_SQL = "SELECT coalesce(max(seq), 0) FROM ProductChanges"
+
+BOUNDS_SELECT = select(func.coalesce(func.max(models.ProductChange.seq), 0), func.min(models.ProductChange.seq))
+
+
+def changed_select(since: int, latest: int):
+    # на один больше предела: так видно, что изменений слишком много
+    return (
+        select(models.ProductChange.product_id)
+        .where(models.ProductChange.seq > since, models.ProductChange.seq <= latest)
+        .distinct()
+        .limit(config.CHANGES_MAX + 1)
+    )
+
+
+def _reset(since: Optional[int], latest: int, oldest: Optional[int]) -> bool:
+    if since is None or since > latest:
+        return True
+    # записи после since уже вытеснены из журнала
+    return since < (oldest if oldest is not None else latest + 1) - 1
+
+
+def _changed(since: Optional[int], latest: int, oldest: Optional[int], ids: Sequence) -> Tuple[bool, list]:
+    if _reset(since, latest, oldest) or None in ids or len(ids) > config.CHANGES_MAX:
+        return True, []
+    return False, sorted(ids)
+
+
+def _response(latest: int, reset: bool, ids: list, rows: Sequence) -> dict:
+    products = serialize.product_records(rows, serialize.PRODUCT_FIELDS)
+    found = {row.product_id for row in rows}
+    return {
+        "seq": latest,
+        "reset": reset,
+        "products": products,
+        "deleted": [pid for pid in ids if pid not in found],
+    }
+
+
+def _products_select(ids: list):
+    return crud.products_select().where(models.Product.product_id.in_(ids)).order_by(models.Product.product_id)
+
+
+def changed_ids(db: Union[Session, Connection], since: Optional[int]) -> Tuple[int, Optional[list]]:
+    """Последний seq и product_id, изменённые после since; None вместо списка —
+    журнал since не покрывает (reset)."""
+    # сначала граница журнала, затем записи до неё: изменения, пришедшие
+    # между запросами, уйдут в следующий ответ, а не потеряются
+    latest, oldest = db.execute(BOUNDS_SELECT).one()
+    ids = [] if _reset(since, latest, oldest) else db.execute(changed_select(since, latest)).scalars().all()
+    reset, ids = _changed(since, latest, oldest, ids)
+    return latest, None if reset else ids
+
+
+def read(db: Session, since: Optional[int]) -> dict:
+    latest, ids = changed_ids(db, since)
+    rows = db.execute(_products_select(ids)).all() if ids else []
+    return _response(latest, ids is None, ids or [], rows)
+
+
+async def aread(db: AsyncSession, since: Optional[int]) -> dict:
+    latest, oldest = (await db.execute(BOUNDS_SELECT)).one()
+    ids = [] if _reset(since, latest, oldest) else (await db.execute(changed_select(since, latest))).scalars().all()
+    reset, ids = _changed(since, latest, oldest, ids)
+    rows = (await db.execute(_products_select(ids))).all() if ids else []
+    return _response(latest, reset, ids, rows)
+
+
+class LatestWatcher:
+    """Номер последнего изменения, общий для всех потоков /changes/stream:
+    база проверяется не чаще раза в interval с, журнал перечитывается, только
+    если после прошлой проверки в неё кто-то писал (PRAGMA data_version)."""
+
+    def __init__(self, database: Optional[str], interval: float):
+        self.database = database
+        self.interval = interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._checked = 0.0
+        self._data_version: Optional[int] = None
+        self._latest: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def latest(self) -> Optional[int]:
+        """None — номер неизвестен (база в памяти или недоступна), читать журнал.
+        Обращается к базе — из цикла событий вызывается через run_in_threadpool."""
+        if not self.database:
+            return None
+        if time.monotonic() - self._checked < self.interval:
+            return self._latest
+        # проверку делает один поток, остальные не ждут и берут прошлый номер
+        if not self._lock.acquire(blocking=False):
+            return self._latest
+        try:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.database, check_same_thread=False, isolation_level=None)
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                latest = self._conn.execute(LATEST_SQL).fetchone()[0]
+                self._data_version, self._latest = data_version, latest
+            self._checked = time.monotonic()
+            return self._latest
+        except sqlite3.Error:
+            return None
+        finally:
+            self._lock.release()
+
+
+# один на процесс: сколько бы ни было потоков, база проверяется раз за интервал
+watcher = LatestWatcher(make_url(config.DATABASE_URL).database, config.CHANGES_POLL_INTERVAL)
+
+
+async def _read_fresh(since: Optional[int]) -> dict:
+    # короткая сессия на каждое чтение: поток живёт долго и не должен занимать
+    # соединение пула между событиями
+    async with database.read_slots:
+        if config.DB_MODE == "async":
+            async with database.AsyncSessionLocal() as db:
+                return await aread(db, since)
+
+        def run() -> dict:
+            with database.SessionLocal() as db:
+                return read(db, since)
+
+        return await run_in_threadpool(run)
+
+
+def _event(delta: dict) -> bytes:
+    return b"id: %d\nevent: changes\ndata: %s\n\n" % (delta["seq"], to_json(delta))
+
+
+async def events(request: Request, since: Optional[int]) -> AsyncIterator[bytes]:
+    """События changes для EventSource; первое приходит сразу, если since
+    отстал или не передан (тогда это reset с текущим seq)."""
+    pinged = time.monotonic()
+    while not await request.is_disconnected():
+        latest = await run_in_threadpool(watcher.latest)
+        if since is None or latest is None or latest != since:
+            delta = await _read_fresh(since)
+            if delta["reset"] or delta["products"] or delta["deleted"]:
+                yield _event(delta)
+                pinged = time.monotonic()
+            since = delta["seq"]
+        if time.monotonic() - pinged >= config.CHANGES_KEEPALIVE:
+            yield b": ping\n\n"
+            pinged = time.monotonic()
+        await asyncio.sleep(config.CHANGES_POLL_INTERVAL)
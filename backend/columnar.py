@@ -0,0 +1,417 @@
+"""
+Колоночное представление каталога для снимка (backend/snapshot.py).
+
+Products, ProductWorkshops и Workshops раскладываются по колонкам numpy:
+числа — массивами, наименования — одной строкой UTF-8 со смещениями, тип и
+материал — кодами в отсортированный список значений. Маршруты лежат подряд
+в порядке продуктов, свои строки продукт находит по смещениям route_start;
+суммарное время посчитано при загрузке. Позиция продукта по id — плотный
+массив, поиск O(1). Для каждой сортировки /products заранее готов порядок
+позиций: фильтры — маски numpy, курсор — двоичный поиск по этому порядку.
+
+Модуль отдельный, чтобы numpy загружался только при включённом снимке.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import crud
+
+TABLES = ("Products", "ProductWorkshops", "Workshops")
+# сортировки /products с готовым порядком; по product_id снимок упорядочен сам
+ORDERED = tuple(sort for sort in crud.SORT_COLUMNS if sort != "product_id")
+
+def _key(value, product_id: int) -> tuple:
+    # порядок SQLite: NULL < числа < текст; текст — побайтно в UTF-8,
+    # что совпадает со сравнением строк Python по кодовым точкам
+    if value is None:
+        return (0, 0, product_id)
+    if isinstance(value, (int, float)):
+        return (1, value, product_id)
+    if isinstance(value, str):
+        return (2, value, product_id)
+    return (3, 0, product_id)
+
+
+def _code_dtype(count: int):
+    return np.int16 if count < 2 ** 15 else np.int32
+
+
+def _categories(values: Sequence[Optional[str]]) -> Tuple[tuple, np.ndarray]:
+    """Значения -> (отсортированный список + None в конце, коды; NULL — код -1)."""
+    names = sorted({v for v in values if v is not None})
+    index = {v: i for i, v in enumerate(names)}
+    codes = np.fromiter((index.get(v, -1) for v in values), _code_dtype(len(names)), len(values))
+    return tuple(names) + (None,), codes
+
+
+def _dense_index(ids: np.ndarray) -> Optional[np.ndarray]:
+    if not len(ids) or ids[0] < 0 or ids[-1] > 4 * len(ids) + 1024:
+        return None  # редкие id — двоичный поиск по ids
+    index = np.full(int(ids[-1]) + 1, -1, np.int32)
+    index[ids] = np.arange(len(ids), dtype=np.int32)
+    return index
+
+
+class Snapshot:
+    def __init__(
+        self,
+        known: Dict[str, int],
+        ids: np.ndarray,
+        names: bytes,
+        name_start: np.ndarray,
+        article: np.ndarray,
+        cost: np.ndarray,
+        types: tuple,
+        type_code: np.ndarray,
+        materials: tuple,
+        material_code: np.ndarray,
+        total: np.ndarray,
+        route_start: np.ndarray,
+        route_workshop: np.ndarray,
+        route_coef: np.ndarray,
+        workshops: List[Tuple[str, Optional[str], Optional[int]]],
+        orders: Optional[Dict[str, np.ndarray]] = None,
+    ):
+        self.versions = {table: known.get(table, 0) for table in TABLES}
+        self.ids = ids
+        self.names = names
+        self.name_start = name_start
+        self.article = article
+        self.cost = cost
+        self.types = types
+        self.type_code = type_code
+        self.materials = materials
+        self.material_code = material_code
+        self.total = total
+        self.route_start = route_start
+        self.route_workshop = route_workshop
+        self.route_coef = route_coef
+        # (название, тип, сотрудников); тип None — цеха нет в Workshops
+        self.workshops = workshops
+        self.orders = orders if orders is not None else {sort: self._argsort(sort) for sort in ORDERED}
+        self.index = _dense_index(ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.ids, self.name_start, self.article, self.cost, self.type_code, self.material_code, self.total,
+                  self.route_start, self.route_workshop, self.route_coef, *self.orders.values())
+        return len(self.names) + sum(a.nbytes for a in arrays) + (self.index.nbytes if self.index is not None else 0)
+
+    def matches(self, known: Dict[str, int]) -> bool:
+        return all(known.get(table, 0) == version for table, version in self.versions.items())
+
+    # --- значения по позиции ---
+
+    def name(self, i: int) -> str:
+        return self.names[self.name_start[i]:self.name_start[i + 1]].decode("utf-8")
+
+    def value(self, sort: str, i: int):
+        """Значение колонки сортировки, как в строке SQL (для курсора)."""
+        if sort == "product_id":
+            return int(self.ids[i])
+        if sort == "product_name":
+            return self.name(i)
+        if sort == "article":
+            return int(self.article[i])
+        if sort == "min_partner_cost":
+            return float(self.cost[i])
+        if sort == "product_type_name":
+            return self.types[self.type_code[i]]
+        return self.materials[self.material_code[i]]
+
+    def _sort_key(self, sort: str):
+        return lambda i: _key(self.value(sort, i), int(self.ids[i]))
+
+    def _argsort(self, sort: str) -> np.ndarray:
+        if sort == "product_name":
+            order = sorted(range(len(self)), key=self.name)
+            return np.array(order, dtype=np.int32)
+        column = {
+            "article": self.article,
+            "min_partner_cost": self.cost,
+            "product_type_name": self.type_code,
+            "main_material_name": self.material_code,
+        }[sort]
+        # позиции идут по product_id, устойчивая сортировка сохраняет его при равных значениях;
+        # коды категорий упорядочены как сами строки, NULL (-1) — первым
+        return np.argsort(column, kind="stable").astype(np.int32)
+
+    def position(self, product_id: int) -> Optional[int]:
+        if self.index is not None:
+            if 0 <= product_id < len(self.index):
+                i = int(self.index[product_id])
+                return i if i >= 0 else None
+            return None
+        i = int(np.searchsorted(self.ids, product_id))
+        return i if i < len(self.ids) and self.ids[i] == product_id else None
+
+    def column(self, field: str, pos: np.ndarray) -> list:
+        if field == "product_name":
+            starts, ends = self.name_start[pos].tolist(), self.name_start[pos + 1].tolist()
+            names = self.names
+            return [names[a:b].decode("utf-8") for a, b in zip(starts, ends)]
+        if field == "product_type_name":
+            return [self.types[c] for c in self.type_code[pos].tolist()]
+        if field == "main_material_name":
+            return [self.materials[c] for c in self.material_code[pos].tolist()]
+        array = {
+            "product_id": self.ids,
+            "article": self.article,
+            "min_partner_cost": self.cost,
+            "total_production_time": self.total,
+        }[field]
+        return array[pos].tolist()
+
+    def product_records(self, pos: np.ndarray, fields: Tuple[str, ...]) -> list:
+        columns = [self.column(field, pos) for field in fields]
+        return [dict(zip(fields, values)) for values in zip(*columns)]
+
+    # --- обработчики ---
+
+    def products_page(
+        self,
+        fields: Tuple[str, ...],
+        product_type_name: Optional[str] = None,
+        main_material_name: Optional[str] = None,
+        min_cost: Optional[float] = None,
+        max_cost: Optional[float] = None,
+        article_prefix: Optional[str] = None,
+        sort: str = "product_id",
+        order: str = "asc",
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[list, Optional[str]]:
+        """То же, что crud.list_products + serialize.product_records, по снимку."""
+        crud.sort_column(sort)
+        masks = []
+        if product_type_name is not None:
+            masks.append(self.type_code == self._code(self.types, product_type_name))
+        if main_material_name is not None:
+            masks.append(self.material_code == self._code(self.materials, main_material_name))
+        if min_cost is not None:
+            masks.append(self.cost >= min_cost)
+        if max_cost is not None:
+            masks.append(self.cost <= max_cost)
+        if article_prefix:
+            match = np.zeros(len(self), dtype=bool)
+            for low, high in crud.article_ranges(article_prefix):
+                match |= (self.article >= low) & (self.article <= high)
+            masks.append(match)
+
+        seq = self.orders.get(sort)
+        if seq is None:
+            seq = np.arange(len(self), dtype=np.int32)
+        if cursor:
+            value, last_id = crud.decode_cursor(cursor, sort, order)
+            key = _key(last_id if sort == "product_id" else value, last_id)
+            if order == "asc":
+                seq = seq[bisect_right(seq, key, key=self._sort_key(sort)):]
+            else:
+                seq = seq[:bisect_left(seq, key, key=self._sort_key(sort))][::-1]
+        elif order == "desc":
+            seq = seq[::-1]
+        if masks:
+            seq = seq[np.logical_and.reduce(masks)[seq]]
+
+        next_cursor = None
+        if limit is not None and len(seq) > limit:
+            seq = seq[:limit]
+            last = int(seq[-1])
+            next_cursor = crud.encode_cursor(sort, order, self.value(sort, last), int(self.ids[last]))
+        return self.product_records(seq, fields), next_cursor
+
+    @staticmethod
+    def _code(categories: tuple, value: str) -> int:
+        try:
+            return categories.index(value, 0, len(categories) - 1)
+        except ValueError:
+            return -2  # такого значения нет ни у одного продукта
+
+    def _routes(self, i: int):
+        a, b = int(self.route_start[i]), int(self.route_start[i + 1])
+        return zip(self.route_workshop[a:b].tolist(), self.route_coef[a:b].tolist())
+
+    def workshops_of(self, product_id: int) -> Optional[list]:
+        """Как crud.workshops_out по product_workshops_select; None — продукта нет."""
+        i = self.position(product_id)
+        if i is None:
+            return None
+        out = []
+        for code, coef in self._routes(i):
+            name, w_type, employees = self.workshops[code]
+            if w_type is not None:  # в SQL — внутреннее соединение с Workshops
+                out.append(
+                    {"workshop_name": name, "workshop_type": w_type, "num_employees": employees, "time_in_workshop": coef}
+                )
+        return out
+
+    def routes_of(self, product_id: int) -> Optional[list]:
+        """Строки ProductWorkshops продукта в форме schemas.ProductWorkshopOut."""
+        i = self.position(product_id)
+        if i is None:
+            return None
+        name = self.name(i)
+        return [
+            {"product_name": name, "workshop_name": self.workshops[code][0], "coefficient": coef}
+            for code, coef in self._routes(i)
+        ]
+
+    def production_time(self, product_id: int) -> Optional[int]:
+        i = self.position(product_id)
+        return None if i is None else int(self.total[i])
+
+    # --- изменения ---
+
+    def patch(self, known: Dict[str, int], product_id: int, row, routes: Sequence[tuple]) -> "Snapshot":
+        """Новый снимок, где продукт product_id заменён строкой row (None — удалён)."""
+        snap = self._replace()
+        i = self.position(product_id)
+        if i is not None:
+            snap = snap._without(i)
+        if row is not None:
+            snap = snap._with(row, routes)
+        snap.versions = {table: known.get(table, 0) for table in TABLES}
+        return snap
+
+    def _replace(self, **changes) -> "Snapshot":
+        fields = dict(
+            known=self.versions, ids=self.ids, names=self.names, name_start=self.name_start, article=self.article,
+            cost=self.cost, types=self.types, type_code=self.type_code, materials=self.materials,
+            material_code=self.material_code, total=self.total, route_start=self.route_start,
+            route_workshop=self.route_workshop, route_coef=self.route_coef, workshops=self.workshops,
+            orders=self.orders,
+        )
+        fields.update(changes)
+        return Snapshot(**fields)
+
+    def _without(self, i: int) -> "Snapshot":
+        a, b = int(self.name_start[i]), int(self.name_start[i + 1])
+        ra, rb = int(self.route_start[i]), int(self.route_start[i + 1])
+        orders = {}
+        for sort, order in self.orders.items():
+            order = order[order != i]
+            orders[sort] = np.where(order > i, order - 1, order).astype(np.int32)
+        return self._replace(
+            ids=np.delete(self.ids, i),
+            names=self.names[:a] + self.names[b:],
+            name_start=np.concatenate([self.name_start[:i + 1], self.name_start[i + 2:] - (b - a)]),
+            article=np.delete(self.article, i),
+            cost=np.delete(self.cost, i),
+            type_code=np.delete(self.type_code, i),
+            material_code=np.delete(self.material_code, i),
+            total=np.delete(self.total, i),
+            route_start=np.concatenate([self.route_start[:i + 1], self.route_start[i + 2:] - (rb - ra)]),
+            route_workshop=np.delete(self.route_workshop, np.s_[ra:rb]),
+            route_coef=np.delete(self.route_coef, np.s_[ra:rb]),
+            orders=orders,
+        )
+
+    @staticmethod
+    def _with_category(categories: tuple, codes: np.ndarray, value: Optional[str]) -> Tuple[tuple, np.ndarray, int]:
+        if value is None:
+            return categories, codes, -1
+        known = categories[:-1]
+        k = bisect_left(known, value)
+        if k < len(known) and known[k] == value:
+            return categories, codes, k
+        codes = np.where(codes >= k, codes + 1, codes).astype(_code_dtype(len(known) + 1))
+        return known[:k] + (value,) + known[k:] + (None,), codes, k
+
+    def _with(self, row, routes: Sequence[tuple]) -> "Snapshot":
+        i = int(np.searchsorted(self.ids, row.product_id))
+        name = row.product_name.encode("utf-8")
+        at = int(self.name_start[i])
+        types, type_code, t = self._with_category(self.types, self.type_code, row.product_type_name)
+        materials, material_code, m = self._with_category(self.materials, self.material_code, row.main_material_name)
+
+        workshops = self.workshops
+        codes = {w[0]: code for code, w in enumerate(workshops)}
+        route_codes = []
+        for _, workshop_name, _ in routes:
+            if workshop_name not in codes:
+                if workshops is self.workshops:
+                    workshops = list(workshops)
+                codes[workshop_name] = len(workshops)
+                workshops.append((workshop_name, None, None))
+            route_codes.append(codes[workshop_name])
+        ra = int(self.route_start[i])
+
+        snap = self._replace(
+            ids=np.insert(self.ids, i, row.product_id),
+            names=self.names[:at] + name + self.names[at:],
+            name_start=np.concatenate([self.name_start[:i + 1], self.name_start[i:] + len(name)]),
+            article=np.insert(self.article, i, row.article),
+            cost=np.insert(self.cost, i, row.min_partner_cost),
+            types=types,
+            type_code=np.insert(type_code, i, t),
+            materials=materials,
+            material_code=np.insert(material_code, i, m),
+            total=np.insert(self.total, i, crud.total_time(row.time_sum)),
+            route_start=np.concatenate([self.route_start[:i + 1], self.route_start[i:] + len(routes)]),
+            route_workshop=np.insert(
+                self.route_workshop.astype(_code_dtype(len(workshops))), ra, np.array(route_codes, dtype=np.int64)
+            ),
+            route_coef=np.insert(self.route_coef, ra, [coef for _, _, coef in routes]),
+            workshops=workshops,
+            orders={},
+        )
+        for sort, order in self.orders.items():
+            order = np.where(order >= i, order + 1, order)
+            k = bisect_left(order, _key(snap.value(sort, i), int(row.product_id)), key=snap._sort_key(sort))
+            snap.orders[sort] = np.insert(order, k, i).astype(np.int32)
+        return snap
+
+
+def build(known: Dict[str, int], products: Sequence[tuple], routes: Sequence[tuple], workshops: Sequence[tuple]) -> Snapshot:
+    """Строки crud.products_select (по product_id), snapshot.ROUTES_SELECT и WORKSHOPS_SELECT -> снимок."""
+    n = len(products)
+    ids, names, article, cost, p_types, p_materials, time_sum = zip(*products) if n else ((),) * 7
+    encoded = [name.encode("utf-8") for name in names]
+    name_start = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=name_start[1:])
+    types, type_code = _categories(p_types)
+    materials, material_code = _categories(p_materials)
+
+    workshop_list = [(name, w_type, employees) for name, w_type, employees in workshops]
+    codes = {w[0]: code for code, w in enumerate(workshop_list)}
+    position = {name: i for i, name in enumerate(names)}
+    r_pos, r_code, r_coef = [], [], []
+    for product_name, workshop_name, coef in routes:
+        i = position.get(product_name)
+        if i is None:
+            continue  # маршрут без продукта в SQL не виден ни одному обработчику
+        if workshop_name not in codes:
+            codes[workshop_name] = len(workshop_list)
+            workshop_list.append((workshop_name, None, None))
+        r_pos.append(i)
+        r_code.append(codes[workshop_name])
+        r_coef.append(coef)
+    r_pos = np.array(r_pos, dtype=np.int32)
+    # маршруты читаются по наименованию продукта; устойчивая сортировка
+    # по позиции сохраняет порядок цехов внутри продукта
+    order = np.argsort(r_pos, kind="stable")
+    route_start = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(r_pos, minlength=n), out=route_start[1:])
+
+    return Snapshot(
+        known,
+        ids=np.array(ids, dtype=np.int64),
+        names=b"".join(encoded),
+        name_start=name_start,
+        article=np.array(article, dtype=np.int64),
+        cost=np.array(cost, dtype=np.float64),
+        types=types,
+        type_code=type_code,
+        materials=materials,
+        material_code=material_code,
+        total=np.fromiter(map(crud.total_time, time_sum), np.int32, n),
+        route_start=route_start,
+        route_workshop=np.array(r_code, dtype=_code_dtype(len(workshop_list)))[order],
+        route_coef=np.array(r_coef, dtype=np.float64)[order],
+        workshops=workshop_list,
+    )
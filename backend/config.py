@@ -0,0 +1,107 @@
+"""
+Настройки приложения. Все значения можно переопределить переменными окружения.
+"""
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+DATABASE_URL = os.environ.get("FURNITURE_DATABASE_URL", "sqlite:///./furniture_production.db")
+
+# sync — обработчики def в пуле потоков, async — async def поверх aiosqlite
+DB_MODE = os.environ.get("FURNITURE_DB_MODE", "sync")
+if DB_MODE not in ("sync", "async"):
+    raise ValueError(f"FURNITURE_DB_MODE должен быть sync или async, получено {DB_MODE!r}")
+
+# PRAGMA, применяемые к каждому соединению SQLite
+SQLITE_JOURNAL_MODE = os.environ.get("FURNITURE_SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("FURNITURE_SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = _env_int("FURNITURE_SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_MMAP_SIZE = _env_int("FURNITURE_SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+# отрицательное значение — размер в КиБ (8 МиБ на соединение); кэш у каждого
+# соединения свой, бюджет памяти — у пула ниже. Страницы, прочитанные через
+# mmap, в него не попадают: mmap — общий страничный кэш ОС, а не память процесса
+SQLITE_CACHE_SIZE = _env_int("FURNITURE_SQLITE_CACHE_SIZE", -8 * 1024)
+
+# пул читающих соединений; столько же запросов одновременно держат сессию,
+# остальные ждут своей очереди в цикле событий. Память на кэш страниц —
+# до (DB_POOL_SIZE + DB_MAX_OVERFLOW) × |SQLITE_CACHE_SIZE| КиБ на процесс
+# (по умолчанию 20 × 8 МиБ = 160 МиБ; в async пулов чтения два), и так
+# в каждом процессе сервера
+DB_POOL_SIZE = _env_int("FURNITURE_DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _env_int("FURNITURE_DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _env_float("FURNITURE_DB_POOL_TIMEOUT", 30.0)
+# сколько ждать единственное пишущее соединение (вне API, например импорт)
+DB_WRITE_TIMEOUT = _env_float("FURNITURE_DB_WRITE_TIMEOUT", 30.0)
+
+# кэш справочников (ProductTypes, Materials, Workshops)
+REFERENCE_CACHE_TTL = _env_float("FURNITURE_REFERENCE_CACHE_TTL", 300.0)
+REFERENCE_CACHE_MAXSIZE = _env_int("FURNITURE_REFERENCE_CACHE_MAXSIZE", 64)
+# как часто проверять PRAGMA data_version на записи других процессов, с;
+# это верхняя граница устаревания кэша справочников между воркерами
+CACHE_COHERENCE_INTERVAL = _env_float("FURNITURE_CACHE_COHERENCE_INTERVAL", 0.1)
+
+# кэш расчётов /mrp по портфелю заказов; ключ включает версии каталога,
+# поэтому TTL ограничивает только память, а не свежесть
+MRP_CACHE_TTL = _env_float("FURNITURE_MRP_CACHE_TTL", 3600.0)
+MRP_CACHE_MAXSIZE = _env_int("FURNITURE_MRP_CACHE_MAXSIZE", 32)
+
+# снимок каталога в памяти (backend/snapshot.py) для /products и маршрутов
+# продукта; 1 — включить
+SNAPSHOT = os.environ.get("FURNITURE_SNAPSHOT", "0") == "1"
+
+# журнал изменений (/changes, /changes/stream): больше CHANGES_MAX изменённых
+# продуктов в ответе — клиенту дешевле перечитать /products (reset); поток
+# проверяет журнал раз в CHANGES_POLL_INTERVAL с и шлёт комментарий-пинг
+# раз в CHANGES_KEEPALIVE с, чтобы прокси не закрыли соединение
+CHANGES_MAX = _env_int("FURNITURE_CHANGES_MAX", 1000)
+CHANGES_POLL_INTERVAL = _env_float("FURNITURE_CHANGES_POLL_INTERVAL", 0.5)
+CHANGES_KEEPALIVE = _env_float("FURNITURE_CHANGES_KEEPALIVE", 15.0)
+
+# перебор параметров /calculate_raw_material/sweep: предел числа ячеек сетки;
+# сетка больше SWEEP_CHUNK_CELLS считается и отдаётся потоком порциями такого размера
+SWEEP_MAX_CELLS = _env_int("FURNITURE_SWEEP_MAX_CELLS", 10_000_000)
+SWEEP_CHUNK_CELLS = _env_int("FURNITURE_SWEEP_CHUNK_CELLS", 100_000)
+
+# ставка за человеко-час в себестоимости (/costs, python -m backend.costs);
+# запрос может передать свою через ?hourly_rate=
+LABOR_RATE = _env_float("FURNITURE_LABOR_RATE", 500.0)
+
+# размер порции строк при потоковой выгрузке /export/*
+EXPORT_CHUNK_SIZE = _env_int("FURNITURE_EXPORT_CHUNK_SIZE", 1000)
+
+# загрузка CSV через /import/*: строк в одной транзакции и сколько отказов
+# перечислять в отчёте (счётчик rejected считает все)
+IMPORT_CHUNK_SIZE = _env_int("FURNITURE_IMPORT_CHUNK_SIZE", 5000)
+IMPORT_MAX_REJECTS = _env_int("FURNITURE_IMPORT_MAX_REJECTS", 1000)
+
+# python run.py --prod: число процессов uvicorn (по умолчанию — по числу ядер),
+# сколько держать простаивающее keep-alive соединение (больше таймаута
+# балансировщика, обычно 60 с, чтобы сервер не закрывал соединение первым)
+# и сколько ждать завершения текущих запросов при остановке
+WORKERS = _env_int("FURNITURE_WORKERS", os.cpu_count() or 1)
+KEEP_ALIVE_TIMEOUT = _env_int("FURNITURE_KEEP_ALIVE_TIMEOUT", 75)
+GRACEFUL_SHUTDOWN_TIMEOUT = _env_int("FURNITURE_GRACEFUL_SHUTDOWN_TIMEOUT", 30)
+BACKLOG = _env_int("FURNITURE_BACKLOG", 2048)
+
+# /metrics в формате Prometheus и сбор метрик запросов и пула; 0 — выключить
+METRICS_ENABLED = os.environ.get("FURNITURE_METRICS", "1") != "0"
+
+# профилировщик SQL: число и время запросов в заголовках X-SQL-*, предупреждение
+# о повторах одного оператора (N+1) и лог медленных операторов с планом
+SQL_PROFILE = os.environ.get("FURNITURE_SQL_PROFILE", "0") == "1"
+SQL_PROFILE_REPEAT_LIMIT = _env_int("FURNITURE_SQL_PROFILE_REPEAT_LIMIT", 10)
+SQL_SLOW_MS = _env_float("FURNITURE_SQL_SLOW_MS", 100.0)
+# файл для лога медленных операторов; по умолчанию — общий лог приложения
+SQL_SLOW_LOG = os.environ.get("FURNITURE_SQL_SLOW_LOG", "")
+
+# маршруты продуктов для /schedule в памяти процесса (scheduler.RouteTable):
+# сколько продуктов держать до сброса; кэш сбрасывается и при любой записи
+# в Products, ProductWorkshops или Workshops
+SCHEDULE_ROUTES_CACHED = _env_int("FURNITURE_SCHEDULE_ROUTES_CACHED", 200_000)
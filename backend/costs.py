@@ -0,0 +1,232 @@
+"""
+Себестоимость продукции по всему каталогу: GET /costs, GET /products/{id}/cost
+и python -m backend.costs.
+
+    материалы = min_partner_cost × коэффициент типа × (1 + потери материала / 100)
+    труд      = Σ по маршруту (часы в цехе × сотрудников цеха) × ставка за чел.-час
+    итого     = материалы + труд
+
+Продукт без типа или материала считается с коэффициентом 1 и без потерь
+(в ответе type_coefficient / loss_percentage — null).
+
+Расчёт хранится колонками numpy и помечен номером журнала изменений
+(ProductChanges, backend/changes.py) и версиями справочников. Запрос
+досчитывает только то, что изменилось: правка продукта или маршрута —
+перечитываются строки только этих продуктов из журнала; новая ставка — только
+умножение уже посчитанных человеко-часов, без SQL; изменение типов, материалов,
+цехов или сброс журнала — полный пересчёт одним агрегирующим запросом и одним
+векторным проходом.
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence
+
+from pydantic_core import to_json
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection, make_url
+
+from . import changes, config, migrations, models, versions
+from .database import engine, read_slots
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# справочники, от которых зависят строки многих продуктов сразу
+REFERENCE_TABLES = ("ProductTypes", "Materials", "Workshops")
+ETAG_TABLES = ("Products", "ProductWorkshops", *REFERENCE_TABLES)
+
+LABOR_HOURS = (
+    select(func.sum(models.ProductWorkshop.coefficient * models.Workshop.num_employees))
+    .join(models.Workshop, models.Workshop.workshop_name == models.ProductWorkshop.workshop_name)
+    .where(models.ProductWorkshop.product_name == models.Product.product_name)
+    .scalar_subquery()
+)
+
+COST_SELECT = (
+    select(
+        models.Product.product_id,
+        models.Product.product_name,
+        models.Product.min_partner_cost,
+        models.ProductType.type_coefficient,
+        models.Material.loss_percentage,
+        LABOR_HOURS.label("labor_hours"),
+    )
+    .outerjoin(models.ProductType, models.ProductType.product_type_name == models.Product.product_type_name)
+    .outerjoin(models.Material, models.Material.material_name == models.Product.main_material_name)
+    .order_by(models.Product.product_id)
+)
+
+
+class Rollup(NamedTuple):
+    """Неизменяемый расчёт: колонки по возрастанию product_id."""
+
+    seq: int
+    versions: Dict[str, int]
+    product_id: np.ndarray
+    product_name: np.ndarray
+    min_partner_cost: np.ndarray
+    type_coefficient: np.ndarray
+    loss_percentage: np.ndarray
+    labor_hours: np.ndarray
+    material_cost: np.ndarray
+
+
+COLUMNS = ("product_id", "product_name", "min_partner_cost", "type_coefficient", "loss_percentage", "labor_hours")
+
+
+def _columns(rows: Sequence) -> Dict[str, np.ndarray]:
+    import numpy as np
+
+    n = len(rows)
+    return {
+        "product_id": np.fromiter((r.product_id for r in rows), dtype=np.int64, count=n),
+        "product_name": np.array([r.product_name for r in rows], dtype=object),
+        "min_partner_cost": np.fromiter((r.min_partner_cost for r in rows), dtype=np.float64, count=n),
+        "type_coefficient": np.array([r.type_coefficient for r in rows], dtype=np.float64),
+        "loss_percentage": np.array([r.loss_percentage for r in rows], dtype=np.float64),
+        "labor_hours": np.fromiter((r.labor_hours or 0.0 for r in rows), dtype=np.float64, count=n),
+    }
+
+
+def _rollup(seq: int, known: Dict[str, int], columns: Dict[str, np.ndarray]) -> Rollup:
+    import numpy as np
+
+    # None из SQL стал NaN: нет типа — коэффициент 1, нет материала — без потерь
+    coefficient = np.where(np.isnan(columns["type_coefficient"]), 1.0, columns["type_coefficient"])
+    loss = np.where(np.isnan(columns["loss_percentage"]), 0.0, columns["loss_percentage"])
+    material_cost = columns["min_partner_cost"] * coefficient * (1 + loss / 100.0)
+    return Rollup(seq=seq, versions=known, material_cost=material_cost, **columns)
+
+
+def build(conn: Connection, known: Dict[str, int]) -> Rollup:
+    seq, _ = conn.execute(changes.BOUNDS_SELECT).one()
+    return _rollup(seq, known, _columns(conn.execute(COST_SELECT).all()))
+
+
+def patch(state: Rollup, seq: int, known: Dict[str, int], ids: List[int], rows: Sequence) -> Rollup:
+    """Заменить строки продуктов ids на rows (удалённых в rows нет)."""
+    import numpy as np
+
+    keep = ~np.isin(state.product_id, ids)
+    fresh = _columns(rows)
+    merged = {name: np.concatenate([getattr(state, name)[keep], fresh[name]]) for name in COLUMNS}
+    order = np.argsort(merged["product_id"], kind="stable")
+    return _rollup(seq, known, {name: column[order] for name, column in merged.items()})
+
+
+def _update(conn: Connection, state: Optional[Rollup]) -> Rollup:
+    known = dict(conn.execute(versions.VERSIONS_SELECT).all())
+    if state is None or any(known.get(t, 0) != state.versions.get(t, 0) for t in REFERENCE_TABLES):
+        return build(conn, known)
+    seq, ids = changes.changed_ids(conn, state.seq)
+    if ids is None:
+        return build(conn, known)
+    if not ids:
+        return state if known == state.versions and seq == state.seq else state._replace(seq=seq, versions=known)
+    rows = conn.execute(COST_SELECT.where(models.Product.product_id.in_(ids))).all()
+    return patch(state, seq, known, ids, rows)
+
+
+_state: Optional[Rollup] = None
+_lock = threading.Lock()
+
+
+def _newer(state: Rollup, other: Rollup) -> bool:
+    return state.seq >= other.seq and all(state.versions.get(t, 0) >= v for t, v in other.versions.items())
+
+
+def current() -> Rollup:
+    """Актуальный расчёт. SQL идёт вне блокировки; под ней только замена
+    общего расчёта — из параллельных досчётов остаётся более новый."""
+    global _state
+    state = _state
+    with engine.connect() as conn:
+        # журнал, версии и строки — из одного состояния WAL
+        conn.exec_driver_sql("BEGIN")
+        fresh = _update(conn, state)
+        conn.rollback()
+    with _lock:
+        if _state is state or _newer(fresh, _state):
+            _state = fresh
+    return fresh
+
+
+async def acurrent() -> Rollup:
+    # расчёт держит своё соединение из пула чтения, как выгрузка /export/*
+    async with read_slots:
+        return await run_in_threadpool(current)
+
+
+def etag(state: Rollup, rate: float) -> str:
+    return versions.make_etag(state.versions, *ETAG_TABLES)[:-1] + f'-{state.seq}-{rate!r}"'
+
+
+def _optional(values: np.ndarray) -> list:
+    import numpy as np
+
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def records(state: Rollup, rate: float, index=slice(None)) -> List[dict]:
+    import numpy as np
+
+    labor_cost = state.labor_hours[index] * rate
+    total = state.material_cost[index] + labor_cost
+    columns = (
+        state.product_id[index].tolist(),
+        state.product_name[index].tolist(),
+        state.min_partner_cost[index].tolist(),
+        _optional(state.type_coefficient[index]),
+        _optional(state.loss_percentage[index]),
+        np.round(state.material_cost[index], 2).tolist(),
+        np.round(state.labor_hours[index], 4).tolist(),
+        np.round(labor_cost, 2).tolist(),
+        np.round(total, 2).tolist(),
+    )
+    fields = (
+        "product_id", "product_name", "min_partner_cost", "type_coefficient", "loss_percentage",
+        "material_cost", "labor_hours", "labor_cost", "total_cost",
+    )
+    return [dict(zip(fields, values)) for values in zip(*columns)]
+
+
+def record(state: Rollup, product_id: int, rate: float) -> Optional[dict]:
+    import numpy as np
+
+    i = int(np.searchsorted(state.product_id, product_id))
+    if i == len(state.product_id) or state.product_id[i] != product_id:
+        return None
+    return records(state, rate, slice(i, i + 1))[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Себестоимость продукции по всему каталогу")
+    parser.add_argument("--rate", type=float, default=config.LABOR_RATE, help="ставка за человеко-час")
+    parser.add_argument("--top", type=int, default=10, help="сколько самых дорогих продуктов показать")
+    parser.add_argument("--output", help="JSON-файл с расчётом по всем продуктам, как GET /costs")
+    args = parser.parse_args(argv)
+
+    database = make_url(config.DATABASE_URL).database
+    if database:
+        migrations.upgrade(database)
+    state = current()
+    rows = records(state, args.rate)
+    material = sum(r["material_cost"] for r in rows)
+    labor = sum(r["labor_cost"] for r in rows)
+    print(f"Продуктов: {len(rows)}, ставка {args.rate:g} за чел.-ч")
+    print(f"Себестоимость каталога: {material + labor:.2f} (материалы {material:.2f}, труд {labor:.2f})")
+    unresolved = sum(r["type_coefficient"] is None or r["loss_percentage"] is None for r in rows)
+    if unresolved:
+        print(f"Без типа или материала (коэффициент 1, без потерь): {unresolved}")
+    for r in sorted(rows, key=lambda r: r["total_cost"], reverse=True)[: args.top]:
+        print(f"{r['product_id']:>8}  {r['total_cost']:>14.2f}  {r['product_name']}")
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(to_json(rows))
+
+
+if __name__ == "__main__":
+    main()
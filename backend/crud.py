@@ -0,0 +1,296 @@
+"""
+Запросы чтения каталога: продукция вместе с суммарным временем изготовления
+собирается одним SQL-запросом, время считается коррелированным подзапросом
+по первичному ключу ProductWorkshops (product_name, workshop_name).
+
+Постраничная выдача /products — keyset: курсор хранит значение колонки
+сортировки и product_id последней строки, следующая страница начинается
+строго после них, без OFFSET.
+"""
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, false, func, literal_column, or_, select
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+SORT_COLUMNS = {
+    "product_id": models.Product.product_id,
+    "product_name": models.Product.product_name,
+    "article": models.Product.article,
+    "min_partner_cost": models.Product.min_partner_cost,
+    "product_type_name": models.Product.product_type_name,
+    "main_material_name": models.Product.main_material_name,
+}
+
+# артикул — INTEGER, поэтому префикс превращается в набор диапазонов
+# [p * 10^k, (p + 1) * 10^k - 1]
+ARTICLE_MAX_DIGITS = 18
+
+
+def total_time(time_sum) -> int:
+    return int(round(max(time_sum or 0, 0)))
+
+
+def products_select(with_time: bool = True):
+    """Колонки продукции; with_time=False — без подзапроса по маршрутам,
+    когда total_production_time не нужен (fields= в /products)."""
+    columns = [
+        models.Product.product_id,
+        models.Product.product_name,
+        models.Product.article,
+        models.Product.min_partner_cost,
+        models.Product.product_type_name,
+        models.Product.main_material_name,
+    ]
+    if with_time:
+        time_sum = (
+            select(func.coalesce(func.sum(models.ProductWorkshop.coefficient), 0.0))
+            .where(models.ProductWorkshop.product_name == models.Product.product_name)
+            .scalar_subquery()
+        )
+        columns.append(time_sum.label("time_sum"))
+    return select(*columns)
+
+
+def product_out(row) -> schemas.ProductOut:
+    return schemas.ProductOut(
+        product_id=row.product_id,
+        product_name=row.product_name,
+        article=row.article,
+        min_partner_cost=row.min_partner_cost,
+        product_type_name=row.product_type_name,
+        main_material_name=row.main_material_name,
+        total_production_time=total_time(row.time_sum),
+    )
+
+
+def encode_cursor(sort: str, order: str, value, product_id: int) -> str:
+    raw = json.dumps([sort, order, value, product_id], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        c_sort, c_order, value, product_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    if c_sort != sort or c_order != order or not isinstance(product_id, int):
+        raise HTTPException(status_code=400, detail="Курсор не соответствует параметрам сортировки")
+    return value, product_id
+
+
+def _after_cursor(column, order: str, value, product_id: int):
+    pid = models.Product.product_id
+    if column is pid:
+        return pid < product_id if order == "desc" else pid > product_id
+    # в SQLite NULL меньше любого значения: при ASC они идут первыми, при DESC — последними
+    if order == "asc":
+        if value is None:
+            return or_(and_(column.is_(None), pid > product_id), column.isnot(None))
+        return or_(column > value, and_(column == value, pid > product_id))
+    if value is None:
+        return and_(column.is_(None), pid < product_id)
+    return or_(column < value, and_(column == value, pid < product_id), column.is_(None))
+
+
+def article_ranges(prefix: str) -> List[Tuple[int, int]]:
+    """Префикс артикула -> диапазоны [от, до] целых чисел с этим началом."""
+    if not prefix.isdigit():
+        raise HTTPException(status_code=400, detail="Префикс артикула должен состоять из цифр")
+    if prefix.startswith("0"):
+        # целое число с ведущего нуля начинается только одно — сам 0
+        return [(0, 0)] if prefix == "0" else []
+    p = int(prefix)
+    return [(p * 10 ** k, (p + 1) * 10 ** k - 1) for k in range(ARTICLE_MAX_DIGITS - len(prefix) + 1)]
+
+
+def _article_prefix(prefix: str):
+    ranges = article_ranges(prefix)
+    if not ranges:
+        return false()
+    # диапазоны в подзапросе: SQLite читает их по уникальному индексу article
+    # (MULTI-INDEX OR), а не сканирует Products в порядке сортировки, отбрасывая
+    # почти все строки
+    matching = select(models.Product.product_id).where(
+        or_(*(models.Product.article.between(low, high) for low, high in ranges))
+    ).correlate(None)
+    return models.Product.product_id.in_(matching)
+
+
+def sort_column(sort: str):
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Сортировка возможна по: {', '.join(SORT_COLUMNS)}")
+    return SORT_COLUMNS[sort]
+
+
+def products_page_select(
+    product_type_name: Optional[str] = None,
+    main_material_name: Optional[str] = None,
+    min_cost: Optional[float] = None,
+    max_cost: Optional[float] = None,
+    article_prefix: Optional[str] = None,
+    sort: str = "product_id",
+    order: str = "asc",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    with_time: bool = True,
+):
+    column = sort_column(sort)
+    pid = models.Product.product_id
+
+    q = products_select(with_time)
+    if product_type_name is not None:
+        q = q.where(models.Product.product_type_name == product_type_name)
+    if main_material_name is not None:
+        q = q.where(models.Product.main_material_name == main_material_name)
+    if min_cost is not None:
+        q = q.where(models.Product.min_partner_cost >= min_cost)
+    if max_cost is not None:
+        q = q.where(models.Product.min_partner_cost <= max_cost)
+    if article_prefix:
+        q = q.where(_article_prefix(article_prefix))
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort, order)
+        q = q.where(_after_cursor(column, order, value, last_id))
+
+    if sort == "product_id":
+        q = q.order_by(pid.desc() if order == "desc" else pid)
+    elif order == "desc":
+        q = q.order_by(column.desc(), pid.desc())
+    else:
+        q = q.order_by(column, pid)
+
+    # одна лишняя строка показывает, есть ли следующая страница
+    return q if limit is None else q.limit(limit + 1)
+
+
+def products_page(rows, sort: str, order: str, limit: Optional[int]) -> Tuple[list, Optional[str]]:
+    """Строки страницы без лишней последней и курсор следующей страницы."""
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, order, getattr(last, sort), last.product_id)
+    return rows, next_cursor
+
+
+def list_products(db: Session, sort: str = "product_id", order: str = "asc", limit: Optional[int] = None, **filters):
+    rows = db.execute(products_page_select(sort=sort, order=order, limit=limit, **filters)).all()
+    return products_page(rows, sort, order, limit)
+
+
+def product_select(product_id: int):
+    return products_select().where(models.Product.product_id == product_id)
+
+
+def get_product(db: Session, product_id: int) -> Optional[schemas.ProductOut]:
+    row = db.execute(product_select(product_id)).first()
+    return product_out(row) if row else None
+
+
+def product_workshops_select(product_name: str):
+    """Цеха маршрута продукта одним запросом с JOIN, без ленивой загрузки pw.workshop."""
+    return (
+        select(
+            models.Workshop.workshop_name,
+            models.Workshop.workshop_type,
+            models.Workshop.num_employees,
+            models.ProductWorkshop.coefficient,
+        )
+        .join(models.Workshop, models.Workshop.workshop_name == models.ProductWorkshop.workshop_name)
+        .where(models.ProductWorkshop.product_name == product_name)
+    )
+
+
+PRODUCT_WORKSHOPS_SELECT = select(
+    models.ProductWorkshop.product_name, models.ProductWorkshop.workshop_name, models.ProductWorkshop.coefficient
+)
+
+
+def workshops_out(rows) -> List[schemas.WorkshopOut]:
+    return [
+        schemas.WorkshopOut(workshop_name=name, workshop_type=w_type, num_employees=employees, time_in_workshop=coef)
+        for name, w_type, employees, coef in rows
+    ]
+
+
+def in_ids(column, ids):
+    """column IN (...) с одним параметром: список уходит JSON-массивом в json_each,
+    поэтому лимит SQLite на число параметров не мешает большим заказам."""
+    values = select(literal_column("value")).select_from(func.json_each(json.dumps(list(ids))))
+    return column.in_(values)
+
+
+def routes_select(product_ids):
+    """Цеха маршрутов продуктов и время на единицу; у продукта без маршрута — одна строка с NULL.
+
+    Порядок цехов в маршруте задаёт Workshops.process_order, его применяет
+    scheduler.RouteTable по справочнику цехов, поэтому здесь нет ни соединения
+    с Workshops, ни сортировки."""
+    return (
+        select(models.Product.product_id, models.ProductWorkshop.workshop_name, models.ProductWorkshop.coefficient)
+        .select_from(models.Product)
+        .outerjoin(models.ProductWorkshop, models.ProductWorkshop.product_name == models.Product.product_name)
+        .where(in_ids(models.Product.product_id, product_ids))
+    )
+
+
+def workload_select(product_ids, quantities):
+    """Часы по цехам для портфеля заказов за один проход: пары (product_id, количество)
+    уходят одним JSON-параметром, соединяются с маршрутами и суммируются в GROUP BY.
+
+    Строка с workshop_name = NULL собирает продукты без маршрута; в двух последних
+    колонках — через запятую product_id, которых нет в каталоге, и продуктов без маршрута."""
+    value = literal_column("value")
+    lines = (
+        select(
+            func.json_extract(value, "$[0]").label("product_id"),
+            func.json_extract(value, "$[1]").label("quantity"),
+        )
+        .select_from(func.json_each(json.dumps(list(zip(product_ids, quantities)))))
+        .cte("order_lines")
+    )
+    return (
+        select(
+            models.Workshop.workshop_name,
+            models.Workshop.num_employees,
+            func.total(models.ProductWorkshop.coefficient * lines.c.quantity),
+            func.group_concat(case((models.Product.product_id.is_(None), lines.c.product_id))),
+            func.group_concat(
+                case(
+                    (
+                        and_(models.Product.product_id.is_not(None), models.ProductWorkshop.product_name.is_(None)),
+                        models.Product.product_id,
+                    )
+                )
+            ),
+        )
+        .select_from(lines)
+        .outerjoin(models.Product, models.Product.product_id == lines.c.product_id)
+        .outerjoin(models.ProductWorkshop, models.ProductWorkshop.product_name == models.Product.product_name)
+        .outerjoin(models.Workshop, models.Workshop.workshop_name == models.ProductWorkshop.workshop_name)
+        .group_by(models.Workshop.workshop_name)
+        .order_by(models.Workshop.workshop_name)
+    )
+
+
+def material_select(product_ids):
+    """Основной материал продукта с потерями и коэффициент его типа — для /mrp."""
+    return (
+        select(
+            models.Product.product_id,
+            models.Product.main_material_name,
+            models.ProductType.type_coefficient,
+            models.Material.loss_percentage,
+        )
+        .select_from(models.Product)
+        .outerjoin(models.ProductType, models.ProductType.product_type_name == models.Product.product_type_name)
+        .outerjoin(models.Material, models.Material.material_name == models.Product.main_material_name)
+        .where(in_ids(models.Product.product_id, product_ids))
+        .order_by(models.Product.product_id)
+    )
@@ -1,21 +1,165 @@
-from sqlalchemy import create_engine
+"""
+Подключение к SQLite.
+
+Каждое соединение получает PRAGMA из config (WAL, busy_timeout, synchronous,
+mmap, cache_size). Чтение идёт через пул engine, запись — через writer_engine
+с единственным соединением и BEGIN IMMEDIATE: внутри процесса пишущие
+транзакции выстраиваются в очередь за замком, между процессами их разводит
+блокировка SQLite с busy_timeout. Читатели в WAL писателей не ждут.
+"""
+import asyncio
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./furniture_production.db"
+from . import config, metrics, sqlprofile
+
+DATABASE_URL = config.DATABASE_URL
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+PRAGMAS = (
+    f"PRAGMA journal_mode = {config.SQLITE_JOURNAL_MODE}",
+    f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}",
+    f"PRAGMA busy_timeout = {config.SQLITE_BUSY_TIMEOUT_MS}",
+    f"PRAGMA mmap_size = {config.SQLITE_MMAP_SIZE}",
+    f"PRAGMA cache_size = {config.SQLITE_CACHE_SIZE}",
+)
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def _immediate_transactions(sync_engine) -> None:
+    # pysqlite сам открывает транзакцию только перед DML (DEFERRED); для писателя
+    # берём RESERVED-блокировку сразу, чтобы не упираться в SQLITE_BUSY при
+    # повышении блокировки посреди транзакции
+    @event.listens_for(sync_engine, "connect")
+    def _disable_implicit_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
 
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False},
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
 )
+event.listen(engine, "connect", _apply_pragmas)
+
+writer_engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=1,
+    max_overflow=0,
+    pool_timeout=config.DB_WRITE_TIMEOUT,
+)
+event.listen(writer_engine, "connect", _apply_pragmas)
+_immediate_transactions(writer_engine)
+
+if config.METRICS_ENABLED:
+    metrics.instrument_engine(engine, "read")
+    metrics.instrument_engine(writer_engine, "write")
+    metrics.instrument_writer(writer_engine, "write")
+if config.SQL_PROFILE:
+    sqlprofile.instrument(engine)
+    sqlprofile.instrument(writer_engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=writer_engine)
 Base = declarative_base()
 
+async_engine = None
+async_writer_engine = None
+AsyncSessionLocal = None
+AsyncWriteSessionLocal = None
+if config.DB_MODE == "async":
+    # aiosqlite нужен только в асинхронном режиме
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    # у aiosqlite по умолчанию NullPool — соединение на каждый запрос
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+    )
+    event.listen(async_engine.sync_engine, "connect", _apply_pragmas)
+    async_writer_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=config.DB_WRITE_TIMEOUT,
+    )
+    event.listen(async_writer_engine.sync_engine, "connect", _apply_pragmas)
+    _immediate_transactions(async_writer_engine.sync_engine)
+
+    if config.METRICS_ENABLED:
+        metrics.instrument_engine(async_engine.sync_engine, "async_read")
+        metrics.instrument_engine(async_writer_engine.sync_engine, "async_write")
+        metrics.instrument_writer(async_writer_engine.sync_engine, "async_write")
+    if config.SQL_PROFILE:
+        sqlprofile.instrument(async_engine.sync_engine)
+        sqlprofile.instrument(async_writer_engine.sync_engine)
+
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncWriteSessionLocal = async_sessionmaker(async_writer_engine, autoflush=False, expire_on_commit=False)
+
+
+# Сессии выдаются асинхронными зависимостями под семафором (чтение) и замком
+# (запись) в цикле событий. Синхронный обработчик получает сессию уже с гарантией
+# свободного соединения и не блокирует поток ожиданием пула: иначе потоки anyio
+# ждут соединения, а соединения держат завершённые запросы, которым для
+# сериализации ответа нужен поток — взаимная блокировка.
+read_slots = asyncio.Semaphore(config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW)
+write_lock = asyncio.Lock()
+
+
+async def get_db():
+    started = time.perf_counter()
+    async with read_slots:
+        metrics.session_wait.observe(time.perf_counter() - started, "read")
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def get_write_db():
+    started = time.perf_counter()
+    async with write_lock:
+        metrics.session_wait.observe(time.perf_counter() - started, "write")
+        db = WriteSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def get_async_db():
+    started = time.perf_counter()
+    async with read_slots:
+        metrics.session_wait.observe(time.perf_counter() - started, "read")
+        async with AsyncSessionLocal() as db:
+            yield db
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+async def get_async_write_db():
+    started = time.perf_counter()
+    async with write_lock:
+        metrics.session_wait.observe(time.perf_counter() - started, "write")
+        async with AsyncWriteSessionLocal() as db:
+            yield db
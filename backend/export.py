@@ -0,0 +1,126 @@
+"""
+Потоковая выгрузка продукции и маршрутов в NDJSON и CSV.
+
+Строки читаются курсором порциями по config.EXPORT_CHUNK_SIZE и сразу уходят
+в сокет, поэтому память не зависит от размера таблицы. CSV повторяет формат
+data/*.csv (разделитель ";", десятичная запятая, BOM), так что выгрузку можно
+загрузить обратно через create_bd.py.
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator, Callable, List, Optional, Sequence
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from . import config, crud, models
+from .database import engine, read_slots
+
+BOM = "\ufeff"
+
+PRODUCTS_CSV_HEADER = (
+    "Тип продукции",
+    "Наименование продукции",
+    "Артикул",
+    "Минимальная стоимость для партнера",
+    "Основной материал",
+)
+PRODUCT_WORKSHOPS_CSV_HEADER = ("Наименование продукции", "Название цеха", "Время изготовления, ч")
+
+PRODUCT_WORKSHOPS_SELECT = select(
+    models.ProductWorkshop.product_name, models.ProductWorkshop.workshop_name, models.ProductWorkshop.coefficient
+).order_by(models.ProductWorkshop.product_name, models.ProductWorkshop.workshop_name)
+
+
+def _decimal(value: float, digits: Optional[int] = None) -> str:
+    text = f"{value:.{digits}f}" if digits is not None else str(value)
+    return text.replace(".", ",")
+
+
+def _csv_lines(rows: Sequence[Sequence]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, delimiter=";", lineterminator="\n").writerows(rows)
+    return buf.getvalue()
+
+
+def products_ndjson(rows) -> str:
+    return "".join(
+        json.dumps(
+            {
+                "product_name": r.product_name,
+                "article": r.article,
+                "min_partner_cost": r.min_partner_cost,
+                "product_type_name": r.product_type_name,
+                "main_material_name": r.main_material_name,
+                "product_id": r.product_id,
+                "total_production_time": crud.total_time(r.time_sum),
+            },
+            ensure_ascii=False,
+        )
+        + "\n"
+        for r in rows
+    )
+
+
+def products_csv(rows) -> str:
+    return _csv_lines(
+        [
+            (
+                r.product_type_name or "",
+                r.product_name,
+                r.article,
+                _decimal(r.min_partner_cost, 2),
+                r.main_material_name or "",
+            )
+            for r in rows
+        ]
+    )
+
+
+def product_workshops_ndjson(rows) -> str:
+    return "".join(
+        json.dumps(
+            {"product_name": r.product_name, "workshop_name": r.workshop_name, "coefficient": r.coefficient},
+            ensure_ascii=False,
+        )
+        + "\n"
+        for r in rows
+    )
+
+
+def product_workshops_csv(rows) -> str:
+    return _csv_lines([(r.product_name, r.workshop_name, _decimal(r.coefficient)) for r in rows])
+
+
+async def stream(stmt, encode: Callable[[List], str], header: str = "") -> AsyncIterator[bytes]:
+    # каждая порция читается в пуле потоков, цикл событий не блокируется;
+    # слот чтения держится всё время выгрузки, как и у обычного запроса
+    async with read_slots:
+        conn = await run_in_threadpool(engine.connect)
+        try:
+            result = await run_in_threadpool(
+                conn.execution_options(stream_results=True, yield_per=config.EXPORT_CHUNK_SIZE).execute, stmt
+            )
+            if header:
+                yield header.encode("utf-8")
+            while True:
+                rows = await run_in_threadpool(result.fetchmany, config.EXPORT_CHUNK_SIZE)
+                if not rows:
+                    break
+                yield encode(rows).encode("utf-8")
+        finally:
+            await run_in_threadpool(conn.close)
+
+
+def products_stream(fmt: str) -> AsyncIterator[bytes]:
+    stmt = crud.products_select().order_by(models.Product.product_id)
+    if fmt == "csv":
+        return stream(stmt, products_csv, BOM + _csv_lines([PRODUCTS_CSV_HEADER]))
+    return stream(stmt, products_ndjson)
+
+
+def product_workshops_stream(fmt: str) -> AsyncIterator[bytes]:
+    if fmt == "csv":
+        return stream(PRODUCT_WORKSHOPS_SELECT, product_workshops_csv, BOM + _csv_lines([PRODUCT_WORKSHOPS_CSV_HEADER]))
+    return stream(PRODUCT_WORKSHOPS_SELECT, product_workshops_ndjson)
@@ -0,0 +1,272 @@
+"""
+Загрузка CSV в формате data/*.csv через API без остановки сервера.
+
+Тело запроса читается потоком и разбирается построчно; строки проверяются по
+тем же правилам, что preprocess_products / preprocess_product_workshops в
+create_bd.py, плюс проверка ссылок (в create_bd.py её делает PRAGMA foreign_keys).
+Принятые строки пишутся порциями: каждая порция — отдельная транзакция
+BEGIN IMMEDIATE с executemany, под общим замком записи, поэтому между
+порциями проходят другие записи, а чтение в WAL не блокируется вовсе.
+"""
+import codecs
+import csv
+import math
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import exc, select
+from starlette.concurrency import run_in_threadpool
+
+from . import cache, config, export, migrations, models, schemas, versions
+from .database import SessionLocal, write_lock, writer_engine
+
+
+class RowError(ValueError):
+    pass
+
+
+PRODUCT_FIELDS = dict(
+    zip(
+        export.PRODUCTS_CSV_HEADER,
+        ("product_type_name", "product_name", "article", "min_partner_cost", "main_material_name"),
+    )
+)
+PRODUCT_WORKSHOP_FIELDS = dict(
+    zip(export.PRODUCT_WORKSHOPS_CSV_HEADER, ("product_name", "workshop_name", "coefficient"))
+)
+
+# маршруты ссылаются на продукт по наименованию, поэтому ключ загрузки — наименование;
+# артикул, занятый другим продуктом, даёт отказ по строке
+PRODUCTS_UPSERT = (
+    "INSERT INTO Products (product_name, article, min_partner_cost, product_type_name, main_material_name) "
+    "VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(product_name) DO UPDATE SET article = excluded.article, "
+    "min_partner_cost = excluded.min_partner_cost, product_type_name = excluded.product_type_name, "
+    "main_material_name = excluded.main_material_name"
+)
+PRODUCT_WORKSHOPS_UPSERT = (
+    "INSERT INTO ProductWorkshops (product_name, workshop_name, coefficient) VALUES (?, ?, ?) "
+    "ON CONFLICT(product_name, workshop_name) DO UPDATE SET coefficient = excluded.coefficient"
+)
+
+
+def parse_float(value: Optional[str], field: str) -> float:
+    # как _to_float в create_bd.py: "0,80%" -> 0.8
+    cleaned = (value or "").replace("%", "").replace(",", ".").strip()
+    try:
+        number = float(cleaned)
+    except ValueError:
+        raise RowError(f"{field}: не число ({value!r})")
+    if not math.isfinite(number):
+        raise RowError(f"{field}: не число ({value!r})")
+    return number
+
+
+def parse_int(value: Optional[str], field: str) -> int:
+    cleaned = (value or "").strip()
+    try:
+        return int(cleaned)
+    except ValueError:
+        number = parse_float(cleaned, field)
+        if not number.is_integer():
+            raise RowError(f"{field}: не целое число ({value!r})")
+        return int(number)
+
+
+def parse_name(value: Optional[str], field: str) -> str:
+    cleaned = (value or "").strip()
+    if not cleaned:
+        raise RowError(f"{field}: пустое значение")
+    return cleaned
+
+
+def parse_optional_name(value: Optional[str]) -> Optional[str]:
+    return (value or "").strip() or None
+
+
+def product_row(record: Dict[str, str]) -> Tuple:
+    article = parse_int(record.get("article"), "article")
+    if article < 0:
+        raise RowError("article: отрицательное значение")
+    return (
+        parse_name(record.get("product_name"), "product_name"),
+        article,
+        parse_float(record.get("min_partner_cost"), "min_partner_cost"),
+        parse_optional_name(record.get("product_type_name")),
+        parse_optional_name(record.get("main_material_name")),
+    )
+
+
+def product_workshop_row(record: Dict[str, str]) -> Tuple:
+    return (
+        parse_name(record.get("product_name"), "product_name"),
+        parse_name(record.get("workshop_name"), "workshop_name"),
+        parse_float(record.get("coefficient"), "coefficient"),
+    )
+
+
+async def csv_records(body: AsyncIterator[bytes], fields: Dict[str, str]) -> AsyncIterator[List[Tuple[int, Dict[str, str]]]]:
+    """Разобрать поток байтов в записи {поле: значение}; отдаёт пачки (номер строки, запись)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    columns: Optional[List[Optional[str]]] = None
+    line_no = 0
+
+    def parse(lines: List[str]) -> List[Tuple[int, Dict[str, str]]]:
+        nonlocal columns, line_no
+        batch = []
+        for values in csv.reader(lines, delimiter=";"):
+            line_no += 1
+            if columns is None:
+                columns = [fields.get(v.strip()) for v in values]
+                missing = set(fields.values()) - set(columns)
+                if missing:
+                    raise HTTPException(status_code=400, detail=f"В заголовке нет колонок: {', '.join(sorted(missing))}")
+                continue
+            if not any(v.strip() for v in values):
+                continue
+            batch.append((line_no, {c: v for c, v in zip(columns, values) if c}))
+        return batch
+
+    async for chunk in body:
+        text_chunk = tail + decoder.decode(chunk)
+        lines = text_chunk.split("\n")
+        tail = lines.pop()
+        if lines:
+            yield parse(lines)
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield parse([tail])
+
+
+def _write_chunk(sql: str, rows: List[Tuple], line_numbers: List[int], table: str) -> List[schemas.ImportReject]:
+    try:
+        with writer_engine.begin() as conn:
+            conn.exec_driver_sql(sql, rows)
+            conn.exec_driver_sql(migrations.PRUNE_CHANGES_SQL)
+            versions.bump(conn, table)
+        return []
+    except exc.IntegrityError:
+        pass
+    # в порции есть конфликтующая строка — повторяем построчно в точках сохранения
+    rejects = []
+    with writer_engine.begin() as conn:
+        for row, line in zip(rows, line_numbers):
+            try:
+                with conn.begin_nested():
+                    conn.exec_driver_sql(sql, row)
+            except exc.IntegrityError as e:
+                rejects.append(schemas.ImportReject(line=line, reason=str(e.orig)))
+        conn.exec_driver_sql(migrations.PRUNE_CHANGES_SQL)
+        versions.bump(conn, table)
+    return rejects
+
+
+def _existing_products(names: Iterable[str]) -> set:
+    names = list(set(names))
+    found = set()
+    with SessionLocal() as db:
+        # SQLite ограничивает число параметров в запросе
+        for i in range(0, len(names), 10000):
+            part = names[i : i + 10000]
+            found.update(db.execute(select(models.Product.product_name).where(models.Product.product_name.in_(part))).scalars())
+    return found
+
+
+def _reference_names() -> Tuple[set, set, set]:
+    with SessionLocal() as db:
+        return (
+            set(cache.type_coefficients(db)),
+            set(cache.loss_percentages(db)),
+            {name for name, _, _ in cache.workshops(db)},
+        )
+
+
+async def import_csv(
+    body: AsyncIterator[bytes],
+    table: str,
+    fields: Dict[str, str],
+    parse_row: Callable[[Dict[str, str]], Tuple],
+    check_refs: Callable[[List[Tuple]], List[Optional[str]]],
+    sql: str,
+) -> schemas.ImportReport:
+    report = schemas.ImportReport(table=table)
+
+    def reject(line: int, reason: str) -> None:
+        report.rejected += 1
+        if len(report.rejects) < config.IMPORT_MAX_REJECTS:
+            report.rejects.append(schemas.ImportReject(line=line, reason=reason))
+
+    pending: List[Tuple] = []
+    pending_lines: List[int] = []
+
+    async def flush() -> None:
+        if not pending:
+            return
+        problems = await run_in_threadpool(check_refs, pending)
+        rows, lines = [], []
+        for row, line, problem in zip(pending, pending_lines, problems):
+            if problem:
+                reject(line, problem)
+            else:
+                rows.append(row)
+                lines.append(line)
+        pending.clear()
+        pending_lines.clear()
+        if rows:
+            async with write_lock:
+                db_rejects = await run_in_threadpool(_write_chunk, sql, rows, lines, table)
+            for r in db_rejects:
+                reject(r.line, r.reason)
+            report.imported += len(rows) - len(db_rejects)
+
+    async for batch in csv_records(body, fields):
+        for line, record in batch:
+            report.rows += 1
+            try:
+                pending.append(parse_row(record))
+                pending_lines.append(line)
+            except RowError as e:
+                reject(line, str(e))
+            if len(pending) >= config.IMPORT_CHUNK_SIZE:
+                await flush()
+    await flush()
+    report.rejects.sort(key=lambda r: r.line)
+    return report
+
+
+async def import_products(body: AsyncIterator[bytes]) -> schemas.ImportReport:
+    types, materials, _ = await run_in_threadpool(_reference_names)
+
+    def check_refs(rows: List[Tuple]) -> List[Optional[str]]:
+        problems = []
+        for _, _, _, type_name, material_name in rows:
+            if type_name is not None and type_name not in types:
+                problems.append(f"product_type_name: неизвестный тип продукции {type_name!r}")
+            elif material_name is not None and material_name not in materials:
+                problems.append(f"main_material_name: неизвестный материал {material_name!r}")
+            else:
+                problems.append(None)
+        return problems
+
+    return await import_csv(body, "Products", PRODUCT_FIELDS, product_row, check_refs, PRODUCTS_UPSERT)
+
+
+async def import_product_workshops(body: AsyncIterator[bytes]) -> schemas.ImportReport:
+    _, _, workshops = await run_in_threadpool(_reference_names)
+
+    def check_refs(rows: List[Tuple]) -> List[Optional[str]]:
+        products = _existing_products(row[0] for row in rows)
+        problems = []
+        for product_name, workshop_name, _ in rows:
+            if product_name not in products:
+                problems.append(f"product_name: неизвестный продукт {product_name!r}")
+            elif workshop_name not in workshops:
+                problems.append(f"workshop_name: неизвестный цех {workshop_name!r}")
+            else:
+                problems.append(None)
+        return problems
+
+    return await import_csv(
+        body, "ProductWorkshops", PRODUCT_WORKSHOP_FIELDS, product_workshop_row, check_refs, PRODUCT_WORKSHOPS_UPSERT
+    )
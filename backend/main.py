@@ -1,17 +1,35 @@
-from fastapi import FastAPI, Depends, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from typing import List
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 from sqlalchemy.orm import Session
 import os
 
-from .database import get_db, engine
-from . import models, schemas
+from .database import get_db, get_write_db, writer_engine
+from . import cache, calc, changes, config, costs, crud, export, importer, metrics, migrations, models, scheduler, schemas, search, serialize, snapshot, sqlprofile, sweep, versions, workload
 
-models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Furniture Production API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # схема проверяется один раз при старте процесса, а не при импорте модуля:
+    # импорт остаётся дешёвым для воркеров и тестов. При актуальной версии
+    # это одно чтение PRAGMA user_version (backend/migrations.py); заодно
+    # обрезается журнал изменений, который пополняли записи через API
+    conn = writer_engine.raw_connection()
+    try:
+        migrations.migrate(conn.driver_connection)
+        migrations.prune_changes(conn.driver_connection)
+    finally:
+        conn.close()
+    if config.SNAPSHOT:
+        snapshot.refresh()
+    yield
+
+
+app = FastAPI(title="Furniture Production API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,7 +37,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", *sqlprofile.HEADERS],
 )
+if config.SQL_PROFILE:
+    app.add_middleware(sqlprofile.SQLProfileMiddleware)
+if config.METRICS_ENABLED:
+    # добавлен последним — внешний слой, видит и CORS, и 404
+    app.add_middleware(metrics.MetricsMiddleware)
+
+if config.DB_MODE == "async":
+    # асинхронные обработчики регистрируются первыми и перекрывают одноимённые синхронные
+    from .async_routes import router as async_router
+
+    app.include_router(async_router)
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 FRONTEND_DIR = os.path.join(BASE_DIR, "frontend")
@@ -33,28 +63,73 @@ def serve_index():
 
 
 @app.get("/products", response_model=List[schemas.ProductOut])
-def get_products(db: Session = Depends(get_db)):
-    products = db.query(models.Product).all()
-    out: List[schemas.ProductOut] = []
-    for p in products:
-        time_sum = sum(pw.coefficient for pw in p.workshops)
-        total_time = int(round(max(time_sum, 0)))
-        out.append(
-            schemas.ProductOut(
-                product_id=p.product_id,
-                product_name=p.product_name,
-                article=p.article,
-                min_partner_cost=p.min_partner_cost,
-                product_type_name=p.product_type_name,
-                main_material_name=p.main_material_name,
-                total_production_time=total_time,
-            )
-        )
-    return out
+def get_products(
+    request: Request,
+    response: Response,
+    product_type_name: Optional[str] = None,
+    main_material_name: Optional[str] = None,
+    min_cost: Optional[float] = None,
+    max_cost: Optional[float] = None,
+    article_prefix: Optional[str] = Query(None, max_length=crud.ARTICLE_MAX_DIGITS),
+    sort: str = "product_id",
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="поля ответа через запятую, по умолчанию все"),
+    db: Session = Depends(get_db),
+):
+    known = versions.current(db)
+    cached = versions.conditional(request, response, versions.make_etag(known, "Products", "ProductWorkshops"))
+    if cached:
+        return cached
+    selected = serialize.parse_fields(fields, serialize.PRODUCT_FIELDS)
+    filters = dict(
+        product_type_name=product_type_name,
+        main_material_name=main_material_name,
+        min_cost=min_cost,
+        max_cost=max_cost,
+        article_prefix=article_prefix,
+        sort=sort,
+        order=order,
+        limit=limit,
+        cursor=cursor,
+    )
+    snap = snapshot.get(known)
+    if snap is not None:
+        records, next_cursor = snap.products_page(selected, **filters)
+    else:
+        rows, next_cursor = crud.list_products(db, with_time="total_production_time" in selected, **filters)
+        records = serialize.product_records(rows, selected)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return serialize.json_response(records, response)
+
+
+@app.get("/products/search", response_model=List[schemas.ProductSearchOut])
+def search_products(
+    q: str = Query(..., max_length=200), limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)
+):
+    rows = []
+    for query in search.match_queries(q):
+        rows = db.execute(search.SEARCH_SQL, {"query": query}).all()
+        if len(rows) >= limit:
+            break
+    return search.rows_out(search.rank(rows, q, limit))
+
+
+@app.get("/products/{product_id}", response_model=schemas.ProductOut)
+def get_product(product_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = versions.not_modified(request, response, db, "Products", "ProductWorkshops")
+    if cached:
+        return cached
+    product = crud.get_product(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
 
 
 @app.post("/products", response_model=schemas.ProductOut)
-def create_product(product_in: schemas.ProductCreate, db: Session = Depends(get_db)):
+def create_product(product_in: schemas.ProductCreate, db: Session = Depends(get_write_db)):
     exists = db.query(models.Product).filter(models.Product.article == product_in.article).first()
     if exists:
         raise HTTPException(status_code=400, detail="Артикул уже существует")
@@ -67,24 +142,14 @@ def create_product(product_in: schemas.ProductCreate, db: Session = Depends(get_
         main_material_name=product_in.main_material_name,
     )
     db.add(product)
+    versions.bump(db, "Products")
     db.commit()
-    db.refresh(product)
-
-    time_sum = sum(pw.coefficient for pw in product.workshops)
-    total_time = int(round(max(time_sum, 0)))
-    return schemas.ProductOut(
-        product_id=product.product_id,
-        product_name=product.product_name,
-        article=product.article,
-        min_partner_cost=product.min_partner_cost,
-        product_type_name=product.product_type_name,
-        main_material_name=product.main_material_name,
-        total_production_time=total_time,
-    )
+    snapshot.after_write(db, product.product_id, "Products")
+    return crud.get_product(db, product.product_id)
 
 
 @app.put("/products/{product_id}", response_model=schemas.ProductOut)
-def update_product(product_id: int, product_in: schemas.ProductUpdate, db: Session = Depends(get_db)):
+def update_product(product_id: int, product_in: schemas.ProductUpdate, db: Session = Depends(get_write_db)):
     product = db.query(models.Product).filter(models.Product.product_id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -104,99 +169,178 @@ def update_product(product_id: int, product_in: schemas.ProductUpdate, db: Sessi
     product.product_type_name = product_in.product_type_name
     product.main_material_name = product_in.main_material_name
 
+    versions.bump(db, "Products")
     db.commit()
-    db.refresh(product)
-
-    time_sum = sum(pw.coefficient for pw in product.workshops)
-    total_time = int(round(max(time_sum, 0)))
-    return schemas.ProductOut(
-        product_id=product.product_id,
-        product_name=product.product_name,
-        article=product.article,
-        min_partner_cost=product.min_partner_cost,
-        product_type_name=product.product_type_name,
-        main_material_name=product.main_material_name,
-        total_production_time=total_time,
-    )
+    snapshot.after_write(db, product_id, "Products")
+    return crud.get_product(db, product.product_id)
 
 
 @app.delete("/products/{product_id}")
-def delete_product(product_id: int, db: Session = Depends(get_db)):
+def delete_product(product_id: int, db: Session = Depends(get_write_db)):
     product = db.query(models.Product).filter(models.Product.product_id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     db.delete(product)
+    versions.bump(db, "Products", "ProductWorkshops")
     db.commit()
+    snapshot.after_write(db, product_id, "Products", "ProductWorkshops")
     return {"detail": "Product deleted"}
 
 
+@app.get("/costs", response_model=List[schemas.ProductCostOut])
+async def get_costs(
+    request: Request,
+    response: Response,
+    hourly_rate: Optional[float] = Query(None, gt=0, description="ставка за чел.-час, по умолчанию FURNITURE_LABOR_RATE"),
+):
+    rollup = await costs.acurrent()
+    rate = config.LABOR_RATE if hourly_rate is None else hourly_rate
+    cached = versions.conditional(request, response, costs.etag(rollup, rate))
+    if cached:
+        return cached
+    return serialize.json_response(await run_in_threadpool(costs.records, rollup, rate), response)
+
+
+@app.get("/products/{product_id}/cost", response_model=schemas.ProductCostOut)
+async def get_product_cost(
+    product_id: int, request: Request, response: Response, hourly_rate: Optional[float] = Query(None, gt=0)
+):
+    rollup = await costs.acurrent()
+    rate = config.LABOR_RATE if hourly_rate is None else hourly_rate
+    cached = versions.conditional(request, response, costs.etag(rollup, rate))
+    if cached:
+        return cached
+    record = costs.record(rollup, product_id, rate)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return record
+
+
+@app.get("/changes", response_model=schemas.ProductChangesOut)
+def get_changes(
+    since: Optional[int] = Query(None, ge=0, description="seq из прошлого ответа; без него — reset"),
+    db: Session = Depends(get_db),
+):
+    return changes.read(db, since)
+
+
+@app.get("/changes/stream")
+async def stream_changes(request: Request, since: Optional[int] = Query(None, ge=0)):
+    # EventSource после обрыва сам присылает id последнего события
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        changes.events(request, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @app.get("/products/{product_id}/workshops", response_model=List[schemas.WorkshopOut])
-def get_product_workshops(product_id: int, db: Session = Depends(get_db)):
+def get_product_workshops(product_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    known = versions.current(db)
+    cached = versions.conditional(
+        request, response, versions.make_etag(known, "Products", "ProductWorkshops", "Workshops")
+    )
+    if cached:
+        return cached
+    snap = snapshot.get(known)
+    if snap is not None:
+        workshops = snap.workshops_of(product_id)
+        if workshops is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return serialize.json_response(workshops, response)
     product = db.query(models.Product).filter(models.Product.product_id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    out: List[schemas.WorkshopOut] = []
-    for pw in product.workshops:
-        out.append(
-            schemas.WorkshopOut(
-                workshop_name=pw.workshop.workshop_name,
-                workshop_type=pw.workshop.workshop_type,
-                num_employees=pw.workshop.num_employees,
-                time_in_workshop=pw.coefficient,
-            )
-        )
-    return out
+    return crud.workshops_out(db.execute(crud.product_workshops_select(product.product_name)))
 
 
 @app.get("/products/{product_id}/production_time")
 def get_production_time(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(models.Product).filter(models.Product.product_id == product_id).first()
-    if not product:
+    snap = snapshot.get(versions.current(db)) if config.SNAPSHOT else None
+    if snap is not None:
+        total = snap.production_time(product_id)
+    else:
+        product = crud.get_product(db, product_id)
+        total = product.total_production_time if product else None
+    if total is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    total = int(round(max(sum(pw.coefficient for pw in product.workshops), 0)))
     return {"product_id": product_id, "total_production_time": total}
 
 
 @app.get("/product-types", response_model=List[schemas.ProductTypeOut])
-def get_product_types(db: Session = Depends(get_db)):
-    types = db.query(models.ProductType).all()
-    return [schemas.ProductTypeOut(product_type_name=t.product_type_name) for t in types]
+def get_product_types(request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = versions.not_modified(request, response, db, "ProductTypes")
+    if cached:
+        return cached
+    return [schemas.ProductTypeOut(product_type_name=name) for name, _ in cache.product_types(db)]
 
 
 @app.get("/materials", response_model=List[schemas.MaterialOut])
-def get_materials(db: Session = Depends(get_db)):
-    materials = db.query(models.Material).all()
-    return [schemas.MaterialOut(material_name=m.material_name) for m in materials]
+def get_materials(request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = versions.not_modified(request, response, db, "Materials")
+    if cached:
+        return cached
+    return [schemas.MaterialOut(material_name=name) for name, _ in cache.materials(db)]
 
 
 @app.get("/all-product-types", response_model=List[schemas.ProductTypeFullOut])
-def get_all_product_types(db: Session = Depends(get_db)):
-    types = db.query(models.ProductType).all()
-    return [schemas.ProductTypeFullOut(product_type_name=t.product_type_name, type_coefficient=t.type_coefficient) for t in types]
+def get_all_product_types(request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = versions.not_modified(request, response, db, "ProductTypes")
+    if cached:
+        return cached
+    return [schemas.ProductTypeFullOut(product_type_name=name, type_coefficient=coef) for name, coef in cache.product_types(db)]
 
 
 @app.get("/all-materials", response_model=List[schemas.MaterialFullOut])
-def get_all_materials(db: Session = Depends(get_db)):
-    materials = db.query(models.Material).all()
-    return [schemas.MaterialFullOut(material_name=m.material_name, loss_percentage=m.loss_percentage) for m in materials]
+def get_all_materials(request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = versions.not_modified(request, response, db, "Materials")
+    if cached:
+        return cached
+    return [schemas.MaterialFullOut(material_name=name, loss_percentage=loss) for name, loss in cache.materials(db)]
 
 
 @app.get("/all-workshops", response_model=List[schemas.WorkshopFullOut])
-def get_all_workshops(db: Session = Depends(get_db)):
-    workshops = db.query(models.Workshop).all()
-    return [schemas.WorkshopFullOut(workshop_name=w.workshop_name, workshop_type=w.workshop_type, num_employees=w.num_employees) for w in workshops]
+def get_all_workshops(request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = versions.not_modified(request, response, db, "Workshops")
+    if cached:
+        return cached
+    return [
+        schemas.WorkshopFullOut(workshop_name=name, workshop_type=w_type, num_employees=employees)
+        for name, w_type, employees in cache.workshops(db)
+    ]
 
 
 @app.get("/all-product-workshops", response_model=List[schemas.ProductWorkshopOut])
-def get_all_product_workshops(db: Session = Depends(get_db)):
-    pw_list = db.query(models.ProductWorkshop).all()
-    return [schemas.ProductWorkshopOut(product_name=pw.product_name, workshop_name=pw.workshop_name, coefficient=pw.coefficient) for pw in pw_list]
+def get_all_product_workshops(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="поля ответа через запятую, по умолчанию все"),
+    db: Session = Depends(get_db),
+):
+    cached = versions.not_modified(request, response, db, "ProductWorkshops")
+    if cached:
+        return cached
+    selected = serialize.parse_fields(fields, serialize.PRODUCT_WORKSHOP_FIELDS)
+    rows = db.execute(crud.PRODUCT_WORKSHOPS_SELECT).all()
+    return serialize.json_response(serialize.records(rows, selected), response)
 
 
 @app.get("/product-workshops/{product_id}", response_model=List[schemas.ProductWorkshopOut])
-def get_product_workshops_by_id(product_id: int, db: Session = Depends(get_db)):
+def get_product_workshops_by_id(product_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    known = versions.current(db)
+    cached = versions.conditional(request, response, versions.make_etag(known, "Products", "ProductWorkshops"))
+    if cached:
+        return cached
+    snap = snapshot.get(known)
+    if snap is not None:
+        routes = snap.routes_of(product_id)
+        if routes is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return serialize.json_response(routes, response)
     product = db.query(models.Product).filter(models.Product.product_id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -206,23 +350,92 @@ def get_product_workshops_by_id(product_id: int, db: Session = Depends(get_db)):
 
 @app.post("/calculate_raw_material", response_model=schemas.RawMaterialResponse)
 def calculate_raw_material(req: schemas.RawMaterialRequest, db: Session = Depends(get_db)):
-    product_type = (
-        db.query(models.ProductType)
-        .filter(models.ProductType.product_type_name == req.product_type_name)
-        .first()
-    )
-    material = (
-        db.query(models.Material)
-        .filter(models.Material.material_name == req.material_name)
-        .first()
-    )
-    if not product_type or not material:
+    type_coefficient = cache.type_coefficients(db).get(req.product_type_name)
+    loss_percentage = cache.loss_percentages(db).get(req.material_name)
+    if type_coefficient is None or loss_percentage is None:
         return schemas.RawMaterialResponse(required_raw_material=-1)
 
-    base_per_unit = req.param1 * req.param2 * product_type.type_coefficient
+    base_per_unit = req.param1 * req.param2 * type_coefficient
     total_base = base_per_unit * req.quantity
-    loss_coeff = 1 + material.loss_percentage / 100.0
+    loss_coeff = 1 + loss_percentage / 100.0
     total_with_loss = total_base * loss_coeff
     required_raw = int(round(max(total_with_loss, 0)))
     return schemas.RawMaterialResponse(required_raw_material=required_raw)
 
+
+@app.post("/calculate_raw_material/batch", response_model=List[schemas.RawMaterialResponse])
+def calculate_raw_material_batch(lines: List[schemas.RawMaterialRequest], db: Session = Depends(get_db)):
+    results = calc.raw_material_batch(lines, cache.type_coefficients(db), cache.loss_percentages(db))
+    return [schemas.RawMaterialResponse(required_raw_material=r) for r in results]
+
+
+@app.post("/calculate_raw_material/sweep", response_model=schemas.RawMaterialSweepResponse)
+def calculate_raw_material_sweep(req: schemas.RawMaterialSweepRequest, db: Session = Depends(get_db)):
+    return sweep.response(sweep.grid(req, cache.type_coefficients(db), cache.loss_percentages(db)))
+
+
+@app.post("/schedule", response_model=schemas.ScheduleResponse)
+def schedule_orders(req: schemas.ScheduleRequest, db: Session = Depends(get_db)):
+    routes = scheduler.load_routes(db, {o.product_id for o in req.orders})
+    return scheduler.render(scheduler.schedule(req, routes))
+
+
+@app.post("/workload", response_model=schemas.WorkloadResponse)
+def get_workload(req: schemas.WorkloadRequest, db: Session = Depends(get_db)):
+    products, quantities = workload.product_quantities(req.orders)
+    rows = db.execute(crud.workload_select(products, quantities)).all()
+    return workload.workload(rows, req.horizon_hours)
+
+
+@app.post("/mrp", response_model=schemas.MRPResponse)
+def material_requirements(req: schemas.MRPRequest, db: Session = Depends(get_db)):
+    orders = calc.order_arrays(req.orders)
+    key = calc.order_key(orders) + versions.etag(db, "ProductTypes", "Materials", "Products")
+    products = calc.order_products(orders)
+    return cache.mrp_cache.get_or_load(
+        key, lambda: calc.material_requirements(orders, db.execute(crud.material_select(products)).all())
+    )
+
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    return cache.reference_cache.stats()
+
+
+if config.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _export_response(body, name: str, fmt: str) -> StreamingResponse:
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}_export.{fmt}"'},
+    )
+
+
+@app.get("/export/products")
+def export_products(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    return _export_response(export.products_stream(format), "Products", format)
+
+
+@app.get("/export/product-workshops")
+def export_product_workshops(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    return _export_response(export.product_workshops_stream(format), "Product_workshops", format)
+
+
+# тело запроса — сам CSV-файл (как data/*_import.csv), читается потоком
+@app.post("/import/products", response_model=schemas.ImportReport)
+async def import_products(request: Request):
+    return await importer.import_products(request.stream())
+
+
+@app.post("/import/product-workshops", response_model=schemas.ImportReport)
+async def import_product_workshops(request: Request):
+    return await importer.import_product_workshops(request.stream())
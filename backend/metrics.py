@@ -0,0 +1,232 @@
+"""
+Метрики приложения в текстовом формате Prometheus (GET /metrics).
+
+Запросы считает ASGI-middleware: число и длительность по маршруту (шаблон
+пути, а не сам путь, чтобы не раздувать число меток), размер ответа и число
+запросов в работе. База: выдачи соединений из пула и их текущее число,
+ожидание слота чтения / замка записи, ожидание BEGIN IMMEDIATE (блокировка
+SQLite между процессами) и ошибки database is locked/busy.
+
+Сбор — словарь и bisect под коротким замком, порядка микросекунд на запрос
+(python -m benchmarks.metrics_overhead).
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.buckets = tuple(buckets)
+        # по каждому набору меток: счётчики корзин (последняя — +Inf), сумма
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(counts), total) for k, (counts, total) in self._values.items()]
+        out = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = 'le="' + (bound if bound == "+Inf" else _number(float(bound))) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            out.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Функция, обновляющая датчики перед выдачей /metrics."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            fn()
+        lines = []
+        for m in self._metrics:
+            lines.append(f"# HELP {m.name} {m.doc}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+requests_total = registry.add(
+    Counter("http_requests_total", "Число HTTP-запросов.", ("method", "route", "status"))
+)
+request_duration = registry.add(
+    Histogram("http_request_duration_seconds", "Длительность обработки запроса.", ("method", "route"))
+)
+response_size = registry.add(
+    Histogram("http_response_size_bytes", "Размер тела ответа.", ("method", "route"), SIZE_BUCKETS)
+)
+in_flight = registry.add(Gauge("http_requests_in_flight", "Запросов в работе."))
+in_flight.set(value=0)
+
+pool_checkouts = registry.add(Counter("db_pool_checkouts_total", "Выдачи соединений из пула.", ("engine",)))
+pool_checked_out = registry.add(Gauge("db_pool_checked_out", "Соединений выдано сейчас.", ("engine",)))
+pool_size = registry.add(Gauge("db_pool_size", "Постоянный размер пула.", ("engine",)))
+pool_overflow = registry.add(Gauge("db_pool_overflow", "Соединений сверх pool_size сейчас.", ("engine",)))
+session_wait = registry.add(
+    Histogram("db_session_wait_seconds", "Ожидание слота чтения или замка записи.", ("kind",))
+)
+begin_wait = registry.add(
+    Histogram("sqlite_begin_immediate_seconds", "Ожидание блокировки записи SQLite (BEGIN IMMEDIATE).", ("engine",))
+)
+busy_errors = registry.add(
+    Counter("sqlite_busy_errors_total", "Ошибки database is locked/busy после busy_timeout.", ("engine",))
+)
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Подписать метрики на события пула и соединений движка (для async — sync_engine)."""
+    pool = engine.pool
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_checkouts.inc(name)
+
+    @event.listens_for(engine, "handle_error")
+    def _busy(context):
+        text = str(context.original_exception).lower()
+        if "locked" in text or "busy" in text:
+            busy_errors.inc(name)
+
+    @registry.collector
+    def _pool_state():
+        if hasattr(pool, "checkedout"):
+            pool_checked_out.set(name, value=pool.checkedout())
+            pool_size.set(name, value=pool.size())
+            pool_overflow.set(name, value=max(pool.overflow(), 0))
+
+
+def instrument_writer(engine, name: str) -> None:
+    """Замерять BEGIN IMMEDIATE: в нём SQLite ждёт чужого писателя до busy_timeout."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if statement == "BEGIN IMMEDIATE":
+            conn.info["begin_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("begin_started", None) if statement == "BEGIN IMMEDIATE" else None
+        if started is not None:
+            begin_wait.observe(time.perf_counter() - started, name)
+
+
+def _route_label(scope, root_path: str) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mount (например /static) не кладёт маршрут в scope, но сдвигает root_path
+    mounted = scope.get("root_path", "")
+    if mounted != root_path:
+        return mounted[len(root_path):] + "/{path}"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        root_path = scope.get("root_path", "")
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight.inc(amount=1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.inc(amount=-1)
+            method = scope["method"]
+            route = _route_label(scope, root_path)
+            requests_total.inc(method, route, status)
+            request_duration.observe(elapsed, method, route)
+            response_size.observe(size, method, route)
@@ -0,0 +1,364 @@
+"""
+Версионные миграции схемы SQLite.
+
+Номер последней применённой миграции хранится в PRAGMA user_version — в
+заголовке файла базы. Миграции применяются по порядку, каждая один раз, в
+одной транзакции BEGIN IMMEDIATE вместе с новым номером: воркеры run.py --prod
+стартуют одновременно, первый обновляет схему, остальные ждут блокировку и
+видят уже актуальную версию. Если версия актуальна, проверка — одно чтение
+заголовка, без обращения к sqlite_master.
+
+Схему применяют: приложение при старте (lifespan в main.py), run.py перед
+запуском сервера, create_bd.py перед загрузкой CSV и вручную
+
+    python -m backend.migrations [--db PATH] [--status]
+
+Базы, созданные до миграций, имеют версию 0 и проходят все шаги: шаги
+идемпотентны, существующие таблицы и данные не меняются. Модуль зависит
+только от sqlite3, чтобы run.py и create_bd.py не загружали приложение.
+Новую миграцию добавляют в конец MIGRATIONS; менять применённые нельзя.
+"""
+import argparse
+import sqlite3
+import time
+from typing import Callable, List, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ProductTypes (
+    product_type_name TEXT PRIMARY KEY,
+    type_coefficient REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Materials (
+    material_name TEXT PRIMARY KEY,
+    loss_percentage REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Workshops (
+    workshop_name TEXT PRIMARY KEY,
+    workshop_type TEXT NOT NULL,
+    num_employees INTEGER NOT NULL,
+    process_order INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS Products (
+    product_id INTEGER PRIMARY KEY,
+    product_name TEXT NOT NULL UNIQUE,
+    article INTEGER UNIQUE NOT NULL,
+    min_partner_cost REAL NOT NULL,
+    product_type_name TEXT,
+    main_material_name TEXT,
+    FOREIGN KEY (product_type_name) REFERENCES ProductTypes(product_type_name) ON DELETE RESTRICT,
+    FOREIGN KEY (main_material_name) REFERENCES Materials(material_name) ON DELETE RESTRICT
+);
+
+CREATE TABLE IF NOT EXISTS ProductWorkshops (
+    product_name TEXT NOT NULL,
+    workshop_name TEXT NOT NULL,
+    coefficient REAL NOT NULL,
+    PRIMARY KEY (product_name, workshop_name),
+    FOREIGN KEY (product_name) REFERENCES Products(product_name) ON DELETE CASCADE,
+    FOREIGN KEY (workshop_name) REFERENCES Workshops(workshop_name) ON DELETE RESTRICT
+);
+
+CREATE TABLE IF NOT EXISTS DataVersions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ImportFiles (
+    file_name TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+"""
+
+# фильтры и сортировки /products: равенство по типу/материалу + диапазон цены
+PRODUCT_INDEXES = """
+CREATE INDEX IF NOT EXISTS ix_products_type_cost ON Products (product_type_name, min_partner_cost);
+CREATE INDEX IF NOT EXISTS ix_products_material_cost ON Products (main_material_name, min_partner_cost);
+CREATE INDEX IF NOT EXISTS ix_products_cost ON Products (min_partner_cost);
+CREATE INDEX IF NOT EXISTS ix_products_type_id ON Products (product_type_name, product_id);
+CREATE INDEX IF NOT EXISTS ix_products_material_id ON Products (main_material_name, product_id);
+"""
+
+# таблицы с версией для ETag (backend/versions.py)
+VERSIONED_TABLES = ("ProductTypes", "Materials", "Workshops", "Products", "ProductWorkshops")
+
+# полнотекстовый поиск (backend/search.py): внешняя FTS5-таблица над Products
+# и триггеры, которые держат её в актуальном состоянии при любой записи
+SEARCH_TRIGGERS = ("products_search_insert", "products_search_delete", "products_search_update")
+SEARCH = """
+CREATE VIRTUAL TABLE IF NOT EXISTS ProductSearch USING fts5(
+    product_name, article, product_type_name,
+    content='Products', content_rowid='product_id',
+    tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4 5 6 7 8'
+);
+
+CREATE TRIGGER IF NOT EXISTS products_search_insert AFTER INSERT ON Products BEGIN
+    INSERT INTO ProductSearch (rowid, product_name, article, product_type_name)
+    VALUES (new.product_id, new.product_name, new.article, new.product_type_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_search_delete AFTER DELETE ON Products BEGIN
+    INSERT INTO ProductSearch (ProductSearch, rowid, product_name, article, product_type_name)
+    VALUES ('delete', old.product_id, old.product_name, old.article, old.product_type_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_search_update AFTER UPDATE ON Products BEGIN
+    INSERT INTO ProductSearch (ProductSearch, rowid, product_name, article, product_type_name)
+    VALUES ('delete', old.product_id, old.product_name, old.article, old.product_type_name);
+    INSERT INTO ProductSearch (rowid, product_name, article, product_type_name)
+    VALUES (new.product_id, new.product_name, new.article, new.product_type_name);
+END;
+"""
+
+# журнал изменений продукции (backend/changes.py): номер изменения и product_id,
+# NULL — сброс (полная перезаливка); маршрут — изменение своего продукта,
+# обновления без изменений не пишутся. seq без AUTOINCREMENT (лишняя запись в
+# sqlite_sequence на каждую строку импорта): последняя запись не удаляется,
+# поэтому max(seq) только растёт. Журнал обрезается до CHANGES_RETENTION записей
+# после порций импорта и при старте, а не триггером на каждую строку
+CHANGES_RETENTION = 100_000
+CHANGES_TRIGGERS = (
+    "products_changes_insert", "products_changes_update", "products_changes_delete",
+    "routes_changes_insert", "routes_changes_update", "routes_changes_delete",
+)
+PRUNE_CHANGES_SQL = (
+    f"DELETE FROM ProductChanges WHERE seq <= (SELECT max(seq) FROM ProductChanges) - {CHANGES_RETENTION}"
+)
+CHANGES = """
+CREATE TABLE IF NOT EXISTS ProductChanges (
+    seq INTEGER PRIMARY KEY,
+    product_id INTEGER
+);
+
+CREATE TRIGGER IF NOT EXISTS products_changes_insert AFTER INSERT ON Products BEGIN
+    INSERT INTO ProductChanges (product_id) VALUES (new.product_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_changes_update AFTER UPDATE ON Products
+WHEN old.product_id IS NOT new.product_id OR old.product_name IS NOT new.product_name
+    OR old.article IS NOT new.article OR old.min_partner_cost IS NOT new.min_partner_cost
+    OR old.product_type_name IS NOT new.product_type_name
+    OR old.main_material_name IS NOT new.main_material_name BEGIN
+    INSERT INTO ProductChanges (product_id) SELECT old.product_id WHERE old.product_id != new.product_id;
+    INSERT INTO ProductChanges (product_id) VALUES (new.product_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_changes_delete AFTER DELETE ON Products BEGIN
+    INSERT INTO ProductChanges (product_id) VALUES (old.product_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS routes_changes_insert AFTER INSERT ON ProductWorkshops BEGIN
+    INSERT INTO ProductChanges (product_id) SELECT product_id FROM Products WHERE product_name = new.product_name;
+END;
+
+CREATE TRIGGER IF NOT EXISTS routes_changes_update AFTER UPDATE ON ProductWorkshops
+WHEN old.product_name IS NOT new.product_name OR old.workshop_name IS NOT new.workshop_name
+    OR old.coefficient IS NOT new.coefficient BEGIN
+    INSERT INTO ProductChanges (product_id)
+    SELECT product_id FROM Products WHERE product_name = old.product_name AND old.product_name != new.product_name;
+    INSERT INTO ProductChanges (product_id) SELECT product_id FROM Products WHERE product_name = new.product_name;
+END;
+
+CREATE TRIGGER IF NOT EXISTS routes_changes_delete AFTER DELETE ON ProductWorkshops BEGIN
+    INSERT INTO ProductChanges (product_id) SELECT product_id FROM Products WHERE product_name = old.product_name;
+END;
+"""
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+def _execute_script(conn: sqlite3.Connection, script: str) -> None:
+    # executescript() сначала фиксирует открытую транзакцию, поэтому
+    # операторы выполняются по одному внутри транзакции миграции
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+
+
+def _base_tables(conn: sqlite3.Connection) -> None:
+    _execute_script(conn, SCHEMA)
+
+
+def _product_indexes(conn: sqlite3.Connection) -> None:
+    _execute_script(conn, PRODUCT_INDEXES)
+
+
+def _data_versions(conn: sqlite3.Connection) -> None:
+    # начальное значение — время в мс: пересозданная база не выдаст старый ETag
+    initial = time.time_ns() // 1_000_000
+    conn.executemany(
+        "INSERT OR IGNORE INTO DataVersions (table_name, version) VALUES (?, ?)",
+        [(table, initial) for table in VERSIONED_TABLES],
+    )
+
+
+def _all_present(conn: sqlite3.Connection, names: Tuple[str, ...]) -> bool:
+    present = conn.execute(
+        f"SELECT count(*) FROM sqlite_master WHERE name IN ({', '.join('?' * len(names))})", names
+    ).fetchone()[0]
+    return present == len(names)
+
+
+def _product_search(conn: sqlite3.Connection) -> None:
+    if _all_present(conn, ("ProductSearch", *SEARCH_TRIGGERS)):
+        return
+    # без триггеров индекс мог отстать от Products — перестраивается целиком
+    _execute_script(conn, SEARCH)
+    conn.execute("INSERT INTO ProductSearch (ProductSearch) VALUES ('rebuild')")
+
+
+def _unique_product_name(conn: sqlite3.Connection) -> None:
+    # в части старых баз Products создан без UNIQUE на product_name, а на нём
+    # держится внешний ключ ProductWorkshops -> Products
+    unique = any(
+        index[2] and [column[2] for column in conn.execute(f"PRAGMA index_info('{index[1]}')")] == ["product_name"]
+        for index in conn.execute("PRAGMA index_list('Products')")
+    )
+    if not unique:
+        duplicates = [
+            row[0]
+            for row in conn.execute(
+                "SELECT product_name FROM Products GROUP BY product_name HAVING count(*) > 1 LIMIT 20"
+            )
+        ]
+        if duplicates:
+            raise MigrationError(f"Повторяющиеся наименования продукции: {duplicates}")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_products_name ON Products (product_name)")
+    # индекс по product_id из прежнего create_all повторяет rowid и только замедляет запись
+    conn.execute('DROP INDEX IF EXISTS "ix_Products_product_id"')
+
+
+def _process_order(conn: sqlite3.Connection) -> None:
+    # порядок техпроцесса (backend/scheduler.py) в базе, созданной до колонки
+    if "process_order" in {row[1] for row in conn.execute("PRAGMA table_info(Workshops)")}:
+        return
+    conn.execute("ALTER TABLE Workshops ADD COLUMN process_order INTEGER")
+    # до колонки маршрут шёл в порядке строк таблицы; цеха, добавленные
+    # --incremental, стоят в нём последними, поэтому файл цехов сравнивается
+    # заново и следующая синхронизация create_bd.py берёт порядок из CSV
+    conn.execute("UPDATE Workshops SET process_order = rowid")
+    conn.execute("DELETE FROM ImportFiles WHERE file_name = 'Workshops_import.csv'")
+
+
+def _product_changes(conn: sqlite3.Connection) -> None:
+    if _all_present(conn, ("ProductChanges", *CHANGES_TRIGGERS)):
+        return
+    _execute_script(conn, CHANGES)
+    # без триггеров изменения могли пройти мимо журнала — клиентам нужен сброс
+    conn.execute("INSERT INTO ProductChanges (product_id) VALUES (NULL)")
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "таблицы каталога, DataVersions, ImportFiles", _base_tables),
+    (2, "индексы фильтров /products", _product_indexes),
+    (3, "начальные версии таблиц для ETag", _data_versions),
+    (4, "полнотекстовый поиск ProductSearch", _product_search),
+    (5, "уникальное наименование продукции", _unique_product_name),
+    (6, "порядок техпроцесса Workshops.process_order", _process_order),
+    (7, "журнал изменений продукции ProductChanges", _product_changes),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> Tuple[int, int]:
+    """Применить недостающие миграции; возвращает (версия до, версия после).
+    Вызывается вне транзакции."""
+    before = current_version(conn)
+    if before == LATEST:
+        return before, before
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # пока ждали блокировку, схему мог обновить другой процесс
+        before = current_version(conn)
+        if before > LATEST:
+            raise MigrationError(f"Версия схемы базы {before} новее приложения ({LATEST})")
+        for number, _, apply in MIGRATIONS:
+            if number > before:
+                apply(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return before, LATEST
+
+
+def drop_triggers(conn: sqlite3.Connection) -> None:
+    """Снять триггеры поиска и журнала изменений на время полной перезаливки
+    (create_bd.py): триггер на каждую строку заметно медленнее, чем один
+    проход create_triggers() после загрузки. Версия схемы не меняется."""
+    for trigger in (*SEARCH_TRIGGERS, *CHANGES_TRIGGERS):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.commit()
+
+
+def create_triggers(conn: sqlite3.Connection) -> None:
+    """Вернуть недостающие триггеры поиска и журнала: индекс поиска
+    перестраивается целиком, в журнал пишется сброс. Если всё на месте —
+    ничего не делает, поэтому годится и для починки после прерванной
+    перезаливки."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _product_search(conn)
+        _product_changes(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def prune_changes(conn: sqlite3.Connection) -> None:
+    conn.execute(PRUNE_CHANGES_SQL)
+    conn.commit()
+
+
+def upgrade(path: str, timeout: float = 30.0) -> Tuple[int, int]:
+    """migrate() для файла базы; timeout — ожидание блокировки другого процесса, с."""
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Миграции схемы базы")
+    parser.add_argument("--db", help="файл базы; по умолчанию из FURNITURE_DATABASE_URL")
+    parser.add_argument("--status", action="store_true", help="только показать версию схемы")
+    args = parser.parse_args(argv)
+
+    path = args.db
+    if path is None:
+        from sqlalchemy.engine import make_url
+
+        from . import config
+
+        path = make_url(config.DATABASE_URL).database
+    if args.status:
+        conn = sqlite3.connect(path)
+        try:
+            version = current_version(conn)
+        finally:
+            conn.close()
+        pending = [f"  {number}: {title}" for number, title, _ in MIGRATIONS if number > version]
+        print(f"{path}: версия схемы {version}, последняя {LATEST}")
+        if pending:
+            print("Не применены:\n" + "\n".join(pending))
+        return
+    before, after = upgrade(path)
+    print(f"{path}: версия схемы {before} -> {after}" if before != after else f"{path}: схема актуальна ({after})")
+
+
+if __name__ == "__main__":
+    main()
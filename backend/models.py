@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -27,6 +27,9 @@ class Workshop(Base):
     workshop_name = Column(String, primary_key=True)
     workshop_type = Column(String, nullable=False)
     num_employees = Column(Integer, nullable=False)
+    # место цеха в техпроцессе (номер строки в Workshops_import.csv): маршрут
+    # продукта проходит его цеха по возрастанию
+    process_order = Column(Integer)
 
     product_workshops = relationship("ProductWorkshop", back_populates="workshop")
 
@@ -34,7 +37,7 @@ class Workshop(Base):
 class Product(Base):
     __tablename__ = "Products"
 
-    product_id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, primary_key=True)
     product_name = Column(String, nullable=False, unique=True)
     article = Column(Integer, nullable=False, unique=True)
     min_partner_cost = Column(Float, nullable=False)
@@ -43,7 +46,17 @@ class Product(Base):
 
     product_type = relationship("ProductType", back_populates="products")
     material = relationship("Material", back_populates="products")
-    workshops = relationship("ProductWorkshop", back_populates="product")
+    # маршруты удаляются вместе с продуктом (в схеме backend/migrations.py — ON DELETE CASCADE)
+    workshops = relationship("ProductWorkshop", back_populates="product", cascade="all, delete-orphan")
+
+    # фильтры и сортировки /products: равенство по типу/материалу + диапазон цены
+    __table_args__ = (
+        Index("ix_products_type_cost", "product_type_name", "min_partner_cost"),
+        Index("ix_products_material_cost", "main_material_name", "min_partner_cost"),
+        Index("ix_products_cost", "min_partner_cost"),
+        Index("ix_products_type_id", "product_type_name", "product_id"),
+        Index("ix_products_material_id", "main_material_name", "product_id"),
+    )
 
 
 class ProductWorkshop(Base):
@@ -56,3 +69,18 @@ class ProductWorkshop(Base):
     product = relationship("Product", back_populates="workshops")
     workshop = relationship("Workshop", back_populates="product_workshops")
 
+
+
+class ProductChange(Base):
+    # пишется триггерами (backend/migrations.py); product_id NULL — сброс
+    __tablename__ = "ProductChanges"
+
+    seq = Column(Integer, primary_key=True)
+    product_id = Column(Integer)
+
+
+class DataVersion(Base):
+    __tablename__ = "DataVersions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
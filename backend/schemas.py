@@ -1,5 +1,6 @@
-from typing import Optional, List
-from pydantic import BaseModel, conint, PositiveFloat
+from datetime import datetime
+from typing import Literal, Optional, List, Union
+from pydantic import BaseModel, confloat, conint, PositiveFloat
 
 
 
@@ -27,6 +28,36 @@ class ProductOut(ProductBase):
         from_attributes = True
 
 
+class ProductChangesOut(BaseModel):
+    # номер последнего изменения: его передают в следующий since
+    seq: int
+    # true — журнал не покрывает since (или была перезаливка): перечитать /products
+    reset: bool
+    products: List[ProductOut] = []
+    deleted: List[int] = []
+
+
+class ProductCostOut(BaseModel):
+    product_id: int
+    product_name: str
+    min_partner_cost: float
+    # null — у продукта нет типа или материала, считается 1 и 0 %
+    type_coefficient: Optional[float] = None
+    loss_percentage: Optional[float] = None
+    material_cost: float
+    # часы в цехах маршрута × сотрудников цеха
+    labor_hours: float
+    labor_cost: float
+    total_cost: float
+
+
+class ProductSearchOut(BaseModel):
+    product_id: int
+    product_name: str
+    article: int
+    product_type_name: Optional[str] = None
+
+
 
 class WorkshopOut(BaseModel):
     workshop_name: str
@@ -51,6 +82,41 @@ class RawMaterialResponse(BaseModel):
     required_raw_material: int
 
 
+# диапазоны перебора — от start до stop включительно с шагом step
+class QuantityRange(BaseModel):
+    start: conint(ge=0)
+    stop: conint(ge=0)
+    step: conint(ge=1) = 1
+
+
+class ParamRange(BaseModel):
+    start: PositiveFloat
+    stop: PositiveFloat
+    step: PositiveFloat
+
+
+class RawMaterialSweepRequest(BaseModel):
+    # None — все типы продукции и материалы справочников
+    product_type_names: Optional[List[str]] = None
+    material_names: Optional[List[str]] = None
+    quantity: Union[QuantityRange, List[conint(ge=0)]]
+    param1: Union[ParamRange, List[PositiveFloat]]
+    param2: Union[ParamRange, List[PositiveFloat]]
+
+
+class RawMaterialSweepResponse(BaseModel):
+    product_type_names: List[str]
+    material_names: List[str]
+    quantity: List[int]
+    param1: List[float]
+    param2: List[float]
+    # размеры осей в порядке тип, материал, quantity, param1, param2
+    shape: List[int]
+    # плоская сетка по shape, последняя ось меняется быстрее всех; -1 — тип
+    # или материал не найдены
+    required_raw_material: List[int]
+
+
 
 class ProductTypeOut(BaseModel):
     product_type_name: str
@@ -99,3 +165,122 @@ class ProductWorkshopOut(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class ImportReject(BaseModel):
+    line: int
+    reason: str
+
+
+class ImportReport(BaseModel):
+    table: str
+    rows: int = 0
+    imported: int = 0
+    rejected: int = 0
+    rejects: List[ImportReject] = []
+
+
+class ScheduleOrder(BaseModel):
+    product_id: int
+    quantity: conint(ge=1)
+    due_date: datetime
+
+
+class ScheduleRequest(BaseModel):
+    orders: List[ScheduleOrder]
+    # начало планирования; по умолчанию — текущий момент
+    start: Optional[datetime] = None
+    # рабочих часов в сутках: часы плана переводятся в календарь по этому графику
+    hours_per_day: confloat(gt=0, le=24) = 8
+    # edd — раньше срок, spt — короче операция, fifo — порядок в заказе
+    rule: Literal["edd", "spt", "fifo"] = "edd"
+
+
+class ScheduledOperation(BaseModel):
+    order: int
+    employee: int
+    start_hours: float
+    end_hours: float
+
+
+class WorkshopTimeline(BaseModel):
+    workshop_name: str
+    num_employees: int
+    busy_hours: float
+    utilization: float
+    operations: List[ScheduledOperation]
+
+
+class OrderSchedule(BaseModel):
+    order: int
+    product_id: int
+    quantity: int
+    due_date: datetime
+    completion_hours: float
+    completion: datetime
+    late: bool
+    lateness_hours: float
+
+
+class ScheduleResponse(BaseModel):
+    makespan_hours: float
+    finish: datetime
+    orders: List[OrderSchedule]
+    late_orders: List[int]
+    workshops: List[WorkshopTimeline]
+
+
+class OrderLine(BaseModel):
+    product_id: int
+    quantity: conint(ge=1)
+
+
+class WorkloadRequest(BaseModel):
+    orders: List[OrderLine]
+    # рабочих часов одного сотрудника за период плана; без него загрузка не считается
+    horizon_hours: Optional[PositiveFloat] = None
+
+
+class WorkshopLoad(BaseModel):
+    rank: int
+    workshop_name: str
+    num_employees: int
+    total_hours: float
+    hours_per_employee: float
+    utilization: Optional[float] = None
+    overloaded: bool = False
+
+
+class WorkloadResponse(BaseModel):
+    total_hours: float
+    workshops: List[WorkshopLoad]
+    # продукты без маршрута: их строки в часы не вошли
+    unresolved_products: List[int] = []
+
+
+class MRPLine(BaseModel):
+    product_id: int
+    quantity: conint(ge=0)
+    param1: PositiveFloat
+    param2: PositiveFloat
+
+
+class MRPRequest(BaseModel):
+    orders: List[MRPLine]
+
+
+class MaterialDemand(BaseModel):
+    material_name: str
+    loss_percentage: float
+    lines: int
+    # сырьё без потерь и с потерями; второе — сумма округлений по строкам,
+    # как у /calculate_raw_material
+    net_quantity: float
+    required_raw_material: int
+
+
+class MRPResponse(BaseModel):
+    materials: List[MaterialDemand]
+    total_raw_material: int
+    # продукты без типа или материала: их строки в итог не вошли
+    unresolved_products: List[int] = []
@@ -0,0 +1,77 @@
+"""
+Быстрая отдача больших списков (/products, /all-product-workshops).
+
+Обычный путь — модель schemas.*Out на каждую строку, затем FastAPI ещё раз
+проверяет её по response_model и прогоняет через jsonable_encoder: на
+100 000 строк это большая часть времени запроса. Здесь строки SQL сразу
+становятся словарями и кодируются pydantic-core одним вызовом, без повторной
+проверки — данные из своей базы уже имеют нужные типы. Имена и порядок полей
+берутся из схемы, поэтому ответ совпадает с прежним байт в байт.
+
+fields=a,b оставляет в ответе только перечисленные поля (в порядке схемы).
+"""
+from operator import itemgetter
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from pydantic_core import to_json
+
+from . import crud, schemas
+
+PRODUCT_FIELDS = tuple(schemas.ProductOut.model_fields)
+PRODUCT_WORKSHOP_FIELDS = tuple(schemas.ProductWorkshopOut.model_fields)
+
+# поле ответа -> колонка crud.products_select и преобразование значения
+PRODUCT_COLUMNS = {"total_production_time": "time_sum"}
+PRODUCT_CONVERT = {"total_production_time": crud.total_time}
+
+
+def parse_fields(fields: Optional[str], allowed: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Параметр fields=a,b -> поля ответа; пусто — все поля схемы."""
+    requested = {name.strip() for name in (fields or "").split(",") if name.strip()}
+    if not requested:
+        return allowed
+    unknown = sorted(requested - set(allowed))
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(allowed)}"
+        )
+    return tuple(name for name in allowed if name in requested)
+
+
+def records(
+    rows: Sequence,
+    fields: Tuple[str, ...],
+    columns: Optional[Dict[str, str]] = None,
+    convert: Optional[Dict[str, Callable]] = None,
+) -> list:
+    """Строки SQL -> словари с полями fields; columns — имя колонки, если оно
+    отличается от имени поля, convert — функция для значения поля."""
+    if not rows:
+        return []
+    columns, convert = columns or {}, convert or {}
+    names = rows[0]._fields
+    pick = itemgetter(*(names.index(columns.get(name, name)) for name in fields))
+    if len(fields) == 1:
+        single = pick
+        pick = lambda row: (single(row),)  # noqa: E731
+    changes = [(pos, convert[name]) for pos, name in enumerate(fields) if name in convert]
+    if not changes:
+        return [dict(zip(fields, pick(row))) for row in rows]
+    out = []
+    for row in rows:
+        values = list(pick(row))
+        for pos, fn in changes:
+            values[pos] = fn(values[pos])
+        out.append(dict(zip(fields, values)))
+    return out
+
+
+def product_records(rows: Sequence, fields: Tuple[str, ...]) -> list:
+    return records(rows, fields, PRODUCT_COLUMNS, PRODUCT_CONVERT)
+
+
+def json_response(content, response: Response) -> Response:
+    """Готовый JSON в обход response_model; заголовки, выставленные обработчиком
+    через response (ETag, X-Next-Cursor), переносятся в ответ."""
+    return Response(to_json(content), media_type="application/json", headers=dict(response.headers))
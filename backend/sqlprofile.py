@@ -0,0 +1,136 @@
+"""
+Профилировщик SQL по запросам (FURNITURE_SQL_PROFILE=1).
+
+События движков SQLAlchemy складывают в профиль текущего HTTP-запроса число
+запросов, суммарное время и «отпечатки» операторов (литералы и списки
+параметров заменены на ?). Профиль живёт в ContextVar: run_in_threadpool
+копирует контекст, поэтому синхронные обработчики пишут в тот же объект.
+
+Итог уходит в заголовки ответа X-SQL-Queries, X-SQL-Time-Ms и X-SQL-Max-Repeat.
+Если один отпечаток повторился больше SQL_PROFILE_REPEAT_LIMIT раз — это
+похоже на N+1, в лог уходит предупреждение. Операторы дольше SQL_SLOW_MS
+пишутся в лог вместе с EXPLAIN QUERY PLAN. Запросы, выполненные после начала
+ответа (потоковая выгрузка), в заголовки не попадают, но в лог — да.
+"""
+import contextvars
+import functools
+import logging
+import re
+import time
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import event
+
+from . import config
+
+logger = logging.getLogger(__name__)
+if config.SQL_SLOW_LOG:
+    _handler = logging.FileHandler(config.SQL_SLOW_LOG, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+HEADERS = ("X-SQL-Queries", "X-SQL-Time-Ms", "X-SQL-Max-Repeat")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    text = _STRING.sub("?", statement)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("(?...)", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class Profile:
+    def __init__(self, label: str):
+        self.label = label
+        self.queries = 0
+        self.seconds = 0.0
+        self.fingerprints: Counter = Counter()
+
+    def max_repeat(self) -> int:
+        return max(self.fingerprints.values(), default=0)
+
+    def headers(self):
+        return [
+            (b"x-sql-queries", str(self.queries).encode()),
+            (b"x-sql-time-ms", f"{self.seconds * 1000:.2f}".encode()),
+            (b"x-sql-max-repeat", str(self.max_repeat()).encode()),
+        ]
+
+
+current: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar("sql_profile", default=None)
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return ""
+    if isinstance(parameters, list):
+        parameters = parameters[0] if parameters else ()
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+            return "; ".join(str(row[-1]) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+    except Exception as e:  # план — вспомогательная информация, запрос не роняем
+        return f"не удалось получить план: {e}"
+
+
+def instrument(engine) -> None:
+    """Подписать движок (для async — sync_engine) на сбор профиля."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["sql_started"].pop()
+        profile = current.get()
+        if profile is not None:
+            profile.queries += 1
+            profile.seconds += elapsed
+            profile.fingerprints[fingerprint(statement)] += 1
+        if elapsed * 1000 >= config.SQL_SLOW_MS:
+            plan = _explain(conn, statement, parameters)
+            logger.warning(
+                "медленный SQL %.1f мс [%s]: %s%s",
+                elapsed * 1000,
+                profile.label if profile else "-",
+                _SPACES.sub(" ", statement).strip(),
+                f" | план: {plan}" if plan else "",
+            )
+
+
+class SQLProfileMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = Profile(f"{scope['method']} {scope['path']}")
+        token = current.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = dict(message, headers=[*message.get("headers", []), *profile.headers()])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current.reset(token)
+            for statement, count in profile.fingerprints.items():
+                if count > config.SQL_PROFILE_REPEAT_LIMIT:
+                    logger.warning("похоже на N+1 [%s]: %d раз %s", profile.label, count, statement)
@@ -0,0 +1,157 @@
+"""
+Перебор параметров расчёта сырья: POST /calculate_raw_material/sweep.
+
+Сетка — все сочетания типов продукции, материалов, количеств и значений
+param1, param2. Каждая ячейка считается как /calculate_raw_material
+(calc.raw_material: тот же порядок операций и округление), но одним векторным
+проходом: коэффициенты типов и потери материалов берутся из кэша справочников
+один раз на запрос. Тип или материал, которых нет в справочнике, дают в своих
+ячейках -1, как и скалярный расчёт.
+
+Ответ — оси сетки и плоский массив required_raw_material в порядке осей shape
+(последняя, param2, меняется быстрее всех). Сетка больше config.SWEEP_CHUNK_CELLS
+считается и уходит в сокет порциями того же JSON, память не растёт с её
+размером; больше config.SWEEP_MAX_CELLS ячеек — 400.
+"""
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Union
+
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pydantic_core import to_json
+
+from . import calc, config, schemas
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# значения диапазона param округляются, чтобы 0.1 + 2 * 0.1 было 0.3, как
+# в форме калькулятора; в ответе — ровно те значения, что пошли в расчёт
+RANGE_DIGITS = 10
+INT64_LIMIT = 2 ** 63
+
+
+class Grid(NamedTuple):
+    product_type_names: List[str]
+    material_names: List[str]
+    quantity: np.ndarray
+    param1: np.ndarray
+    param2: np.ndarray
+    type_coefficient: np.ndarray
+    loss_percentage: np.ndarray
+
+    @property
+    def shape(self) -> List[int]:
+        return [len(self.product_type_names), len(self.material_names), len(self.quantity), len(self.param1), len(self.param2)]
+
+    @property
+    def cells(self) -> int:
+        return math.prod(self.shape)
+
+
+Axis = Union[schemas.QuantityRange, schemas.ParamRange, list]
+
+
+def _axis_length(axis: Axis, name: str) -> int:
+    if isinstance(axis, list):
+        return len(axis)
+    if axis.stop < axis.start:
+        raise HTTPException(status_code=400, detail=f"{name}: stop меньше start")
+    if isinstance(axis, schemas.QuantityRange):
+        return (axis.stop - axis.start) // axis.step + 1
+    # допуск на погрешность деления: stop, попавший на шаг, входит в диапазон
+    return math.floor((axis.stop - axis.start) / axis.step + 1e-9) + 1
+
+
+def _axis_values(axis: Axis, count: int, dtype) -> np.ndarray:
+    import numpy as np
+
+    if isinstance(axis, list):
+        return np.array(axis, dtype=dtype)
+    if isinstance(axis, schemas.QuantityRange):
+        return axis.start + axis.step * np.arange(count, dtype=dtype)
+    return np.round(axis.start + axis.step * np.arange(count, dtype=dtype), RANGE_DIGITS)
+
+
+def grid(
+    req: schemas.RawMaterialSweepRequest,
+    type_coefficients: Dict[str, float],
+    loss_percentages: Dict[str, float],
+) -> Grid:
+    import numpy as np
+
+    types = sorted(type_coefficients) if req.product_type_names is None else req.product_type_names
+    materials = sorted(loss_percentages) if req.material_names is None else req.material_names
+    axes = {"quantity": req.quantity, "param1": req.param1, "param2": req.param2}
+    # размер проверяется до того, как оси построены: диапазон с крошечным шагом
+    # не должен успеть занять память
+    lengths = {name: _axis_length(axis, name) for name, axis in axes.items()}
+    cells = len(types) * len(materials) * math.prod(lengths.values())
+    if cells > config.SWEEP_MAX_CELLS:
+        raise HTTPException(
+            status_code=400, detail=f"Сетка из {cells} ячеек больше предела {config.SWEEP_MAX_CELLS}"
+        )
+    return Grid(
+        product_type_names=types,
+        material_names=materials,
+        # quantity — целые, как в скалярном запросе; в расчёт идут как float
+        quantity=_axis_values(req.quantity, lengths["quantity"], np.int64),
+        param1=_axis_values(req.param1, lengths["param1"], np.float64),
+        param2=_axis_values(req.param2, lengths["param2"], np.float64),
+        type_coefficient=np.array([type_coefficients.get(t, np.nan) for t in types], dtype=np.float64),
+        loss_percentage=np.array([loss_percentages.get(m, np.nan) for m in materials], dtype=np.float64),
+    )
+
+
+def chunks(g: Grid) -> Iterator[np.ndarray]:
+    """Плоские порции результата по порядку; строка порции — все значения param2
+    для одного (тип, материал, quantity, param1)."""
+    import numpy as np
+
+    outer_shape = g.shape[:-1]
+    outer = math.prod(outer_shape)
+    rows = max(1, config.SWEEP_CHUNK_CELLS // max(len(g.param2), 1))
+    param2 = g.param2[np.newaxis, :]
+    for start in range(0, outer, rows):
+        t, m, q, p1 = np.unravel_index(np.arange(start, min(start + rows, outer)), outer_shape)
+        coefficient = g.type_coefficient[t][:, np.newaxis]
+        loss = g.loss_percentage[m][:, np.newaxis]
+        values = calc.raw_material(
+            g.quantity[q].astype(np.float64)[:, np.newaxis], g.param1[p1][:, np.newaxis], param2, coefficient, loss
+        )
+        found = ~(np.isnan(coefficient) | np.isnan(loss))
+        yield np.where(found, values, calc.NOT_FOUND).ravel()
+
+
+def _ints(values: np.ndarray) -> list:
+    # int64 покрывает все реальные значения; больше — как int(round(...))
+    # в скалярном расчёте, без переполнения
+    if not values.size or values.max() < INT64_LIMIT:
+        return values.astype("int64").tolist()
+    return [int(v) for v in values]
+
+
+def encode(g: Grid) -> Iterator[bytes]:
+    head = {
+        "product_type_names": g.product_type_names,
+        "material_names": g.material_names,
+        "quantity": g.quantity.tolist(),
+        "param1": g.param1.tolist(),
+        "param2": g.param2.tolist(),
+        "shape": g.shape,
+    }
+    yield to_json(head)[:-1] + b',"required_raw_material":['
+    separator = b""
+    for values in chunks(g):
+        if values.size:
+            yield separator + to_json(_ints(values))[1:-1]
+            separator = b","
+    yield b"]}"
+
+
+def response(g: Grid) -> Response:
+    if g.cells > config.SWEEP_CHUNK_CELLS:
+        return StreamingResponse(encode(g), media_type="application/json")
+    return Response(b"".join(encode(g)), media_type="application/json")
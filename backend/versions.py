@@ -0,0 +1,84 @@
+"""
+Версии данных по таблицам и условные ответы (ETag / If-None-Match).
+
+Версия хранится в таблице DataVersions и увеличивается в той же транзакции,
+что и запись в таблицу, поэтому одинакова для всех процессов. Начальное
+значение — текущее время в миллисекундах: пересозданная база не выдаст ETag,
+совпадающий со старым.
+"""
+import time
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import models
+
+BUMP_SQL = text(
+    "INSERT INTO DataVersions (table_name, version) VALUES (:table, :initial) "
+    "ON CONFLICT(table_name) DO UPDATE SET version = version + 1"
+)
+
+
+def _initial() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def bump(db: Session, *tables: str) -> None:
+    """Увеличить версии таблиц; вызывается до commit() записывающей транзакции."""
+    initial = _initial()
+    for table in tables:
+        db.execute(BUMP_SQL, {"table": table, "initial": initial})
+
+
+VERSIONS_SELECT = select(models.DataVersion.table_name, models.DataVersion.version)
+
+
+async def abump(db: AsyncSession, *tables: str) -> None:
+    initial = _initial()
+    for table in tables:
+        await db.execute(BUMP_SQL, {"table": table, "initial": initial})
+
+
+def current(db: Session) -> Dict[str, int]:
+    return dict(db.execute(VERSIONS_SELECT).all())
+
+
+def make_etag(known: Dict[str, int], *tables: str) -> str:
+    return '"' + "-".join(str(known.get(table, 0)) for table in tables) + '"'
+
+
+def etag(db: Session, *tables: str) -> str:
+    return make_etag(current(db), *tables)
+
+
+def _matches(header: Optional[str], tag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (c.strip() for c in header.split(","))
+    return any(c.removeprefix("W/") == tag for c in candidates)
+
+
+def conditional(request: Request, response: Response, tag: str) -> Optional[Response]:
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def not_modified(request: Request, response: Response, db: Session, *tables: str) -> Optional[Response]:
+    """Вернуть 304, если клиент прислал актуальный ETag, иначе проставить ETag в ответ."""
+    return conditional(request, response, etag(db, *tables))
+
+
+async def acurrent(db: AsyncSession) -> Dict[str, int]:
+    return dict((await db.execute(VERSIONS_SELECT)).all())
+
+
+async def anot_modified(request: Request, response: Response, db: AsyncSession, *tables: str) -> Optional[Response]:
+    return conditional(request, response, make_etag(await acurrent(db), *tables))
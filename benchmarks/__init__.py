@@ -0,0 +1,3 @@
+"""
+Бенчмарки API. Запуск из корня проекта: python -m benchmarks.<модуль>.
+"""
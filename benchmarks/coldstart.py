@@ -0,0 +1,146 @@
+"""
+Бенчмарк холодного старта backend.main:app.
+
+Каждый замер — новый процесс Python на копии базы:
+  import         — import backend.main; в отчёте — загружены ли numpy и pandas;
+  startup        — lifespan приложения (проверка схемы) через TestClient;
+  first_request  — первый GET /products?limit=20 после старта;
+  uvicorn        — от запуска `python -m uvicorn backend.main:app` до первого
+                   ответа 200, как у воркера run.py --prod;
+  upgrade        — migrations.upgrade базы без версии схемы (созданной до миграций).
+
+    python -m benchmarks.coldstart --db furniture_production.db --repeat 10 --output coldstart.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List
+
+from .generate import ROOT
+from .loadtest import _free_port
+from .report import write as write_report
+
+FIRST_REQUEST = "/products?limit=20"
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import backend.main
+imported = time.perf_counter()
+heavy = {{name: name in sys.modules for name in ("numpy", "pandas")}}
+from fastapi.testclient import TestClient
+client = TestClient(backend.main.app)
+entered = time.perf_counter()
+with client:
+    ready = time.perf_counter()
+    client.get("{FIRST_REQUEST}").raise_for_status()
+    done = time.perf_counter()
+print(json.dumps({{"import": imported - started, "startup": ready - entered, "first_request": done - ready, **heavy}}))
+"""
+
+
+def _copy(db_path: str, workdir: str) -> str:
+    target = os.path.join(workdir, "furniture_production.db")
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    shutil.copy(db_path, target)
+    return target
+
+
+def _env(db_path: str) -> Dict[str, str]:
+    return dict(os.environ, FURNITURE_DATABASE_URL=f"sqlite:///{db_path}")
+
+
+def probe(db_path: str, workdir: str) -> dict:
+    env = _env(_copy(db_path, workdir))
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+def uvicorn_ready(db_path: str, workdir: str, timeout: float = 60.0) -> float:
+    env = _env(_copy(db_path, workdir))
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{FIRST_REQUEST}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("uvicorn не ответил")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def upgrade(db_path: str, workdir: str) -> float:
+    target = _copy(db_path, workdir)
+    conn = sqlite3.connect(target)
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+    code = (
+        "import sys, time; from backend import migrations; started = time.perf_counter(); "
+        "migrations.upgrade(sys.argv[1]); print(time.perf_counter() - started)"
+    )
+    out = subprocess.run([sys.executable, "-c", code, target], cwd=ROOT, check=True, capture_output=True, text=True)
+    return float(out.stdout)
+
+
+def _summary(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+    return {
+        "repeat": len(timings),
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "min_ms": round(timings[0] * 1000, 1),
+        "max_ms": round(timings[-1] * 1000, 1),
+    }
+
+
+def run(db_path: str, repeat: int) -> Dict[str, dict]:
+    workdir = tempfile.mkdtemp(prefix="furniture-coldstart-")
+    try:
+        probes = [probe(db_path, workdir) for _ in range(repeat)]
+        results = {name: _summary([p[name] for p in probes]) for name in ("import", "startup", "first_request")}
+        results["import"].update(numpy=probes[-1]["numpy"], pandas=probes[-1]["pandas"])
+        results["uvicorn"] = _summary([uvicorn_ready(db_path, workdir) for _ in range(repeat)])
+        results["upgrade"] = _summary([upgrade(db_path, workdir) for _ in range(repeat)])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="furniture_production.db")
+    parser.add_argument("--repeat", type=int, default=10, help="запусков каждого замера")
+    parser.add_argument("--output", help="JSON-файл с результатами")
+    args = parser.parse_args(argv)
+
+    results = run(os.path.abspath(args.db), args.repeat)
+    for name, row in results.items():
+        print(f"{name:14} " + "  ".join(f"{k}={v}" for k, v in row.items()))
+    if args.output:
+        write_report(args.output, {"database": os.path.basename(args.db), "results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Нагрузка на приложение в одном процессе с uvicorn.
+
+В отличие от benchmarks.loadtest сервер не запускается отдельной командой:
+uvicorn.Server работает в фоновом потоке этого же процесса на базе,
+собранной из синтетических данных (benchmarks.generate), а клиенты —
+тот же keep-alive драйвер в основном потоке. Результат — RPS и p50/p95/p99
+для каждого уровня параллельности, записывается в JSON вместе с коммитом,
+чтобы прогоны можно было сравнивать.
+
+    python -m benchmarks.driver --products 100000 --concurrency 10 50 200 --output run.json
+    FURNITURE_DB_MODE=async python -m benchmarks.driver --output run-async.json
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Sequence
+from urllib.parse import quote
+
+from .generate import ROOT, build_database
+from .loadtest import _free_port, drive
+from .report import write as write_report
+
+DEFAULT_PATHS = (
+    "/products?limit=100",
+    "/products?sort=min_partner_cost&order=desc&limit=50&product_type_name=" + quote("Гостиные"),
+    "/products/{id}/workshops",
+    "/products/{id}/production_time",
+    "/all-materials",
+)
+
+
+def start_app(db_path: str, port: int):
+    # настройки читаются при импорте backend, поэтому база задаётся до него
+    os.environ["FURNITURE_DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, ROOT)
+    import uvicorn
+
+    from backend.main import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096, lifespan="off")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("uvicorn не поднялся")
+        time.sleep(0.05)
+    return server, thread
+
+
+def expand(paths: Sequence[str], products: int, count: int = 50) -> list:
+    # {id} раскладывается по продуктам равномерно, чтобы не бить в один и тот же кэш страниц
+    out = []
+    for path in paths:
+        if "{id}" in path:
+            step = max(1, products // count)
+            out.extend(path.format(id=i) for i in range(1, products + 1, step))
+        else:
+            out.append(path)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--routes", type=int, nargs=2, default=[1, 30], metavar=("MIN", "MAX"))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[10, 50, 200])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=10.0, help="таймаут одного запроса, с")
+    parser.add_argument("--paths", nargs="+", default=list(DEFAULT_PATHS), help="{id} — номер продукта")
+    parser.add_argument("--output", help="JSON-файл с результатами")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="furniture-driver-")
+    try:
+        db_path, counts = build_database(workdir, args.products, tuple(args.routes), args.seed)
+        port = _free_port()
+        server, thread = start_app(db_path, port)
+        paths = expand(args.paths, args.products)
+        results = []
+        try:
+            for concurrency in args.concurrency:
+                row = asyncio.run(drive("127.0.0.1", port, paths, concurrency, args.duration, args.timeout))
+                results.append(row)
+                print(
+                    f"c={concurrency:<5} rps={row['rps']:<8} p50={row['p50_ms']:<8}ms p95={row['p95_ms']:<8}ms "
+                    f"p99={row['p99_ms']:<8}ms errors={row['errors']} failed={row['failed_clients']}"
+                )
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        from backend import config
+
+        write_report(
+            args.output,
+            {
+                "dataset": {"seed": args.seed, **counts},
+                "db_mode": config.DB_MODE,
+                "duration": args.duration,
+                "paths": list(args.paths),
+                "results": results,
+            },
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Генератор синтетических данных в формате data/*.csv.
+
+Справочники берутся из data/ и дополняются сгенерированными записями, чтобы
+цехов хватило на самый длинный маршрут. Продукция и маршруты генерируются
+детерминированно по --seed: один и тот же запуск даёт байт-в-байт те же файлы,
+поэтому результаты бенчмарков можно сравнивать между коммитами.
+
+    python -m benchmarks.generate --products 100000 --routes 1 30 --out /tmp/data
+    cd /tmp && python /path/to/create_bd.py --chunked
+"""
+import argparse
+import csv
+import os
+import random
+import subprocess
+import sys
+from typing import List, Sequence, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(ROOT, "data")
+BOM = "\ufeff"
+BATCH = 10_000
+
+MODELS = ("Классик", "Модерн", "Лофт", "Прованс", "Сканди", "Винтаж", "Комфорт", "Премиум", "Эконом", "Стиль")
+FINISHES = ("Дуб натуральный", "Венге", "Ольха горная", "Вишня темная", "Ясень белый", "Орех", "Бук", "Графит")
+WORKSHOP_TYPES = ("Проектирование", "Обработка", "Сборка", "Сушка", "Покраска")
+
+
+def _read(name: str) -> List[List[str]]:
+    with open(os.path.join(SAMPLE_DIR, name), encoding="utf-8-sig") as f:
+        return [row for row in list(csv.reader(f, delimiter=";"))[1:] if row and row[0].strip()]
+
+
+def _write(path: str, header: Sequence[str], rows) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(BOM + ";".join(header) + "\n")
+        batch = []
+        for row in rows:
+            batch.append(";".join(row) + "\n")
+            if len(batch) >= BATCH:
+                f.write("".join(batch))
+                batch.clear()
+        f.write("".join(batch))
+
+
+def _decimal(value: float, digits: int) -> str:
+    return f"{value:.{digits}f}".replace(".", ",")
+
+
+def reference_data(min_workshops: int) -> Tuple[List[List[str]], List[List[str]], List[List[str]]]:
+    types = _read("Product_type_import.csv")
+    materials = _read("Material_type_import.csv")
+    workshops = _read("Workshops_import.csv")
+    for i in range(len(workshops), min_workshops):
+        workshops.append([f"Участок {i + 1}", WORKSHOP_TYPES[i % len(WORKSHOP_TYPES)], str(2 + i % 7)])
+    return types, materials, workshops
+
+
+def generate(out_dir: str, products: int, routes: Tuple[int, int] = (1, 30), seed: int = 42) -> dict:
+    """Записать пять CSV в out_dir; вернуть число строк по таблицам."""
+    routes_min, routes_max = routes
+    if not 1 <= routes_min <= routes_max:
+        raise ValueError("маршрутов на продукт: нужно 1 <= min <= max")
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    types, materials, workshops = reference_data(routes_max)
+
+    _write(os.path.join(out_dir, "Product_type_import.csv"), ("Тип продукции", "Коэффициент типа продукции"), types)
+    _write(os.path.join(out_dir, "Material_type_import.csv"), ("Тип материала", "Процент потерь сырья"), materials)
+    _write(
+        os.path.join(out_dir, "Workshops_import.csv"),
+        ("Название цеха", "Тип цеха", "Количество человек для производства"),
+        workshops,
+    )
+
+    type_names = [t[0].strip() for t in types]
+    material_names = [m[0].strip() for m in materials]
+    workshop_names = [w[0].strip() for w in workshops]
+    articles = rng.sample(range(1_000_000, 10_000_000), products)
+    names = [
+        f"{type_names[i % len(type_names)]} {MODELS[rng.randrange(len(MODELS))]} "
+        f"{FINISHES[rng.randrange(len(FINISHES))]} {i + 1}"
+        for i in range(products)
+    ]
+
+    def product_rows():
+        for i, name in enumerate(names):
+            # стоимость распределена логнормально, как в реальном прайсе
+            cost = min(rng.lognormvariate(10.5, 0.8), 5_000_000)
+            yield (type_names[i % len(type_names)], name, str(articles[i]), _decimal(cost, 2),
+                   material_names[rng.randrange(len(material_names))])
+
+    _write(
+        os.path.join(out_dir, "Products_import.csv"),
+        ("Тип продукции", "Наименование продукции", "Артикул", "Минимальная стоимость для партнера", "Основной материал"),
+        product_rows(),
+    )
+
+    route_count = 0
+
+    def route_rows():
+        nonlocal route_count
+        for name in names:
+            for workshop in rng.sample(workshop_names, rng.randint(routes_min, routes_max)):
+                route_count += 1
+                yield name, workshop, _decimal(rng.randint(1, 50) / 10, 1)
+
+    _write(
+        os.path.join(out_dir, "Product_workshops_import.csv"),
+        ("Наименование продукции", "Название цеха", "Время изготовления, ч"),
+        route_rows(),
+    )
+    return {
+        "ProductTypes": len(types),
+        "Materials": len(materials),
+        "Workshops": len(workshops),
+        "Products": products,
+        "ProductWorkshops": route_count,
+    }
+
+
+def build_database(
+    workdir: str, products: int, routes: Tuple[int, int] = (1, 30), seed: int = 42
+) -> Tuple[str, dict]:
+    """Сгенерировать data/ в workdir и собрать из него базу через create_bd.py --chunked."""
+    counts = generate(os.path.join(workdir, "data"), products, routes, seed)
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "create_bd.py"), "--chunked"],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    return os.path.join(workdir, "furniture_production.db"), counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--routes", type=int, nargs=2, default=[1, 30], metavar=("MIN", "MAX"),
+                        help="маршрутов (цехов) на продукт")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True, help="каталог для CSV (аналог data/)")
+    args = parser.parse_args(argv)
+    counts = generate(args.out, args.products, tuple(args.routes), args.seed)
+    for table, count in counts.items():
+        print(f"{table:17} {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Бенчмарк загрузки CSV через create_bd.py: обычный режим против --chunked.
+
+Генерирует во временном каталоге data/ (benchmarks.generate) с --routes
+маршрутами на продукт так, чтобы в Product_workshops_import.csv было около
+--rows строк, затем для каждого режима запускает create_bd.py на пустой базе
+и печатает время и пиковую память.
+
+    python -m benchmarks.import_csv --rows 10000000 --modes chunked
+"""
+import argparse
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from .generate import generate
+from .report import write as write_report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "create_bd.py")
+
+
+def run(workdir: str, mode: str, chunk_size: int) -> Dict[str, float]:
+    db = os.path.join(workdir, "furniture_production.db")
+    if os.path.exists(db):
+        os.remove(db)
+    args = [sys.executable, SCRIPT]
+    if mode == "chunked":
+        args += ["--chunked", "--chunk-size", str(chunk_size)]
+    started = time.perf_counter()
+    proc = subprocess.Popen(args, cwd=workdir, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - started
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise RuntimeError(f"create_bd.py ({mode}) завершился с кодом {proc.returncode}")
+    # ru_maxrss в Linux — КиБ
+    return {"seconds": round(elapsed, 2), "peak_rss_mb": round(usage.ru_maxrss / 1024, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000, help="строк в файле маршрутов")
+    parser.add_argument("--routes", type=int, default=10, help="маршрутов на продукт")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--modes", nargs="+", default=["chunked", "full"], choices=["chunked", "full"])
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--output", help="JSON-файл с результатами")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="furniture-import-")
+    try:
+        started = time.perf_counter()
+        products = math.ceil(args.rows / args.routes)
+        counts = generate(os.path.join(workdir, "data"), products, (args.routes, args.routes), args.seed)
+        print(f"сгенерировано {counts['ProductWorkshops']} маршрутов за {time.perf_counter() - started:.1f} с")
+        report = {"rows": counts["ProductWorkshops"], "seed": args.seed, "chunk_size": args.chunk_size, "results": {}}
+        for mode in args.modes:
+            result = run(workdir, mode, args.chunk_size)
+            report["results"][mode] = result
+            print(f"{mode:8} {result['seconds']:8.1f} с  пик RSS {result['peak_rss_mb']:8.1f} МиБ")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        write_report(args.output, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Нагрузочный тест синхронного и асинхронного режимов (FURNITURE_DB_MODE).
+
+Для каждого режима поднимается отдельный uvicorn на копии базы, затем
+N клиентов с keep-alive соединениями в течение заданного времени
+запрашивают список путей по кругу. Печатается RPS и p50/p99 задержки.
+
+--workers прогоняет каждый режим с разным числом процессов uvicorn, как
+python run.py --prod, — проверка масштабирования по ядрам. Клиенты работают
+в одном процессе, поэтому на машине, где ядер не больше, чем воркеров,
+упором станет сам драйвер.
+
+    python -m benchmarks.loadtest --duration 10 --concurrency 50 200 1000
+    python -m benchmarks.loadtest --modes sync --workers 1 2 4 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Sequence
+
+DEFAULT_PATHS = ("/products", "/all-product-workshops", "/products/1/workshops", "/all-materials")
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status
+
+
+async def _client(
+    host: str,
+    port: int,
+    paths: Sequence[str],
+    deadline: float,
+    timeout: float,
+    latencies: List[float],
+    errors: List[int],
+):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode()
+            started = time.perf_counter()
+            writer.write(request)
+            try:
+                status = await asyncio.wait_for(_read_response(reader), timeout)
+            except asyncio.TimeoutError:
+                # соединение в неизвестном состоянии — клиент выбывает
+                errors.append(0)
+                return
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def drive(
+    host: str, port: int, paths: Sequence[str], concurrency: int, duration: float, timeout: float = 10.0
+) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors: List[int] = []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(_client(host, port, paths, deadline, timeout, latencies, errors) for _ in range(concurrency)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "errors": len(errors),
+        "failed_clients": failed,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"uvicorn не поднялся на порту {port}")
+
+
+def start_server(db_path: str, port: int, env: Dict[str, str], extra_args: Sequence[str] = ()) -> subprocess.Popen:
+    workdir = tempfile.mkdtemp(prefix="furniture-bench-")
+    db_copy = os.path.join(workdir, "furniture_production.db")
+    shutil.copy(db_path, db_copy)
+    server_env = dict(os.environ, FURNITURE_DATABASE_URL=f"sqlite:///{db_copy}", **env)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--backlog", "4096", *extra_args],
+        cwd=root,
+        env=server_env,
+        stderr=subprocess.DEVNULL,
+    )
+    _wait_ready(port)
+    return proc
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="furniture_production.db")
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[50, 200, 1000])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=10.0, help="таймаут одного запроса, с")
+    parser.add_argument("--paths", nargs="+", default=list(DEFAULT_PATHS))
+    parser.add_argument("--workers", nargs="+", type=int, help="процессов uvicorn; без флага — один, как раньше")
+    parser.add_argument("--output", help="JSON-файл с результатами")
+    args = parser.parse_args(argv)
+
+    report = []
+    for mode in args.modes:
+        for workers in args.workers or [None]:
+            port = _free_port()
+            # все замеры серии — с одинаковыми флагами, как у run.py --prod
+            extra = ["--workers", str(workers), "--no-access-log"] if workers else []
+            proc = start_server(args.db, port, {"FURNITURE_DB_MODE": mode}, extra)
+            try:
+                for concurrency in args.concurrency:
+                    row = asyncio.run(drive("127.0.0.1", port, args.paths, concurrency, args.duration, args.timeout))
+                    row["mode"] = mode
+                    row["workers"] = workers or 1
+                    report.append(row)
+                    print(
+                        f"{mode:>5}  w={workers or 1:<3} c={concurrency:<5} rps={row['rps']:<8} p50={row['p50_ms']:<8}ms "
+                        f"p99={row['p99_ms']:<8}ms errors={row['errors']} failed={row['failed_clients']}"
+                    )
+            finally:
+                stop_server(proc)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Цена сбора метрик на один запрос.
+
+Прогоняет одни и те же ASGI-вызовы через пустое приложение напрямую и через
+MetricsMiddleware, без сети и базы, и печатает разницу в микросекундах на
+запрос. Отдельно — сколько стоит отрисовать /metrics при заданном числе
+маршрутов.
+
+    python -m benchmarks.metrics_overhead --requests 200000
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from .generate import ROOT
+from .report import write as write_report
+
+sys.path.insert(0, ROOT)
+from backend import metrics  # noqa: E402
+
+
+class _Route:
+    def __init__(self, path: str):
+        self.path = path
+
+
+async def _app(scope, receive, send):
+    # как маршрутизатор FastAPI: кладёт найденный маршрут в scope
+    scope["route"] = scope["_route"]
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"[]"})
+
+
+async def _noop_send(message):
+    pass
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def _run(app, requests: int, routes: int) -> float:
+    scopes = [
+        {"type": "http", "method": "GET", "path": f"/r{i}", "root_path": "", "_route": _Route(f"/r{i}/{{id}}")}
+        for i in range(routes)
+    ]
+    started = time.perf_counter()
+    for i in range(requests):
+        await app(dict(scopes[i % routes]), _receive, _noop_send)
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--routes", type=int, default=20, help="разных маршрутов (наборов меток)")
+    parser.add_argument("--output", help="JSON-файл с результатами")
+    args = parser.parse_args(argv)
+
+    wrapped = metrics.MetricsMiddleware(_app)
+    # прогрев и чередование, чтобы частота CPU и кэши не играли в пользу одного варианта
+    asyncio.run(_run(wrapped, 10_000, args.routes))
+    bare, instrumented = 0.0, 0.0
+    for _ in range(3):
+        bare += asyncio.run(_run(_app, args.requests, args.routes))
+        instrumented += asyncio.run(_run(wrapped, args.requests, args.routes))
+    total = 3 * args.requests
+    overhead_us = (instrumented - bare) / total * 1e6
+
+    started = time.perf_counter()
+    for _ in range(100):
+        body = metrics.registry.render()
+    render_ms = (time.perf_counter() - started) / 100 * 1000
+
+    results = {
+        "bare_us_per_request": round(bare / total * 1e6, 3),
+        "instrumented_us_per_request": round(instrumented / total * 1e6, 3),
+        "overhead_us_per_request": round(overhead_us, 3),
+        "render_ms": round(render_ms, 3),
+        "render_bytes": len(body.encode("utf-8")),
+    }
+    for name, value in results.items():
+        print(f"{name:30} {value}")
+    if args.output:
+        write_report(args.output, {"requests": args.requests, "routes": args.routes, "results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Микробенчмарки на синтетических данных (benchmarks.generate).
+
+Собирает базу заданного размера, замеряет загрузку create_bd.py и затем
+вызывает обработчики напрямую, без HTTP: get_products (весь список, страница,
+фильтр с сортировкой), get_product_workshops и calculate_raw_material
+(одиночный и пакетный). Для каждого замера печатается медиана и p95 одного
+вызова.
+
+    python -m benchmarks.micro --products 100000 --routes 1 30 --output micro.json
+"""
+import argparse
+import itertools
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from .generate import ROOT, build_database
+from .report import write as write_report
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()  # прогрев: кэш справочников, планы запросов, страницы SQLite
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "repeat": repeat,
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))] * 1000, 3),
+        "min_ms": round(timings[0] * 1000, 3),
+    }
+
+
+def time_import(workdir: str, mode: str) -> Dict[str, float]:
+    db = os.path.join(workdir, "furniture_production.db")
+    if os.path.exists(db):
+        os.remove(db)
+    args = [sys.executable, os.path.join(ROOT, "create_bd.py")] + (["--chunked"] if mode == "chunked" else [])
+    started = time.perf_counter()
+    subprocess.run(args, cwd=workdir, stdout=subprocess.DEVNULL, check=True)
+    return {"seconds": round(time.perf_counter() - started, 3)}
+
+
+def handler_benchmarks(db_path: str, products: int, repeat: int, seed: int) -> Dict[str, Dict[str, float]]:
+    # настройки читаются при импорте backend, поэтому база задаётся до него
+    os.environ["FURNITURE_DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, ROOT)
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+    from backend import calc, cache, main, schemas
+    from backend.database import SessionLocal
+
+    def request() -> Request:
+        return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+    def get_products(**params):
+        args = dict(
+            product_type_name=None, main_material_name=None, min_cost=None, max_cost=None, article_prefix=None,
+            sort="product_id", order="asc", limit=None, cursor=None, fields=None,
+        )
+        args.update(params)
+        return lambda: main.get_products(request(), Response(), db=db, **args)
+
+    rng = random.Random(seed)
+    results = {}
+    with SessionLocal() as db:
+        type_names = list(cache.type_coefficients(db))
+        materials = list(cache.loss_percentages(db))
+        lines = [
+            schemas.RawMaterialRequest(
+                product_type_name=rng.choice(type_names), material_name=rng.choice(materials),
+                quantity=rng.randint(1, 500), param1=rng.uniform(0.5, 3), param2=rng.uniform(0.5, 3),
+            )
+            for _ in range(1000)
+        ]
+        ids = itertools.cycle([rng.randint(1, products) for _ in range(repeat + 1)])
+
+        # весь список дорогой на больших данных — меньше повторов
+        results["get_products_all"] = measure(get_products(), max(3, repeat // 20))
+        results["get_products_page_100"] = measure(get_products(limit=100), repeat)
+        results["get_products_type_by_cost_50"] = measure(
+            get_products(product_type_name=type_names[0], sort="min_partner_cost", order="desc", limit=50), repeat
+        )
+        results["get_product_workshops"] = measure(
+            lambda: main.get_product_workshops(next(ids), request(), Response(), db=db), repeat
+        )
+        results["calculate_raw_material"] = measure(lambda: main.calculate_raw_material(lines[0], db=db), repeat)
+        results["calculate_raw_material_batch_1000"] = measure(
+            lambda: calc.raw_material_batch(lines, cache.type_coefficients(db), cache.loss_percentages(db)), repeat
+        )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--routes", type=int, nargs=2, default=[1, 30], metavar=("MIN", "MAX"))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=200, help="повторов каждого замера")
+    parser.add_argument("--output", help="JSON-файл с результатами")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="furniture-micro-")
+    try:
+        db_path, counts = build_database(workdir, args.products, tuple(args.routes), args.seed)
+        results = {f"import_{mode}": time_import(workdir, mode) for mode in ("full", "chunked")}
+        results.update(handler_benchmarks(db_path, args.products, args.repeat, args.seed))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, row in results.items():
+        print(f"{name:36} " + "  ".join(f"{k}={v}" for k, v in row.items()))
+    if args.output:
+        write_report(args.output, {"dataset": {"seed": args.seed, **counts}, "results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Время POST /schedule на синтетическом каталоге (benchmarks.generate).
+
+Собирает базу, составляет --orders заказов на случайные продукты и замеряет
+запрос целиком через ASGI, без сети: разбор тела, маршруты, план и JSON.
+Холодный запрос читает маршруты из базы, тёплый берёт их из кэша
+scheduler.RouteTable. По умолчанию маршруты в 3-10 цехов, как в data/
+(6,5 цеха на продукт). Код возврата 1, если медиана любого замера больше --limit.
+
+    python -m benchmarks.schedule --products 20000 --orders 10000 --output schedule.json
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from .generate import ROOT, build_database
+from .report import write as write_report
+
+
+def make_orders(product_ids: List[int], count: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "product_id": rng.choice(product_ids),
+            "quantity": rng.randint(1, 20),
+            "due_date": f"2027-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00",
+        }
+        for _ in range(count)
+    ]
+
+
+def summary(timings: List[float]) -> Dict[str, float]:
+    return {
+        "repeat": len(timings),
+        "median_s": round(statistics.median(timings), 3),
+        "max_s": round(max(timings), 3),
+    }
+
+
+def run(db_path: str, orders: int, rules: List[str], repeat: int, seed: int) -> Dict[str, dict]:
+    # настройки читаются при импорте backend, поэтому база задаётся до него
+    os.environ["FURNITURE_DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, ROOT)
+    import sqlite3
+
+    from fastapi.testclient import TestClient
+
+    from backend import scheduler
+    from backend.main import app
+
+    conn = sqlite3.connect(db_path)
+    product_ids = [row[0] for row in conn.execute("SELECT product_id FROM Products")]
+    conn.close()
+    body = {"orders": make_orders(product_ids, orders, seed), "start": "2026-01-12T08:00:00"}
+
+    results = {}
+    with TestClient(app) as client:
+        for rule in rules:
+            body["rule"] = rule
+            timings = {"cold": [], "warm": []}
+            for _ in range(repeat):
+                scheduler.clear_routes()
+                for phase in ("cold", "warm"):
+                    started = time.perf_counter()
+                    response = client.post("/schedule", json=body)
+                    timings[phase].append(time.perf_counter() - started)
+                    response.raise_for_status()
+            operations = sum(len(w["operations"]) for w in response.json()["workshops"])
+            for phase, values in timings.items():
+                results[f"{rule}_{phase}"] = {"orders": orders, "operations": operations, **summary(values)}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--routes", type=int, nargs=2, default=[3, 10], metavar=("MIN", "MAX"))
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--rules", nargs="+", default=["edd", "spt", "fifo"], choices=["edd", "spt", "fifo"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого замера")
+    parser.add_argument("--limit", type=float, default=1.0, help="допустимая медиана запроса, с")
+    parser.add_argument("--output", help="JSON-файл с результатами")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="furniture-schedule-")
+    try:
+        db_path, counts = build_database(workdir, args.products, tuple(args.routes), args.seed)
+        results = run(db_path, args.orders, args.rules, args.repeat, args.seed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, row in results.items():
+        print(f"{name:12} " + "  ".join(f"{k}={v}" for k, v in row.items()))
+    if args.output:
+        write_report(args.output, {"dataset": {"seed": args.seed, **counts}, "limit_s": args.limit, "results": results})
+    slow = [name for name, row in results.items() if row["median_s"] > args.limit]
+    if slow:
+        print(f"медиана больше {args.limit} с: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Бенчмарк автодополнения GET /products/search на синтетических данных.
+
+Для случайных продуктов имитирует набор наименования по буквам (первые два
+слова и начало третьего) и артикула по цифрам; каждое нажатие — вызов
+обработчика без HTTP: выборка кандидатов из FTS5 и их ранжирование
+search.rank. Печатает медиану, p95, p99 и максимум по всем нажатиям и отдельно
+по длине последнего слова. Код возврата 1, если p99 любой группы больше --limit.
+
+    python -m benchmarks.search --products 1000000 --output search.json
+    python -m benchmarks.search --db /tmp/furniture_production.db   # готовая база
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from .generate import ROOT, build_database
+from .report import write as write_report
+
+
+def keystrokes(name: str, article: int) -> List[str]:
+    words = re.findall(r"\w+", name)[:3]
+    typed = []
+    for i, word in enumerate(words):
+        head = " ".join(words[:i])
+        # третье слово — только начало: дальше пользователь выбирает из списка
+        for n in range(1, (len(word) if i < 2 else min(len(word), 3)) + 1):
+            typed.append(f"{head} {word[:n]}".strip())
+    digits = str(article)
+    typed.extend(digits[:n] for n in range(2, len(digits) + 1))
+    return typed
+
+
+def summary(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+
+    def pct(p: float) -> float:
+        return round(timings[min(len(timings) - 1, int(p * len(timings)))] * 1000, 3)
+
+    return {
+        "queries": len(timings),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(timings[-1] * 1000, 3),
+    }
+
+
+def run(db_path: str, samples: int, seed: int) -> Dict[str, Dict[str, float]]:
+    # настройки читаются при импорте backend, поэтому база задаётся до него
+    os.environ["FURNITURE_DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, ROOT)
+    from backend import main
+    from backend.database import SessionLocal
+
+    with sqlite3.connect(db_path) as conn:
+        total = conn.execute("SELECT max(product_id) FROM Products").fetchone()[0]
+        rng = random.Random(seed)
+        ids = [rng.randint(1, total) for _ in range(samples)]
+        rows = conn.execute(
+            f"SELECT product_name, article FROM Products WHERE product_id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall()
+
+    queries = [q for name, article in rows for q in keystrokes(name, article)]
+    by_length: Dict[str, List[float]] = defaultdict(list)
+    timings: List[float] = []
+    with SessionLocal() as db:
+        for q in queries[:50]:  # прогрев: страницы индекса в кэше SQLite
+            main.search_products(q=q, limit=10, db=db)
+        for q in queries:
+            started = time.perf_counter()
+            main.search_products(q=q, limit=10, db=db)
+            elapsed = time.perf_counter() - started
+            timings.append(elapsed)
+            last = len(q.split()[-1])
+            by_length["last_word_" + (str(last) if last < 8 else "8+")].append(elapsed)
+
+    results = {"all": summary(timings)}
+    results.update((key, summary(by_length[key])) for key in sorted(by_length))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--samples", type=int, default=200, help="продуктов, чьи названия «набираются»")
+    parser.add_argument("--db", help="готовая база вместо генерации")
+    parser.add_argument("--limit", type=float, default=5.0, help="допустимый p99 нажатия, мс")
+    parser.add_argument("--output", help="JSON-файл с результатами")
+    args = parser.parse_args(argv)
+
+    workdir = None
+    counts = {}
+    try:
+        if args.db:
+            db_path = os.path.abspath(args.db)
+        else:
+            workdir = tempfile.mkdtemp(prefix="furniture-search-")
+            db_path, counts = build_database(workdir, args.products, (1, 1), args.seed)
+        results = run(db_path, args.samples, args.seed)
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, row in results.items():
+        print(f"{name:16} " + "  ".join(f"{k}={v}" for k, v in row.items()))
+    if args.output:
+        write_report(args.output, {"dataset": {"seed": args.seed, **counts}, "limit_ms": args.limit, "results": results})
+    slow = [name for name, row in results.items() if row["p99_ms"] > args.limit]
+    if slow:
+        print(f"p99 больше {args.limit} мс: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
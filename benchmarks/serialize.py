@@ -0,0 +1,99 @@
+"""
+Бенчмарк отдачи больших списков: /products и /all-product-workshops.
+
+Сравнивает прежний путь (модель schemas.*Out на строку и проверка по
+response_model) с backend/serialize.py на одной базе через TestClient.
+Перед замером тела ответов сравниваются байт в байт — формат не должен
+меняться. Для быстрого пути отдельно замеряется проекция fields=.
+
+    python -m benchmarks.serialize --products 100000 --output serialize.json
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, List
+
+from .generate import ROOT, build_database
+from .micro import measure
+from .report import write as write_report
+
+CASES = (
+    ("products", "/products", "/products?fields=product_id,product_name"),
+    ("product_workshops", "/all-product-workshops", "/all-product-workshops?fields=product_name,coefficient"),
+)
+
+
+def legacy_app():
+    """Обработчики в прежнем виде: модели pydantic и response_model."""
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.orm import Session
+
+    from backend import crud, schemas
+    from backend.database import get_db
+
+    app = FastAPI()
+
+    @app.get("/products", response_model=List[schemas.ProductOut])
+    def get_products(db: Session = Depends(get_db)):
+        rows, _ = crud.list_products(db)
+        return [crud.product_out(row) for row in rows]
+
+    @app.get("/all-product-workshops", response_model=List[schemas.ProductWorkshopOut])
+    def get_all_product_workshops(db: Session = Depends(get_db)):
+        return [
+            schemas.ProductWorkshopOut(product_name=name, workshop_name=workshop, coefficient=coef)
+            for name, workshop, coef in db.execute(crud.PRODUCT_WORKSHOPS_SELECT)
+        ]
+
+    return app
+
+
+def run(db_path: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    # настройки читаются при импорте backend, поэтому база задаётся до него
+    os.environ["FURNITURE_DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, ROOT)
+    from fastapi.testclient import TestClient
+
+    from backend import main
+
+    before, after = TestClient(legacy_app()), TestClient(main.app)
+    results = {}
+    for name, path, projected in CASES:
+        old, new = before.get(path), after.get(path)
+        if old.content != new.content:
+            raise SystemExit(f"{path}: ответ отличается от прежнего формата")
+        results[f"{name}_before"] = {**measure(lambda: before.get(path), repeat), "bytes": len(old.content)}
+        results[f"{name}_after"] = {**measure(lambda: after.get(path), repeat), "bytes": len(new.content)}
+        results[f"{name}_fields"] = {
+            **measure(lambda: after.get(projected), repeat),
+            "bytes": len(after.get(projected).content),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--routes", type=int, nargs=2, default=[1, 1], metavar=("MIN", "MAX"))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого замера")
+    parser.add_argument("--output", help="JSON-файл с результатами")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="furniture-serialize-")
+    try:
+        db_path, counts = build_database(workdir, args.products, tuple(args.routes), args.seed)
+        results = run(db_path, args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, row in results.items():
+        print(f"{name:28} " + "  ".join(f"{k}={v}" for k, v in row.items()))
+    if args.output:
+        write_report(args.output, {"dataset": {"seed": args.seed, **counts}, "results": results})
+
+
+if __name__ == "__main__":
+    main()
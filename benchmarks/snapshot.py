@@ -0,0 +1,134 @@
+"""
+Бенчмарк снимка каталога (backend/snapshot.py).
+
+Память: сколько байт на продукт занимает снимок и сколько — объекты ORM
+Product и ProductWorkshop для тех же данных (по выборке --orm-sample
+продуктов: загрузка всех маршрутов объектами не поместилась бы в память).
+Задержка: обработчики чтения через TestClient со снимком и без него.
+
+    python -m benchmarks.snapshot --products 100000 --routes 1 30 --output snapshot.json
+"""
+import argparse
+import gc
+import itertools
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict
+
+from .generate import ROOT, build_database
+from .micro import measure
+from .report import write as write_report
+
+
+def _traced(fn):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def memory(sample: int) -> Dict[str, Dict[str, float]]:
+    from sqlalchemy import select
+
+    from backend import models, snapshot
+    from backend.database import SessionLocal
+
+    snap, size, elapsed = _traced(snapshot.load)
+    products, routes = len(snap), len(snap.route_coef)
+    results = {
+        "snapshot": {
+            "products": products,
+            "routes": routes,
+            "load_s": round(elapsed, 3),
+            "bytes_per_product": round(size / products, 1),
+            "array_bytes_per_product": round(snap.nbytes / products, 1),
+        }
+    }
+    del snap
+
+    def orm():
+        db = SessionLocal()
+        names = select(models.Product.product_name).order_by(models.Product.product_id).limit(sample)
+        items = db.query(models.Product).order_by(models.Product.product_id).limit(sample).all()
+        items += db.query(models.ProductWorkshop).filter(models.ProductWorkshop.product_name.in_(names)).all()
+        return db, items
+
+    (db, items), size, elapsed = _traced(orm)
+    results["orm"] = {
+        "products": sample,
+        "routes": len(items) - sample,
+        "load_s": round(elapsed, 3),
+        "bytes_per_product": round(size / sample, 1),
+    }
+    db.close()
+    return results
+
+
+def latency(products: int, repeat: int, seed: int) -> Dict[str, Dict[str, float]]:
+    from fastapi.testclient import TestClient
+
+    from backend import config, crud, main, snapshot
+
+    client = TestClient(main.app)
+    snapshot._current = snapshot.load()
+    rng = random.Random(seed)
+    ids = itertools.cycle([rng.randint(1, products) for _ in range(repeat + 1)])
+    cursor = crud.encode_cursor("product_name", "asc", snapshot._current.name(products // 2), products // 2)
+    cases = {
+        "products_page_100": lambda: "/products?limit=100",
+        "products_by_name_cursor_100": lambda: f"/products?sort=product_name&limit=100&cursor={cursor}",
+        "products_type_by_cost_50": lambda: "/products?product_type_name=Кровати&sort=min_partner_cost&order=desc&limit=50",
+        "product_workshops": lambda: f"/products/{next(ids)}/workshops",
+        "product_workshops_by_id": lambda: f"/product-workshops/{next(ids)}",
+        "production_time": lambda: f"/products/{next(ids)}/production_time",
+    }
+    results = {}
+    for name, url in cases.items():
+        for mode, enabled in (("sql", False), ("snapshot", True)):
+            config.SNAPSHOT = enabled
+            results[f"{name}_{mode}"] = measure(lambda: client.get(url()), repeat)
+    for mode, enabled in (("sql", False), ("snapshot", True)):
+        config.SNAPSHOT = enabled
+        results[f"products_all_{mode}"] = measure(lambda: client.get("/products"), max(3, repeat // 50))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--routes", type=int, nargs=2, default=[1, 30], metavar=("MIN", "MAX"))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=200, help="повторов каждого замера")
+    parser.add_argument("--orm-sample", type=int, default=10_000, help="продуктов для замера памяти ORM")
+    parser.add_argument("--output", help="JSON-файл с результатами")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="furniture-snapshot-")
+    try:
+        db_path, counts = build_database(workdir, args.products, tuple(args.routes), args.seed)
+        # настройки читаются при импорте backend, поэтому база задаётся до него
+        os.environ["FURNITURE_DATABASE_URL"] = f"sqlite:///{db_path}"
+        sys.path.insert(0, ROOT)
+        results = memory(min(args.orm_sample, args.products))
+        results.update(latency(args.products, args.repeat, args.seed))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, row in results.items():
+        print(f"{name:36} " + "  ".join(f"{k}={v}" for k, v in row.items()))
+    if args.output:
+        write_report(args.output, {"dataset": {"seed": args.seed, **counts}, "results": results})
+
+
+if __name__ == "__main__":
+    main()
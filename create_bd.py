@@ -1,12 +1,33 @@
 """
 Создание SQLite базы и загрузка данных из CSV.
+
+python create_bd.py               — полная перезаливка всех таблиц
+python create_bd.py --incremental — применить только изменения: неизменённые
+                                    файлы пропускаются по хэшу, остальные
+                                    сравниваются с таблицами по естественному ключу
+python create_bd.py --chunked     — полная перезаливка с чтением CSV порциями по
+                                    --chunk-size строк; память не зависит от размера файла
+
+Схема создаётся и обновляется миграциями (backend/migrations.py). pandas
+импортируется только при чтении CSV: --incremental без изменённых файлов
+обходится без него.
 """
+from __future__ import annotations
+
+import argparse
+import hashlib
 import os
 import sqlite3
-import pandas as pd
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from backend import migrations
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 DB_NAME = "furniture_production.db"
 CSV_DIR = "data"
+CHUNK_SIZE = 100_000
 
 FILES = {
     "ProductTypes": "Product_type_import.csv",
@@ -16,80 +37,172 @@ FILES = {
     "ProductWorkshops": "Product_workshops_import.csv",
 }
 
-SQL_SETUP = """
-PRAGMA foreign_keys = ON;
-
-CREATE TABLE IF NOT EXISTS ProductTypes (
-    product_type_name TEXT PRIMARY KEY,
-    type_coefficient REAL NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS Materials (
-    material_name TEXT PRIMARY KEY,
-    loss_percentage REAL NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS Workshops (
-    workshop_name TEXT PRIMARY KEY,
-    workshop_type TEXT NOT NULL,
-    num_employees INTEGER NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS Products (
-    product_id INTEGER PRIMARY KEY,
-    product_name TEXT NOT NULL UNIQUE,
-    article INTEGER UNIQUE NOT NULL,
-    min_partner_cost REAL NOT NULL,
-    product_type_name TEXT,
-    main_material_name TEXT,
-    FOREIGN KEY (product_type_name) REFERENCES ProductTypes(product_type_name) ON DELETE RESTRICT,
-    FOREIGN KEY (main_material_name) REFERENCES Materials(material_name) ON DELETE RESTRICT
-);
-
-CREATE TABLE IF NOT EXISTS ProductWorkshops (
-    product_name TEXT NOT NULL,
-    workshop_name TEXT NOT NULL,
-    coefficient REAL NOT NULL,
-    PRIMARY KEY (product_name, workshop_name),
-    FOREIGN KEY (product_name) REFERENCES Products(product_name) ON DELETE CASCADE,
-    FOREIGN KEY (workshop_name) REFERENCES Workshops(workshop_name) ON DELETE RESTRICT
-);
-"""
+# версия таблицы для ETag в API; начальное значение — время в мс
+BUMP_VERSION_SQL = (
+    "INSERT INTO DataVersions (table_name, version) VALUES (?, CAST(strftime('%s', 'now') AS INTEGER) * 1000) "
+    "ON CONFLICT(table_name) DO UPDATE SET version = version + 1"
+)
+
+SAVE_HASH_SQL = (
+    "INSERT INTO ImportFiles (file_name, sha256) VALUES (?, ?) "
+    "ON CONFLICT(file_name) DO UPDATE SET sha256 = excluded.sha256"
+)
+
+# естественные ключи для инкрементальной загрузки
+KEYS = {
+    "ProductTypes": ("product_type_name",),
+    "Materials": ("material_name",),
+    "Workshops": ("workshop_name",),
+    "Products": ("article",),
+    "ProductWorkshops": ("product_name", "workshop_name"),
+}
 
 
 def _to_float(series: pd.Series) -> pd.Series:
-    return (
-        series.astype(str)
-        .str.replace("%", "", regex=False)
-        .str.replace(",", ".", regex=False)
-        .str.strip()
-        .replace({"": None, "nan": None, "None": None})
-        .apply(lambda x: pd.to_numeric(x, errors="coerce"))
+    import pandas as pd
+
+    # "", "nan" и прочий мусор превращаются в NaN
+    return pd.to_numeric(
+        series.astype(str).str.replace("%", "", regex=False).str.replace(",", ".", regex=False).str.strip(),
+        errors="coerce",
     )
 
 
-def create_db(conn: sqlite3.Connection) -> None:
-    cur = conn.cursor()
-    cur.executescript(SQL_SETUP)
-    conn.commit()
+def _drop_blank_rows(df: pd.DataFrame) -> pd.DataFrame:
+    filled = df.notna() & df.astype(str).apply(lambda col: col.str.strip() != "")
+    return df[filled.any(axis=1)]
 
 
-def load_table(conn: sqlite3.Connection, table: str, csv_file: str, mapping: dict, preprocess=None) -> None:
-    print(f"Загрузка {table} из {csv_file}")
-    path = os.path.join(CSV_DIR, csv_file)
-    df = pd.read_csv(path, sep=";", encoding="utf-8")
-    df = df.dropna(how="all")
-    df = df[~df.apply(lambda x: x.astype(str).str.strip().eq("").all(), axis=1)]
-    df = df.rename(columns=mapping)
+def _clean(df: pd.DataFrame, mapping: dict, preprocess=None) -> pd.DataFrame:
+    # в заголовках выгрузки встречаются хвостовые пробелы
+    df.columns = df.columns.str.strip()
+    df = _drop_blank_rows(df).rename(columns=mapping)
     if preprocess:
         df = preprocess(df)
-    df = df.dropna(how="all")
+    return df.dropna(how="all")
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stored_hash(conn: sqlite3.Connection, csv_file: str):
+    row = conn.execute("SELECT sha256 FROM ImportFiles WHERE file_name = ?", (csv_file,)).fetchone()
+    return row[0] if row else None
+
+
+def read_csv_table(csv_file: str, mapping: dict, preprocess=None) -> pd.DataFrame:
+    import pandas as pd
+
+    path = os.path.join(CSV_DIR, csv_file)
+    return _clean(pd.read_csv(path, sep=";", encoding="utf-8", dtype=str), mapping, preprocess)
 
-    conn.execute(f"DELETE FROM {table};")
+
+def load_table(conn: sqlite3.Connection, table: str, csv_file: str, mapping: dict, preprocess=None) -> None:
+    print(f"Загрузка {table} из {csv_file}")
+    df = read_csv_table(csv_file, mapping, preprocess)
     df.to_sql(table, conn, if_exists="append", index=False)
+    conn.execute(BUMP_VERSION_SQL, (table,))
+    conn.execute(SAVE_HASH_SQL, (csv_file, file_hash(os.path.join(CSV_DIR, csv_file))))
+    conn.commit()
     print(f"  → {len(df)} записей")
 
 
+def load_table_chunked(
+    conn: sqlite3.Connection, table: str, csv_file: str, mapping: dict, preprocess=None, chunk_size: int = CHUNK_SIZE
+) -> None:
+    import pandas as pd
+
+    print(f"Загрузка {table} из {csv_file} порциями по {chunk_size}")
+    path = os.path.join(CSV_DIR, csv_file)
+    total = 0
+    for chunk in pd.read_csv(path, sep=";", encoding="utf-8", dtype=str, chunksize=chunk_size):
+        df = _clean(chunk, mapping, preprocess)
+        # preprocess_products нумерует строки внутри порции; в пустой таблице
+        # SQLite выдаст те же номера подряд через все порции
+        df = df.drop(columns=["product_id"], errors="ignore")
+        if "process_order" in df.columns:
+            df["process_order"] += total
+        df.to_sql(table, conn, if_exists="append", index=False)
+        total += len(df)
+    conn.execute(BUMP_VERSION_SQL, (table,))
+    conn.execute(SAVE_HASH_SQL, (csv_file, file_hash(path)))
+    conn.commit()
+    print(f"  → {total} записей")
+
+
+def diff_table(conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> Tuple[List[str], List[tuple], List[tuple], int]:
+    """Сравнить строки CSV с таблицей по ключу: (колонки, строки для upsert, ключи на удаление, новых строк)."""
+    key = KEYS[table]
+    # product_id назначает база, при синхронизации он не меняется
+    columns = [c for c in df.columns if c != "product_id"]
+    key_pos = [columns.index(k) for k in key]
+    df = df[columns].astype(object)
+    rows = df.where(df.notna(), None).itertuples(index=False, name=None)
+    source = {tuple(row[i] for i in key_pos): row for row in rows}
+
+    current = {
+        tuple(row[i] for i in key_pos): row
+        for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table}")
+    }
+    upserts = [row for k, row in source.items() if current.get(k) != row]
+    inserted = sum(1 for k in source if k not in current)
+    deletes = [k for k in current if k not in source]
+    return columns, upserts, deletes, inserted
+
+
+def upsert_sql(table: str, columns: List[str]) -> str:
+    key = KEYS[table]
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in key)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT({', '.join(key)}) DO UPDATE SET {updates}"
+    )
+
+
+def sync_tables(conn: sqlite3.Connection) -> None:
+    """Инкрементальная загрузка всех файлов одной транзакцией."""
+    pending_deletes: Dict[str, List[tuple]] = {}
+    changed = set()
+    conn.execute("BEGIN")
+    # переименование продукта и правка его маршрутов сходятся только к концу загрузки
+    conn.execute("PRAGMA defer_foreign_keys = ON")
+    try:
+        for table, mapping, preprocess in SOURCES:
+            csv_file = FILES[table]
+            digest = file_hash(os.path.join(CSV_DIR, csv_file))
+            if stored_hash(conn, csv_file) == digest:
+                print(f"{table}: {csv_file} не изменился")
+                continue
+            df = read_csv_table(csv_file, mapping, preprocess)
+            columns, upserts, deletes, inserted = diff_table(conn, table, df)
+            if upserts:
+                conn.executemany(upsert_sql(table, columns), upserts)
+            pending_deletes[table] = deletes
+            if upserts or deletes:
+                changed.add(table)
+            conn.execute(SAVE_HASH_SQL, (csv_file, digest))
+            print(f"{table}: +{inserted} ~{len(upserts) - inserted} -{len(deletes)}")
+
+        # удаляем от дочерних таблиц к справочникам, чтобы не упереться в ON DELETE RESTRICT
+        for table, _, _ in reversed(SOURCES):
+            deletes = pending_deletes.get(table)
+            if deletes:
+                where = " AND ".join(f"{k} = ?" for k in KEYS[table])
+                conn.executemany(f"DELETE FROM {table} WHERE {where}", deletes)
+        for table in changed:
+            conn.execute(BUMP_VERSION_SQL, (table,))
+        conn.execute(migrations.PRUNE_CHANGES_SQL)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
 def preprocess_types(df: pd.DataFrame) -> pd.DataFrame:
     df = df.dropna(subset=["product_type_name"])
     df["product_type_name"] = df["product_type_name"].str.strip()
@@ -107,15 +220,21 @@ def preprocess_materials(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def preprocess_workshops(df: pd.DataFrame) -> pd.DataFrame:
+    import pandas as pd
+
     df = df.dropna(subset=["workshop_name"])
     df["workshop_name"] = df["workshop_name"].str.strip()
     df["workshop_type"] = df["workshop_type"].str.strip()
     df["num_employees"] = pd.to_numeric(df["num_employees"], errors="coerce").astype("Int64")
     df = df.dropna(subset=["num_employees"])
+    # цеха в файле перечислены в порядке техпроцесса
+    df["process_order"] = range(1, len(df) + 1)
     return df
 
 
 def preprocess_products(df: pd.DataFrame) -> pd.DataFrame:
+    import pandas as pd
+
     df = df.dropna(subset=["product_name"])
     df["product_name"] = df["product_name"].str.strip()
     df.insert(0, "product_id", range(1, len(df) + 1))
@@ -139,46 +258,28 @@ def preprocess_product_workshops(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def main():
-    if not os.path.exists(CSV_DIR):
-        raise FileNotFoundError("Каталог data с CSV не найден")
-
-    conn = sqlite3.connect(DB_NAME)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    create_db(conn)
-
-    load_table(
-        conn,
+SOURCES = (
+    (
         "ProductTypes",
-        FILES["ProductTypes"],
         {"Тип продукции": "product_type_name", "Коэффициент типа продукции": "type_coefficient"},
-        preprocess=preprocess_types,
-    )
-
-    load_table(
-        conn,
+        preprocess_types,
+    ),
+    (
         "Materials",
-        FILES["Materials"],
         {"Тип материала": "material_name", "Процент потерь сырья": "loss_percentage"},
-        preprocess=preprocess_materials,
-    )
-
-    load_table(
-        conn,
+        preprocess_materials,
+    ),
+    (
         "Workshops",
-        FILES["Workshops"],
         {
             "Название цеха": "workshop_name",
             "Тип цеха": "workshop_type",
             "Количество человек для производства": "num_employees",
         },
-        preprocess=preprocess_workshops,
-    )
-
-    load_table(
-        conn,
+        preprocess_workshops,
+    ),
+    (
         "Products",
-        FILES["Products"],
         {
             "Наименование продукции": "product_name",
             "Тип продукции": "product_type_name",
@@ -186,261 +287,56 @@ def main():
             "Минимальная стоимость для партнера": "min_partner_cost",
             "Основной материал": "main_material_name",
         },
-        preprocess=preprocess_products,
-    )
-
-    load_table(
-        conn,
+        preprocess_products,
+    ),
+    (
         "ProductWorkshops",
-        FILES["ProductWorkshops"],
         {
             "Наименование продукции": "product_name",
             "Название цеха": "workshop_name",
             "Время изготовления, ч": "coefficient",
         },
-        preprocess=preprocess_product_workshops,
-    )
-
-    conn.close()
-    print("Готово: база данных создана и заполнена.")
-
-
-if __name__ == "__main__":
-    main()
-import os
-import sqlite3
-import pandas as pd
-
-DB_NAME = "furniture_production.db"
-
-CSV_DIR = "data"
-FILES = {
-    "ProductTypes": "Product_type_import.csv",
-    "Materials": "Material_type_import.csv",
-    "Workshops": "Workshops_import.csv",
-    "Products": "Products_import.csv",
-    "ProductWorkshops": "Product_workshops_import.csv",
-}
+        preprocess_product_workshops,
+    ),
+)
 
-SQL_SETUP = """
-PRAGMA foreign_keys = ON;
-
-CREATE TABLE IF NOT EXISTS ProductTypes (
-    product_type_name TEXT PRIMARY KEY,
-    type_coefficient REAL NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS Materials (
-    material_name TEXT PRIMARY KEY,
-    loss_percentage REAL NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS Workshops (
-    workshop_name TEXT PRIMARY KEY,
-    workshop_type TEXT NOT NULL,
-    num_employees INTEGER NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS Products (
-    product_id INTEGER PRIMARY KEY,
-    product_name TEXT NOT NULL,
-    article INTEGER UNIQUE NOT NULL,
-    min_partner_cost REAL NOT NULL,
-    product_type_name TEXT,
-    main_material_name TEXT,
-    FOREIGN KEY (product_type_name) REFERENCES ProductTypes(product_type_name)
-        ON DELETE RESTRICT,
-    FOREIGN KEY (main_material_name) REFERENCES Materials(material_name)
-        ON DELETE RESTRICT
-);
-
-CREATE TABLE IF NOT EXISTS ProductWorkshops (
-    product_name TEXT NOT NULL,
-    workshop_name TEXT NOT NULL,
-    coefficient REAL NOT NULL,
-    PRIMARY KEY (product_name, workshop_name),
-    FOREIGN KEY (product_name) REFERENCES Products(product_name)
-        ON DELETE CASCADE,
-    FOREIGN KEY (workshop_name) REFERENCES Workshops(workshop_name)
-        ON DELETE RESTRICT
-);
-"""
-
-
-def create_db_and_tables(conn: sqlite3.Connection) -> None:
-    """Создание БД и таблиц со включенным FK."""
-    print("Создание базы данных и таблиц...")
-    cursor = conn.cursor()
-    cursor.executescript(SQL_SETUP)
-    conn.commit()
-    print("База данных и таблицы созданы успешно.")
-
-
-def _to_float(series: pd.Series) -> pd.Series:
-    """Привести значения вида '0,80%' к float."""
-    return (
-        series.astype(str)
-        .str.replace("%", "", regex=False)
-        .str.replace(",", ".", regex=False)
-        .str.strip()
-        .replace({"": None, "nan": None, "None": None})
-        .apply(lambda x: pd.to_numeric(x, errors="coerce"))
-    )
-
-
-def load_data(conn: sqlite3.Connection, table_name: str, csv_file: str, column_mapping: dict, preprocess=None) -> None:
-    """Загрузка данных из CSV в таблицу без потери ограничений."""
-    print(f"\nЗагрузка данных в таблицу {table_name} из {csv_file}...")
-    try:
-        df = pd.read_csv(os.path.join(CSV_DIR, csv_file), sep=";", encoding="utf-8")
-        
-        # Удаляем пустые строки
-        df = df.dropna(how="all")
-        
-        # Фильтруем строки, где все значения пустые или только пробелы
-        df = df[~df.apply(lambda x: x.astype(str).str.strip().eq("").all(), axis=1)]
-        
-        if len(df) == 0:
-            print(f"Предупреждение: Файл {csv_file} не содержит данных для загрузки.")
-            return
-        
-        df = df.rename(columns=column_mapping)
-
-        if preprocess:
-            df = preprocess(df)
-        
-        # Удаляем строки с пустыми значениями после предобработки
-        df = df.dropna(how="all")
-
-        # очищаем таблицу, чтобы append не нарушил уникальные ограничения
-        conn.execute(f"DELETE FROM {table_name};")
-        df.to_sql(table_name, conn, if_exists="append", index=False)
-        print(f"Успешно загружено {len(df)} записей в {table_name}.")
-
-    except FileNotFoundError:
-        print(f"Ошибка: Файл {csv_file} не найден.")
-    except Exception as e:
-        print(f"Произошла ошибка при загрузке данных в {table_name}: {e}")
-        import traceback
-        traceback.print_exc()
-
-
-def preprocess_product_types(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.dropna(subset=["product_type_name"])
-    df = df[df["product_type_name"].str.strip() != ""]
-    df["type_coefficient"] = _to_float(df["type_coefficient"])
-    df = df.dropna(subset=["type_coefficient"])
-    return df
-
-
-def preprocess_materials(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.dropna(subset=["material_name"])
-    df = df[df["material_name"].str.strip() != ""]
-    df["loss_percentage"] = _to_float(df["loss_percentage"])
-    df = df.dropna(subset=["loss_percentage"])
-    return df
-
-
-def preprocess_workshops(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.dropna(subset=["workshop_name"])
-    df = df[df["workshop_name"].str.strip() != ""]
-    df["num_employees"] = pd.to_numeric(df["num_employees"], errors="coerce").astype("Int64")
-    df = df.dropna(subset=["num_employees"])
-    df["workshop_name"] = df["workshop_name"].str.strip()
-    return df
-
-
-def preprocess_products(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.dropna(subset=["product_name"])
-    df = df[df["product_name"].str.strip() != ""]
-    df.insert(0, "product_id", range(1, len(df) + 1))
-    df["article"] = pd.to_numeric(df["article"], errors="coerce").astype("Int64")
-    df = df.dropna(subset=["article"])
-    df["min_partner_cost"] = _to_float(df["min_partner_cost"])
-    df = df.dropna(subset=["min_partner_cost"])
-    df["product_name"] = df["product_name"].str.strip()
-    if "product_type_name" in df.columns:
-        df["product_type_name"] = df["product_type_name"].str.strip().replace("", None)
-    if "main_material_name" in df.columns:
-        df["main_material_name"] = df["main_material_name"].str.strip().replace("", None)
-    return df
-
-
-def preprocess_product_workshops(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.dropna(subset=["product_name", "workshop_name"])
-    df = df[(df["product_name"].str.strip() != "") & (df["workshop_name"].str.strip() != "")]
-    df["coefficient"] = _to_float(df["coefficient"])
-    df = df.dropna(subset=["coefficient"])
-    df["product_name"] = df["product_name"].str.strip()
-    df["workshop_name"] = df["workshop_name"].str.strip()
-    return df
 
+def main(incremental: bool = False, chunk_size: int = 0):
+    if not os.path.exists(CSV_DIR):
+        raise FileNotFoundError("Каталог data с CSV не найден")
 
-if __name__ == "__main__":
     conn = sqlite3.connect(DB_NAME)
     conn.execute("PRAGMA foreign_keys = ON;")
+    migrations.migrate(conn)
+    # прерванная полная перезаливка могла оставить базу без триггеров
+    migrations.create_triggers(conn)
+
+    if incremental:
+        sync_tables(conn)
+    else:
+        # индекс поиска и журнал обновляются одним проходом после загрузки
+        migrations.drop_triggers(conn)
+        # чистим от дочерних таблиц к справочникам: ссылки на справочники — ON DELETE RESTRICT
+        for table, _, _ in reversed(SOURCES):
+            conn.execute(f"DELETE FROM {table};")
+        conn.commit()
+        for table, mapping, preprocess in SOURCES:
+            if chunk_size:
+                load_table_chunked(conn, table, FILES[table], mapping, preprocess=preprocess, chunk_size=chunk_size)
+            else:
+                load_table(conn, table, FILES[table], mapping, preprocess=preprocess)
+        # возвращает триггеры, перестраивает индекс поиска и отмечает сброс в журнале
+        migrations.create_triggers(conn)
 
-    create_db_and_tables(conn)
-
-    load_data(
-        conn,
-        "ProductTypes",
-        FILES["ProductTypes"],
-        {
-            "Тип продукции": "product_type_name",
-            "Коэффициент типа продукции": "type_coefficient",
-        },
-        preprocess=preprocess_product_types,
-    )
-
-    load_data(
-        conn,
-        "Materials",
-        FILES["Materials"],
-        {
-            "Тип материала": "material_name",
-            "Процент потерь сырья": "loss_percentage",
-        },
-        preprocess=preprocess_materials,
-    )
-
-    load_data(
-        conn,
-        "Workshops",
-        FILES["Workshops"],
-        {
-            "Название цеха": "workshop_name",
-            "Тип цеха": "workshop_type",
-            "Количество человек для производства": "num_employees",
-        },
-        preprocess=preprocess_workshops,
-    )
-
-    load_data(
-        conn,
-        "Products",
-        FILES["Products"],
-        {
-            "Наименование продукции": "product_name",
-            "Тип продукции": "product_type_name",
-            "Артикул": "article",
-            "Минимальная стоимость для партнера": "min_partner_cost",
-            "Основной материал": "main_material_name",
-        },
-        preprocess=preprocess_products,
-    )
+    conn.close()
+    print("Готово: база данных создана и заполнена.")
 
-    load_data(
-        conn,
-        "ProductWorkshops",
-        FILES["ProductWorkshops"],
-        {
-            "Наименование продукции": "product_name",
-            "Название цеха": "workshop_name",
-            "Время изготовления, ч": "coefficient",
-        },
-        preprocess=preprocess_product_workshops,
-    )
 
-    conn.close()
-    print("\nПроцесс загрузки завершен. База данных furniture_production.db готова.")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Создание и наполнение БД из CSV")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--incremental", action="store_true", help="применить только изменения в CSV")
+    mode.add_argument("--chunked", action="store_true", help="читать CSV порциями (для больших файлов)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="строк в порции для --chunked")
+    args = parser.parse_args()
+    main(incremental=args.incremental, chunk_size=args.chunk_size if args.chunked else 0)
@@ -154,9 +154,15 @@ async function loadWorkshops() {
 async function loadProductsForSelect(selectElement) {
     selectElement.innerHTML = '<option value="">-- Выберите продукт --</option>';
     try {
-        const res = await fetch(`${API_BASE}/products`);
-        if (!res.ok) return;
-        const data = await res.json();
+        let data;
+        if (productsSeq !== null) {
+            // список уже есть в локальной копии и обновляется по журналу изменений
+            data = [...productCache.keys()].sort((a, b) => a - b).map(id => productCache.get(id).product);
+        } else {
+            const res = await fetch(`${API_BASE}/products`);
+            if (!res.ok) return;
+            data = await res.json();
+        }
         data.forEach(p => {
             const opt = document.createElement("option");
             opt.value = p.product_id;
@@ -238,46 +244,129 @@ async function loadMaterialsForSelect(selectId) {
     });
 }
 
-async function loadProducts() {
+// локальная копия списка продукции: id -> { product, row }. productsSeq — номер
+// последнего применённого изменения; дальше список догоняется через
+// /changes?since=seq и поток /changes/stream, без повторной загрузки /products
+const productCache = new Map();
+let productsSeq = null;
+let productsLoading = null;
+let changesStream = null;
+
+function renderProductRow(p) {
+    const tr = document.createElement("tr");
+    tr.dataset.id = p.product_id;
+    tr.innerHTML = `
+        <td>${p.product_id}</td>
+        <td>${p.product_name}</td>
+        <td>${p.article}</td>
+        <td>${p.min_partner_cost.toFixed(2)}</td>
+        <td>${p.product_type_name ?? ""}</td>
+        <td>${p.main_material_name ?? ""}</td>
+        <td>${p.total_production_time} ч</td>
+        <td>
+            <button class="secondary btn-edit" title="Редактировать">✏️</button>
+            <button class="secondary btn-delete" title="Удалить">🗑️</button>
+        </td>
+    `;
+    tr.querySelector(".btn-edit").addEventListener("click", () => openEditProduct(p.product_id));
+    tr.querySelector(".btn-delete").addEventListener("click", () => deleteProduct(p.product_id));
+    return tr;
+}
+
+function showEmptyProducts() {
+    productsTableBody.innerHTML = "<tr><td colspan='8' style='text-align:center'>Нет данных</td></tr>";
+}
+
+function upsertProduct(p) {
+    if (productCache.size === 0) productsTableBody.innerHTML = "";
+    const tr = renderProductRow(p);
+    const item = productCache.get(p.product_id);
+    if (item) {
+        item.row.replaceWith(tr);
+    } else {
+        const next = Array.from(productsTableBody.children).find(row => Number(row.dataset.id) > p.product_id);
+        productsTableBody.insertBefore(tr, next ?? null);
+    }
+    productCache.set(p.product_id, { product: p, row: tr });
+}
+
+function removeProduct(id) {
+    const item = productCache.get(id);
+    if (!item) return;
+    item.row.remove();
+    productCache.delete(id);
+}
+
+async function reloadProducts() {
     productsTableBody.innerHTML = "";
+    productCache.clear();
+    productsSeq = null;
     hideMessage(messageBox);
     try {
+        // номер журнала берётся до списка: то, что изменится во время
+        // загрузки, придёт следующей порцией изменений
+        const head = await fetch(`${API_BASE}/changes`);
+        if (!head.ok) throw new Error("Не удалось загрузить список продукции");
+        const seq = (await head.json()).seq;
+
         const res = await fetch(`${API_BASE}/products`);
         if (!res.ok) throw new Error("Не удалось загрузить список продукции");
         const data = await res.json();
-        if (data.length === 0) {
-            productsTableBody.innerHTML = "<tr><td colspan='8' style='text-align:center'>Нет данных</td></tr>";
-        }
+        if (data.length === 0) showEmptyProducts();
 
         data.forEach((p) => {
-            const tr = document.createElement("tr");
-            tr.innerHTML = `
-                <td>${p.product_id}</td>
-                <td>${p.product_name}</td>
-                <td>${p.article}</td>
-                <td>${p.min_partner_cost.toFixed(2)}</td>
-                <td>${p.product_type_name ?? ""}</td>
-                <td>${p.main_material_name ?? ""}</td>
-                <td>${p.total_production_time} ч</td>
-                <td>
-                    <button class="secondary btn-edit" data-id="${p.product_id}" title="Редактировать">✏️</button>
-                    <button class="secondary btn-delete" data-id="${p.product_id}" title="Удалить">🗑️</button>
-                </td>
-            `;
+            const tr = renderProductRow(p);
+            productCache.set(p.product_id, { product: p, row: tr });
             productsTableBody.appendChild(tr);
         });
-
-        document.querySelectorAll(".btn-edit").forEach((btn) =>
-            btn.addEventListener("click", () => openEditProduct(btn.dataset.id))
-        );
-        document.querySelectorAll(".btn-delete").forEach((btn) =>
-            btn.addEventListener("click", () => deleteProduct(btn.dataset.id))
-        );
+        productsSeq = seq;
+        listenChanges();
     } catch (e) {
         showMessage(messageBox, e.message, "error");
     }
 }
 
+function loadProducts() {
+    if (!productsLoading) {
+        productsLoading = reloadProducts().finally(() => {
+            productsLoading = null;
+        });
+    }
+    return productsLoading;
+}
+
+async function applyChanges(delta) {
+    if (delta.reset) {
+        await loadProducts();
+        return;
+    }
+    // порция уже применена (например, пришла и ответом, и из потока)
+    if (productsSeq === null || delta.seq <= productsSeq) return;
+    delta.deleted.forEach(removeProduct);
+    delta.products.forEach(upsertProduct);
+    if (productCache.size === 0) showEmptyProducts();
+    productsSeq = delta.seq;
+}
+
+async function syncProducts() {
+    if (productsSeq === null) {
+        await loadProducts();
+        return;
+    }
+    const res = await fetch(`${API_BASE}/changes?since=${productsSeq}`);
+    if (!res.ok) throw new Error("Не удалось обновить список продукции");
+    await applyChanges(await res.json());
+}
+
+function listenChanges() {
+    if (changesStream || !window.EventSource) return;
+    // после обрыва EventSource переподключается сам и присылает Last-Event-ID
+    changesStream = new EventSource(`${API_BASE}/changes/stream?since=${productsSeq}`);
+    changesStream.addEventListener("changes", (e) => {
+        applyChanges(JSON.parse(e.data)).catch((err) => console.error("Ошибка применения изменений:", err));
+    });
+}
+
 btnAdd.addEventListener("click", () => {
     formTitle.textContent = "Добавить продукт";
     productForm.reset();
@@ -298,11 +387,10 @@ modal.addEventListener("click", (e) => {
 async function openEditProduct(id) {
     hideMessage(messageBox);
     try {
-        const res = await fetch(`${API_BASE}/products`);
+        const res = await fetch(`${API_BASE}/products/${id}`);
+        if (res.status === 404) throw new Error("Продукт не найден");
         if (!res.ok) throw new Error("Не удалось получить данные продукта");
-        const data = await res.json();
-        const p = data.find((x) => x.product_id === Number(id));
-        if (!p) throw new Error("Продукт не найден");
+        const p = await res.json();
 
         formTitle.textContent = "Редактировать продукт";
         document.getElementById("product_id").value = p.product_id;
@@ -359,7 +447,7 @@ productForm.addEventListener("submit", async (e) => {
         }
 
         modal.classList.add("hidden");
-        await loadProducts();
+        await syncProducts();
         showMessage(messageBox, "Данные успешно сохранены.", "info");
     } catch (e) {
         showMessage(messageBox, e.message, "error");
@@ -374,7 +462,7 @@ async function deleteProduct(id) {
             const err = await res.json().catch(() => ({}));
             throw new Error(err.detail || "Ошибка удаления продукта");
         }
-        await loadProducts();
+        await syncProducts();
         showMessage(messageBox, "Продукт удалён.", "info");
     } catch (e) {
         showMessage(messageBox, e.message, "error");
@@ -423,7 +511,6 @@ rawForm.addEventListener("submit", async (e) => {
     }
 });
 
-loadProducts();
+loadProducts().then(() => loadProductsForSelect(productWorkshopsSelect));
 loadProductTypesForSelect("raw_product_type_name");
 loadMaterialsForSelect("raw_material_name");
-loadProductsForSelect(productWorkshopsSelect);
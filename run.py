@@ -1,17 +1,42 @@
 """
-Запуск: создает БД при отсутствии и стартует FastAPI.
+Запуск: создает БД при отсутствии (иначе применяет миграции схемы) и стартует FastAPI.
+
+python run.py                        — разработка: один процесс с --reload на 127.0.0.1:8000
+python run.py --prod [--workers N]   — сервер: N процессов uvicorn без перезагрузки,
+                                       keep-alive и плавная остановка из backend/config.py
 """
+import argparse
 import os
+import sqlite3
 import subprocess
 import sys
 
+from backend import config, migrations
+
+DB_NAME = "furniture_production.db"
+
 
 def ensure_db():
-    if not os.path.exists("furniture_production.db"):
+    if not os.path.exists(DB_NAME):
         print("База не найдена. Создаю...")
         subprocess.check_call([sys.executable, "create_bd.py"])
-    else:
-        print("База уже существует.")
+        return
+    # существующая база доводится до текущей схемы один раз здесь, а не в
+    # каждом воркере; backend.main при старте увидит актуальную версию
+    before, after = migrations.upgrade(DB_NAME)
+    if before == after:
+        print(f"База уже существует, схема версии {after}.")
+        return
+    print(f"Схема базы обновлена: версия {before} -> {after}.")
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        empty = conn.execute("SELECT NOT EXISTS (SELECT 1 FROM Products)").fetchone()[0]
+    finally:
+        conn.close()
+    # пустой файл или база, созданная до миграций без данных
+    if before == 0 and empty:
+        print("База пуста. Загружаю данные...")
+        subprocess.check_call([sys.executable, "create_bd.py"])
 
 
 def run_server():
@@ -21,11 +46,39 @@ def run_server():
     )
 
 
-def main():
+def run_production(host: str, port: int, workers: int):
+    import uvicorn
+
+    print(f"Запускаю {workers} процесс(а/ов) на http://{host}:{port}")
+    # каждый воркер — отдельный процесс со своим пулом соединений и кэшем
+    # справочников; кэши согласуются через PRAGMA data_version (backend/cache.py),
+    # SIGTERM/SIGINT даёт текущим запросам до GRACEFUL_SHUTDOWN_TIMEOUT секунд
+    uvicorn.run(
+        "backend.main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        backlog=config.BACKLOG,
+        timeout_keep_alive=config.KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=config.GRACEFUL_SHUTDOWN_TIMEOUT,
+        access_log=False,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prod", action="store_true", help="несколько процессов без --reload")
+    parser.add_argument("--workers", type=int, default=config.WORKERS, help="процессов uvicorn в режиме --prod")
+    parser.add_argument("--host", default="0.0.0.0", help="адрес в режиме --prod")
+    parser.add_argument("--port", type=int, default=8000, help="порт в режиме --prod")
+    args = parser.parse_args(argv)
+
     ensure_db()
-    run_server()
+    if args.prod:
+        run_production(args.host, args.port, args.workers)
+    else:
+        run_server()
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,61 @@
+"""
+Тесты работают на временной базе: приложение открывает ./furniture_production.db
+относительно рабочего каталога, поэтому до импорта backend переходим во
+временный каталог и не трогаем базу из репозитория.
+
+Справочники общие для всех модулей и записываются один раз до первого запроса;
+продукцию каждый модуль создаёт сам, с собственными названиями и артикулами.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix="furniture-test-"))
+
+DB_PATH = os.path.abspath("furniture_production.db")
+
+PRODUCT_TYPES = [("Стол", 1.5), ("Партия без коэффициента", 1.0), ("Партия 2.35", 2.35)]
+MATERIALS = [("Дуб", 2.0), ("Партия без потерь", 0.0), ("Партия 0.8", 0.8)]
+WORKSHOPS = [
+    ("Сборочный", "Сборка", 3),
+    ("Покрасочный", "Обработка", 3),
+    ("Упаковочный", "Сборка", 3),
+]
+
+
+def add_reference() -> None:
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        conn.executemany("INSERT INTO ProductTypes VALUES (?, ?)", PRODUCT_TYPES)
+        conn.executemany("INSERT INTO Materials VALUES (?, ?)", MATERIALS)
+        # порядок в списке — порядок техпроцесса, как строки Workshops_import.csv
+        conn.executemany(
+            "INSERT INTO Workshops (workshop_name, workshop_type, num_employees, process_order) VALUES (?, ?, ?, ?)",
+            [(*workshop, position) for position, workshop in enumerate(WORKSHOPS, 1)],
+        )
+    conn.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+
+    with TestClient(app) as client:
+        add_reference()
+        yield client
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        yield conn
+    finally:
+        conn.close()
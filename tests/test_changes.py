@@ -0,0 +1,115 @@
+"""
+GET /changes: изменения продукции после seq из журнала ProductChanges; если
+журнал не покрывает since, ответ — reset и текущий seq.
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from backend import changes, config
+
+from conftest import DB_PATH
+
+
+def product(name, article, cost=100):
+    return {
+        "product_name": name,
+        "article": article,
+        "min_partner_cost": cost,
+        "product_type_name": "Стол",
+        "main_material_name": "Дуб",
+    }
+
+
+def delta(client, since=None):
+    response = client.get("/changes", params={} if since is None else {"since": since})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture
+def seq(client):
+    return delta(client)["seq"]
+
+
+def test_without_since_is_reset(client):
+    body = delta(client)
+    assert body["reset"] is True
+    assert body["products"] == [] and body["deleted"] == []
+
+
+def test_changed_products_come_once(client, seq):
+    created = client.post("/products", json=product("Стол журнала", 8_000_001)).json()
+    pid = created["product_id"]
+    client.put(f"/products/{pid}", json=product("Стол журнала", 8_000_001, cost=150))
+    client.put(f"/products/{pid}", json=product("Стол журнала", 8_000_001, cost=200))
+
+    body = delta(client, seq)
+    assert body["reset"] is False
+    assert [(p["product_id"], p["min_partner_cost"]) for p in body["products"]] == [(pid, 200)]
+    assert body["deleted"] == []
+    # с нового seq изменений нет
+    assert delta(client, body["seq"]) == {"seq": body["seq"], "reset": False, "products": [], "deleted": []}
+
+
+def test_deleted_products_are_listed(client, seq):
+    pid = client.post("/products", json=product("Стол на удаление", 8_000_002)).json()["product_id"]
+    assert client.delete(f"/products/{pid}").status_code == 200
+
+    body = delta(client, seq)
+    assert body["reset"] is False
+    assert body["deleted"] == [pid]
+    assert all(p["product_id"] != pid for p in body["products"])
+
+
+def test_since_ahead_of_log_is_reset(client, seq):
+    body = delta(client, seq + 1000)
+    assert body["reset"] is True
+    assert body["seq"] == seq
+
+
+def test_pruned_log_is_reset(client, seq):
+    for n in range(3):
+        client.post("/products", json=product(f"Стол вытесненный {n}", 8_000_010 + n))
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        # как prune_changes: старые записи вытеснены, последняя остаётся
+        conn.execute("DELETE FROM ProductChanges WHERE seq < (SELECT max(seq) FROM ProductChanges)")
+    conn.close()
+
+    body = delta(client, seq)
+    assert body["reset"] is True
+    assert body["products"] == []
+    # с seq последней записи журнал снова полон
+    assert delta(client, body["seq"])["reset"] is False
+
+
+def test_more_than_changes_max_is_reset(client, seq, monkeypatch):
+    monkeypatch.setattr(config, "CHANGES_MAX", 2)
+    for n in range(3):
+        client.post("/products", json=product(f"Стол сверх предела {n}", 8_000_020 + n))
+    body = delta(client, seq)
+    assert body["reset"] is True
+    assert body["products"] == []
+
+    monkeypatch.setattr(config, "CHANGES_MAX", 3)
+    assert len(delta(client, seq)["products"]) == 3
+
+
+def test_watcher_does_not_wait_for_a_running_check(client):
+    watcher = changes.LatestWatcher(DB_PATH, interval=0)
+    first = watcher.latest()
+    client.post("/products", json=product("Стол наблюдателя", 8_000_030))
+
+    # проверку уже делает другой поток: номер — прошлый, без ожидания блокировки
+    watcher._lock.acquire()
+    try:
+        result = []
+        reader = threading.Thread(target=lambda: result.append(watcher.latest()))
+        reader.start()
+        reader.join(timeout=1)
+        assert result == [first]
+    finally:
+        watcher._lock.release()
+    assert watcher.latest() > first
@@ -0,0 +1,160 @@
+"""
+GET /costs, GET /products/{id}/cost: себестоимость по каталогу. Правки
+продуктов и маршрутов досчитываются по журналу изменений и дают тот же
+расчёт, что и полный пересчёт; SQL идёт вне блокировки общего расчёта.
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from backend import costs, versions
+from backend.database import engine
+
+from conftest import DB_PATH
+
+RATE = 500.0
+# полный пересчёт для сравнения, мимо счётчика в builds
+BUILD = costs.build
+
+
+def product(name, article, cost=100, product_type="Стол", material="Дуб"):
+    return {
+        "product_name": name,
+        "article": article,
+        "min_partner_cost": cost,
+        "product_type_name": product_type,
+        "main_material_name": material,
+    }
+
+
+def route(name, workshop, hours):
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        conn.execute("INSERT INTO ProductWorkshops VALUES (?, ?, ?)", (name, workshop, hours))
+        conn.execute("UPDATE DataVersions SET version = version + 1 WHERE table_name = 'ProductWorkshops'")
+    conn.close()
+
+
+def rebuilt():
+    with engine.connect() as conn:
+        conn.exec_driver_sql("BEGIN")
+        state = BUILD(conn, dict(conn.execute(versions.VERSIONS_SELECT).all()))
+        conn.rollback()
+    return costs.records(state, RATE)
+
+
+@pytest.fixture
+def builds(client, monkeypatch):
+    """Счётчик полных пересчётов после того, как общий расчёт уже есть."""
+    costs.current()
+    calls = []
+
+    def counted(conn, known):
+        calls.append(known)
+        return BUILD(conn, known)
+
+    monkeypatch.setattr(costs, "build", counted)
+    return calls
+
+
+def test_cost_of_product(client):
+    created = client.post("/products", json=product("Стол себестоимости", 9_000_001)).json()
+    route("Стол себестоимости", "Сборочный", 2.0)
+
+    response = client.get(f"/products/{created['product_id']}/cost", params={"hourly_rate": 10})
+    assert response.status_code == 200
+    body = response.json()
+    # 100 × 1.5 × (1 + 2 / 100); 2 ч × 3 сотрудника × 10
+    assert body["material_cost"] == 153.0
+    assert body["labor_hours"] == 6.0
+    assert body["labor_cost"] == 60.0
+    assert body["total_cost"] == 213.0
+
+    assert client.get("/products/1000000000/cost").status_code == 404
+
+
+def test_product_without_type_or_material(client):
+    created = client.post("/products", json=product("Стол без справочников", 9_000_002, product_type=None, material=None))
+    product_id = created.json()["product_id"]
+    body = client.get(f"/products/{product_id}/cost").json()
+    assert body["type_coefficient"] is None and body["loss_percentage"] is None
+    assert body["material_cost"] == 100.0
+
+
+def test_incremental_matches_full_rebuild(client, builds):
+    created = client.post("/products", json=product("Стол досчёта", 9_000_010)).json()
+    pid = created["product_id"]
+    assert costs.records(costs.current(), RATE) == rebuilt()
+
+    client.put(f"/products/{pid}", json=product("Стол досчёта", 9_000_010, cost=250, material="Партия 0.8"))
+    assert costs.records(costs.current(), RATE) == rebuilt()
+
+    route("Стол досчёта", "Покрасочный", 1.5)
+    assert costs.records(costs.current(), RATE) == rebuilt()
+
+    assert client.delete(f"/products/{pid}").status_code == 200
+    state = costs.current()
+    assert pid not in state.product_id.tolist()
+    assert costs.records(state, RATE) == rebuilt()
+
+    # всё выше досчитано по журналу, без полного пересчёта
+    assert builds == []
+
+
+def test_reference_change_rebuilds(client, builds):
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        conn.execute("UPDATE DataVersions SET version = version + 1 WHERE table_name = 'Materials'")
+    conn.close()
+    costs.current()
+    assert len(builds) == 1
+
+
+def test_sql_runs_outside_lock(client, monkeypatch):
+    reading = threading.Event()
+    update = costs._update
+
+    def watched(conn, state):
+        reading.set()
+        return update(conn, state)
+
+    monkeypatch.setattr(costs, "_update", watched)
+    client.post("/products", json=product("Стол без блокировки", 9_000_020))
+    costs._lock.acquire()
+    try:
+        # пока блокировку держит другой поток, досчёт всё равно читает базу
+        worker = threading.Thread(target=costs.current)
+        worker.start()
+        assert reading.wait(1)
+    finally:
+        costs._lock.release()
+    worker.join()
+    assert "Стол без блокировки" in costs._state.product_name.tolist()
+
+
+def test_stale_result_does_not_replace_newer(client, monkeypatch):
+    costs.current()
+    update = costs._update
+    computed, release = threading.Event(), threading.Event()
+    slow = {}
+
+    def delayed(conn, state):
+        fresh = update(conn, state)
+        if threading.current_thread() is slow.get("thread"):
+            computed.set()
+            release.wait(5)
+        return fresh
+
+    monkeypatch.setattr(costs, "_update", delayed)
+    slow["thread"] = threading.Thread(target=costs.current)
+    slow["thread"].start()
+    assert computed.wait(5)
+
+    # пока медленный досчёт держит старый результат, другой запрос видит правку
+    client.post("/products", json=product("Стол поновее", 9_000_030))
+    newer = costs.current()
+    release.set()
+    slow["thread"].join()
+    assert costs._state is newer
+    assert "Стол поновее" in newer.product_name.tolist()
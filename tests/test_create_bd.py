@@ -0,0 +1,207 @@
+"""
+create_bd.py --incremental: неизменённые файлы пропускаются по хэшу, остальные
+сравниваются с таблицами по естественному ключу; удаления идут от дочерних
+таблиц к справочникам.
+"""
+import os
+import sqlite3
+
+import pytest
+
+import create_bd
+
+TYPES = [("Кухни", "2,5"), ("Прихожие", "5,6")]
+MATERIALS = [("Дуб", "0,80%"), ("Ель", "0,70%")]
+WORKSHOPS = [("Раскроя", "Обработка", 3), ("Сборки", "Сборка", 5), ("Упаковки", "Сборка", 2)]
+PRODUCTS = [
+    ("Кухня Дуб", "Кухни", 100, "1000,00", "Дуб"),
+    ("Прихожая Ель", "Прихожие", 200, "2000,00", "Ель"),
+]
+ROUTES = [
+    ("Кухня Дуб", "Раскроя", "1,0"),
+    ("Кухня Дуб", "Сборки", "2,0"),
+    ("Прихожая Ель", "Сборки", "1,5"),
+    ("Прихожая Ель", "Упаковки", "0,5"),
+]
+
+
+# строки — в порядке колонок SOURCES
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    monkeypatch.setattr(create_bd, "CSV_DIR", str(data))
+    monkeypatch.setattr(create_bd, "DB_NAME", str(tmp_path / "furniture_production.db"))
+
+    def write(tables):
+        for table, mapping, _ in create_bd.SOURCES:
+            if table in tables:
+                lines = [";".join(mapping)] + [";".join(str(v) for v in row) for row in tables[table]]
+                (data / create_bd.FILES[table]).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    write(
+        {
+            "ProductTypes": TYPES,
+            "Materials": MATERIALS,
+            "Workshops": WORKSHOPS,
+            "Products": PRODUCTS,
+            "ProductWorkshops": ROUTES,
+        }
+    )
+    create_bd.main()
+    return write
+
+
+def query(sql):
+    conn = sqlite3.connect(create_bd.DB_NAME)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def versions():
+    return dict(query("SELECT table_name, version FROM DataVersions"))
+
+
+def test_unchanged_files_are_skipped_by_hash(source, capsys):
+    before = versions()
+    # правка в обход CSV: неизменённый файл даже не сравнивается с таблицей
+    conn = sqlite3.connect(create_bd.DB_NAME)
+    with conn:
+        conn.execute("UPDATE Products SET min_partner_cost = 1 WHERE article = 100")
+    conn.close()
+
+    create_bd.main(incremental=True)
+
+    assert versions() == before
+    assert query("SELECT min_partner_cost FROM Products WHERE article = 100") == [(1.0,)]
+    assert capsys.readouterr().out.count("не изменился") == len(create_bd.SOURCES)
+
+
+def test_changed_rows_are_upserted_by_key(source):
+    ids = dict(query("SELECT article, product_id FROM Products"))
+    before = versions()
+    source(
+        {
+            "Products": [
+                ("Кухня Дуб", "Кухни", 100, "1100,00", "Дуб"),
+                ("Прихожая Ель", "Прихожие", 200, "2000,00", "Ель"),
+                ("Кухня Ель", "Кухни", 300, "900,00", "Ель"),
+            ]
+        }
+    )
+
+    create_bd.main(incremental=True)
+
+    rows = query("SELECT article, product_id, product_name, min_partner_cost FROM Products ORDER BY article")
+    assert [(a, n, c) for a, _, n, c in rows] == [
+        (100, "Кухня Дуб", 1100.0),
+        (200, "Прихожая Ель", 2000.0),
+        (300, "Кухня Ель", 900.0),
+    ]
+    # ключ синхронизации — артикул, product_id существующих строк не меняется
+    assert {a: i for a, i, _, _ in rows if a in ids} == ids
+    after = versions()
+    assert after["Products"] > before["Products"]
+    assert {t: v for t, v in after.items() if t != "Products"} == {t: v for t, v in before.items() if t != "Products"}
+
+
+def test_deletes_run_from_children_to_references(source):
+    # цех уходит вместе с маршрутами, продукт переименован вместе с маршрутами:
+    # ON DELETE RESTRICT и внешние ключи по наименованию сходятся только к концу загрузки
+    source(
+        {
+            "Workshops": WORKSHOPS[1:],
+            "Products": [
+                ("Кухня Дуб светлый", "Кухни", 100, "1000,00", "Дуб"),
+                ("Прихожая Ель", "Прихожие", 200, "2000,00", "Ель"),
+            ],
+            "ProductWorkshops": [
+                ("Кухня Дуб светлый", "Сборки", "3,0"),
+                ("Прихожая Ель", "Сборки", "1,5"),
+                ("Прихожая Ель", "Упаковки", "0,5"),
+            ],
+        }
+    )
+
+    create_bd.main(incremental=True)
+
+    assert query("SELECT workshop_name FROM Workshops ORDER BY workshop_name") == [("Сборки",), ("Упаковки",)]
+    assert query("SELECT * FROM ProductWorkshops ORDER BY product_name, workshop_name") == [
+        ("Кухня Дуб светлый", "Сборки", 3.0),
+        ("Прихожая Ель", "Сборки", 1.5),
+        ("Прихожая Ель", "Упаковки", 0.5),
+    ]
+    assert query("PRAGMA foreign_key_check") == []
+
+
+def test_failed_sync_leaves_database_and_hashes_unchanged(source):
+    hashes = query("SELECT * FROM ImportFiles ORDER BY file_name")
+    # маршрут на несуществующий цех: загрузка целиком откатывается
+    source({"ProductWorkshops": ROUTES + [("Кухня Дуб", "Нет такого цеха", "1,0")]})
+
+    with pytest.raises(sqlite3.IntegrityError):
+        create_bd.main(incremental=True)
+
+    assert query("SELECT * FROM ImportFiles ORDER BY file_name") == hashes
+    assert len(query("SELECT * FROM ProductWorkshops")) == len(ROUTES)
+    assert os.path.exists(create_bd.DB_NAME)
+
+
+def test_process_order_follows_csv_rows(source):
+    assert query("SELECT workshop_name, process_order FROM Workshops ORDER BY process_order") == [
+        ("Раскроя", 1),
+        ("Сборки", 2),
+        ("Упаковки", 3),
+    ]
+    source({"Workshops": [WORKSHOPS[0], WORKSHOPS[2], WORKSHOPS[1]]})
+
+    create_bd.main(incremental=True)
+
+    assert query("SELECT workshop_name, process_order FROM Workshops ORDER BY process_order") == [
+        ("Раскроя", 1),
+        ("Упаковки", 2),
+        ("Сборки", 3),
+    ]
+
+
+def test_database_without_process_order_is_migrated(source):
+    conn = sqlite3.connect(create_bd.DB_NAME)
+    with conn:
+        conn.execute("ALTER TABLE Workshops DROP COLUMN process_order")
+    # база, созданная до миграций
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+
+    create_bd.main(incremental=True)
+
+    # колонка заполнена и файл цехов сверен заново, а не пропущен по хэшу
+    assert query("SELECT workshop_name, process_order FROM Workshops ORDER BY process_order") == [
+        ("Раскроя", 1),
+        ("Сборки", 2),
+        ("Упаковки", 3),
+    ]
+    assert len(query("SELECT * FROM ImportFiles")) == len(create_bd.SOURCES)
+
+
+def test_interrupted_reload_gets_triggers_back(source):
+    from backend import migrations
+
+    assert query("PRAGMA user_version") == [(migrations.LATEST,)]
+    # перезаливка снимает триггеры и прервалась до их возврата
+    conn = sqlite3.connect(create_bd.DB_NAME)
+    migrations.drop_triggers(conn)
+    conn.execute("INSERT INTO ProductSearch (ProductSearch) VALUES ('delete-all')")
+    conn.commit()
+    conn.close()
+
+    create_bd.main(incremental=True)
+
+    triggers = query("SELECT name FROM sqlite_master WHERE type = 'trigger' ORDER BY name")
+    assert [name for name, in triggers] == sorted((*migrations.SEARCH_TRIGGERS, *migrations.CHANGES_TRIGGERS))
+    # индекс перестроен по Products, версия схемы не тронута
+    assert query("SELECT rowid FROM ProductSearch WHERE ProductSearch MATCH 'кухня'") == query(
+        "SELECT product_id FROM Products WHERE product_name = 'Кухня Дуб'"
+    )
+    assert query("PRAGMA user_version") == [(migrations.LATEST,)]
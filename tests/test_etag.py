@@ -0,0 +1,62 @@
+"""
+Списки отдаются с ETag: повторный запрос с актуальным If-None-Match получает 304,
+запись увеличивает версию таблицы, и следующий запрос снова получает 200.
+"""
+
+
+def get(client, url, if_none_match=None):
+    headers = {"If-None-Match": if_none_match} if if_none_match is not None else {}
+    return client.get(url, headers=headers)
+
+
+def test_repeat_get_is_not_modified(client):
+    first = get(client, "/all-product-types")
+    assert first.status_code == 200
+    tag = first.headers["ETag"]
+    assert tag.startswith('"') and tag.endswith('"')
+
+    repeat = get(client, "/all-product-types", tag)
+    assert repeat.status_code == 304
+    assert repeat.headers["ETag"] == tag
+    assert repeat.content == b""
+
+
+def test_weak_wildcard_and_lists(client):
+    tag = get(client, "/all-materials").headers["ETag"]
+    assert get(client, "/all-materials", "W/" + tag).status_code == 304
+    assert get(client, "/all-materials", "*").status_code == 304
+    assert get(client, "/all-materials", f'"0", {tag}').status_code == 304
+    assert get(client, "/all-materials", '"0"').status_code == 200
+    assert get(client, "/all-materials", "").status_code == 200
+
+
+def test_write_changes_etag(client):
+    first = get(client, "/products")
+    tag = first.headers["ETag"]
+    assert get(client, "/products", tag).status_code == 304
+
+    created = client.post(
+        "/products",
+        json={
+            "product_name": "Стол с ETag",
+            "article": 2_000_001,
+            "min_partner_cost": 100,
+            "product_type_name": "Стол",
+            "main_material_name": "Дуб",
+        },
+    )
+    assert created.status_code == 200
+
+    after_create = get(client, "/products", tag)
+    assert after_create.status_code == 200
+    assert after_create.headers["ETag"] != tag
+    assert any(p["product_name"] == "Стол с ETag" for p in after_create.json())
+
+    # таблицы, которых запись не касалась, сохраняют свой ETag
+    types_tag = get(client, "/all-product-types").headers["ETag"]
+    product_id = created.json()["product_id"]
+    assert client.delete(f"/products/{product_id}").status_code == 200
+    after_delete = get(client, "/products", after_create.headers["ETag"])
+    assert after_delete.status_code == 200
+    assert after_delete.headers["ETag"] not in (tag, after_create.headers["ETag"])
+    assert get(client, "/all-product-types", types_tag).status_code == 304
@@ -0,0 +1,107 @@
+"""
+Загрузка CSV через /import/*: отказы по строкам, построчный повтор порции
+в точках сохранения, обновление по наименованию и версия таблицы для ETag.
+"""
+from backend import export
+
+
+def csv_body(header, rows) -> bytes:
+    lines = [";".join(header)] + [";".join(str(v) for v in row) for row in rows]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def import_products(client, rows):
+    response = client.post("/import/products", content=csv_body(export.PRODUCTS_CSV_HEADER, rows))
+    assert response.status_code == 200
+    return response.json()
+
+
+def products_by_name(client, prefix):
+    return {p["product_name"]: p for p in client.get("/products").json() if p["product_name"].startswith(prefix)}
+
+
+def test_rejected_rows_are_reported_by_line(client):
+    report = import_products(
+        client,
+        [
+            ("Стол", "Импорт годный 1", 3_000_001, "100,50", "Дуб"),
+            ("Стол", "Импорт без цены", 3_000_002, "дорого", "Дуб"),
+            ("Нет такого типа", "Импорт без типа", 3_000_003, "100", "Дуб"),
+            ("Стол", "", 3_000_004, "100", "Дуб"),
+            ("Стол", "Импорт годный 2", 3_000_005, "200", "Дуб"),
+        ],
+    )
+    assert (report["rows"], report["imported"], report["rejected"]) == (5, 2, 3)
+    assert [r["line"] for r in report["rejects"]] == [3, 4, 5]
+    assert "min_partner_cost" in report["rejects"][0]["reason"]
+    assert "product_type_name" in report["rejects"][1]["reason"]
+    assert "product_name" in report["rejects"][2]["reason"]
+
+    imported = products_by_name(client, "Импорт годный")
+    assert sorted(imported) == ["Импорт годный 1", "Импорт годный 2"]
+    assert imported["Импорт годный 1"]["min_partner_cost"] == 100.5
+
+
+def test_conflicting_row_falls_back_to_savepoints(client):
+    import_products(client, [("Стол", "Импорт занятый артикул", 3_000_101, "100", "Дуб")])
+    tag = client.get("/products").headers["ETag"]
+    # артикул занят другим продуктом: порция целиком падает на UNIQUE
+    # и повторяется построчно, остальные строки порции сохраняются
+    report = import_products(
+        client,
+        [
+            ("Стол", "Импорт до конфликта", 3_000_102, "100", "Дуб"),
+            ("Стол", "Импорт конфликт", 3_000_101, "100", "Дуб"),
+            ("Стол", "Импорт после конфликта", 3_000_103, "100", "Дуб"),
+        ],
+    )
+    assert (report["imported"], report["rejected"]) == (2, 1)
+    assert report["rejects"][0]["line"] == 3
+    assert "UNIQUE" in report["rejects"][0]["reason"]
+    imported = products_by_name(client, "Импорт")
+    assert {"Импорт до конфликта", "Импорт после конфликта", "Импорт занятый артикул"} <= set(imported)
+    assert "Импорт конфликт" not in imported
+    assert imported["Импорт занятый артикул"]["article"] == 3_000_101
+    assert client.get("/products", headers={"If-None-Match": tag}).status_code == 200
+
+
+def test_product_name_is_the_upsert_key(client):
+    import_products(client, [("Стол", "Импорт обновляемый", 3_000_201, "100", "Дуб")])
+    before = products_by_name(client, "Импорт обновляемый")["Импорт обновляемый"]
+    report = import_products(client, [("Стол", "Импорт обновляемый", 3_000_202, "150", "Дуб")])
+    assert (report["imported"], report["rejected"]) == (1, 0)
+    after = products_by_name(client, "Импорт обновляемый")
+    assert list(after) == ["Импорт обновляемый"]
+    updated = after["Импорт обновляемый"]
+    assert updated["product_id"] == before["product_id"]
+    assert (updated["article"], updated["min_partner_cost"]) == (3_000_202, 150)
+
+
+def test_routes_import_checks_products_and_upserts(client):
+    import_products(client, [("Стол", "Импорт с маршрутом", 3_000_301, "100", "Дуб")])
+    body = [
+        ("Импорт с маршрутом", "Сборочный", "1,5"),
+        ("Нет такого продукта", "Сборочный", "1"),
+        ("Импорт с маршрутом", "Нет такого цеха", "1"),
+    ]
+    response = client.post(
+        "/import/product-workshops", content=csv_body(export.PRODUCT_WORKSHOPS_CSV_HEADER, body)
+    )
+    report = response.json()
+    assert (report["imported"], report["rejected"]) == (1, 2)
+    assert "product_name" in report["rejects"][0]["reason"]
+    assert "workshop_name" in report["rejects"][1]["reason"]
+
+    body = [("Импорт с маршрутом", "Сборочный", "2")]
+    client.post("/import/product-workshops", content=csv_body(export.PRODUCT_WORKSHOPS_CSV_HEADER, body))
+    product = products_by_name(client, "Импорт с маршрутом")["Импорт с маршрутом"]
+    assert product["total_production_time"] == 2
+
+
+def test_import_bumps_table_version(client):
+    tag = client.get("/products").headers["ETag"]
+    assert client.get("/products", headers={"If-None-Match": tag}).status_code == 304
+    import_products(client, [("Стол", "Импорт новая версия", 3_000_401, "100", "Дуб")])
+    after = client.get("/products", headers={"If-None-Match": tag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != tag
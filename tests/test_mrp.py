@@ -0,0 +1,103 @@
+"""
+POST /mrp: строки портфеля считаются как /calculate_raw_material и
+складываются по основному материалу продукта; итог кэшируется по отпечатку
+заказа и версиям каталога.
+"""
+import sqlite3
+
+import pytest
+
+from backend import cache
+
+from conftest import DB_PATH
+
+
+@pytest.fixture(scope="module")
+def products(client):
+    conn = sqlite3.connect(DB_PATH)
+    catalog = [
+        ("Стол MRP дуб", "Стол", "Дуб"),
+        ("Стол MRP партия", "Партия 2.35", "Партия 0.8"),
+        ("Стол MRP без материала", "Стол", None),
+        ("Стол MRP без типа", None, "Дуб"),
+    ]
+    ids = {}
+    with conn:
+        for article, (name, product_type, material) in enumerate(catalog, 6_000_001):
+            ids[name] = conn.execute(
+                "INSERT INTO Products (product_name, article, min_partner_cost, product_type_name, main_material_name)"
+                " VALUES (?, ?, 100, ?, ?)",
+                (name, article, product_type, material),
+            ).lastrowid
+    conn.close()
+    return ids
+
+
+def line(product_id, quantity, param1, param2):
+    return {"product_id": product_id, "quantity": quantity, "param1": param1, "param2": param2}
+
+
+def scalar(client, product_type, material, quantity, param1, param2):
+    body = {"product_type_name": product_type, "material_name": material, "quantity": quantity, "param1": param1, "param2": param2}
+    return client.post("/calculate_raw_material", json=body).json()["required_raw_material"]
+
+
+def test_lines_are_summed_per_material(client, products):
+    orders = [
+        line(products["Стол MRP дуб"], 3, 1.2, 0.7),
+        line(products["Стол MRP партия"], 5, 2.5, 1.1),
+        line(products["Стол MRP дуб"], 1, 0.5, 0.5),
+        line(products["Стол MRP без материала"], 4, 1.0, 1.0),
+        line(products["Стол MRP без типа"], 2, 1.0, 1.0),
+    ]
+    response = client.post("/mrp", json={"orders": orders})
+    assert response.status_code == 200
+    body = response.json()
+
+    demand = {m["material_name"]: m for m in body["materials"]}
+    assert set(demand) == {"Дуб", "Партия 0.8"}
+    oak = scalar(client, "Стол", "Дуб", 3, 1.2, 0.7) + scalar(client, "Стол", "Дуб", 1, 0.5, 0.5)
+    batch = scalar(client, "Партия 2.35", "Партия 0.8", 5, 2.5, 1.1)
+    assert (demand["Дуб"]["lines"], demand["Дуб"]["required_raw_material"]) == (2, oak)
+    assert (demand["Партия 0.8"]["lines"], demand["Партия 0.8"]["required_raw_material"]) == (1, batch)
+    assert demand["Дуб"]["net_quantity"] == round(1.2 * 0.7 * 1.5 * 3 + 0.5 * 0.5 * 1.5 * 1, 4)
+    assert body["total_raw_material"] == oak + batch
+    # без типа или материала строки в итог не входят, продукты перечислены
+    assert body["unresolved_products"] == sorted([products["Стол MRP без материала"], products["Стол MRP без типа"]])
+
+
+def test_unknown_products_are_404(client, products):
+    response = client.post("/mrp", json={"orders": [line(products["Стол MRP дуб"], 1, 1, 1), line(10**9, 1, 1, 1)]})
+    assert response.status_code == 404
+    assert str(10**9) in response.json()["detail"]
+
+
+def test_cache_key_follows_order_and_catalog(client, products):
+    orders = [line(products["Стол MRP дуб"], 2, 1.0, 1.0), line(products["Стол MRP партия"], 1, 1.0, 1.0)]
+    first = client.post("/mrp", json={"orders": orders}).json()
+
+    hits = cache.mrp_cache.hits
+    assert client.post("/mrp", json={"orders": orders}).json() == first
+    assert cache.mrp_cache.hits == hits + 1
+
+    # другой порядок строк — другой отпечаток, итог тот же
+    misses = cache.mrp_cache.misses
+    assert client.post("/mrp", json={"orders": orders[::-1]}).json() == first
+    assert cache.mrp_cache.misses == misses + 1
+
+    # запись в продукцию меняет версию, и повторный заказ считается заново
+    product_id = products["Стол MRP дуб"]
+    update = {
+        "product_name": "Стол MRP дуб",
+        "article": 6_000_001,
+        "min_partner_cost": 100,
+        "product_type_name": "Стол",
+        "main_material_name": "Партия без потерь",
+    }
+    assert client.put(f"/products/{product_id}", json=update).status_code == 200
+    try:
+        after = client.post("/mrp", json={"orders": orders}).json()
+        assert {m["material_name"] for m in after["materials"]} == {"Партия без потерь", "Партия 0.8"}
+    finally:
+        update["main_material_name"] = "Дуб"
+        client.put(f"/products/{product_id}", json=update)
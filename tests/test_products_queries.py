@@ -0,0 +1,52 @@
+"""
+GET /products читает продукцию и время производства одним запросом: число
+SQL-операторов не зависит от размера каталога.
+"""
+from sqlalchemy import event
+
+from backend.database import engine
+
+from conftest import WORKSHOPS
+
+N = 50
+
+
+def add_products(db, start: int, count: int) -> None:
+    with db:
+        for i in range(start, start + count):
+            name = f"Стол запросов {i}"
+            db.execute(
+                "INSERT INTO Products (product_name, article, min_partner_cost, product_type_name, main_material_name)"
+                " VALUES (?, ?, ?, 'Стол', 'Дуб')",
+                (name, 1_000_000 + i, 100.0 + i),
+            )
+            db.executemany(
+                "INSERT INTO ProductWorkshops VALUES (?, ?, ?)",
+                [(name, workshop, 2.0) for workshop, _, _ in WORKSHOPS],
+            )
+
+
+def count_statements(client, expected: int) -> int:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get("/products")
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code == 200
+    ours = [p for p in response.json() if p["product_name"].startswith("Стол запросов ")]
+    assert len(ours) == expected
+    assert all(p["total_production_time"] == 6 for p in ours)
+    return len(statements)
+
+
+def test_products_query_count_does_not_grow_with_catalog(client, db):
+    add_products(db, 0, N)
+    small = count_statements(client, N)
+    add_products(db, N, N)
+    large = count_statements(client, 2 * N)
+    assert 0 < small == large
@@ -0,0 +1,66 @@
+"""
+/calculate_raw_material/batch считает так же, как скалярный /calculate_raw_material.
+"""
+import random
+
+TYPES = ["Партия без коэффициента", "Партия 2.35"]
+MATERIALS = ["Партия без потерь", "Партия 0.8"]
+
+
+def line(product_type_name, material_name, quantity, param1, param2):
+    return {
+        "product_type_name": product_type_name,
+        "material_name": material_name,
+        "quantity": quantity,
+        "param1": param1,
+        "param2": param2,
+    }
+
+
+def scalar(client, lines):
+    results = []
+    for item in lines:
+        response = client.post("/calculate_raw_material", json=item)
+        assert response.status_code == 200
+        results.append(response.json()["required_raw_material"])
+    return results
+
+
+def batch(client, lines):
+    response = client.post("/calculate_raw_material/batch", json=lines)
+    assert response.status_code == 200
+    return [r["required_raw_material"] for r in response.json()]
+
+
+def test_batch_matches_scalar(client):
+    rng = random.Random(3)
+    lines = [
+        line(
+            rng.choice(TYPES),
+            rng.choice(MATERIALS),
+            rng.randint(0, 50),
+            round(rng.uniform(0.1, 20), 2),
+            round(rng.uniform(0.1, 20), 2),
+        )
+        for _ in range(300)
+    ]
+    assert batch(client, lines) == scalar(client, lines)
+
+
+def test_halves_round_to_even(client):
+    # x.5 без потерь и коэффициента: np.rint и round() округляют к чётному
+    lines = [line("Партия без коэффициента", "Партия без потерь", q, 0.5, 1.0) for q in (1, 3, 5, 7)]
+    assert batch(client, lines) == scalar(client, lines) == [0, 2, 2, 4]
+
+
+def test_unknown_type_or_material(client):
+    lines = [
+        line("Нет такого типа", "Партия без потерь", 1, 1.0, 1.0),
+        line("Партия без коэффициента", "Нет такого материала", 1, 1.0, 1.0),
+        line("Партия без коэффициента", "Партия без потерь", 3, 1.0, 1.0),
+    ]
+    assert batch(client, lines) == scalar(client, lines) == [-1, -1, 3]
+
+
+def test_empty_batch(client):
+    assert batch(client, []) == []
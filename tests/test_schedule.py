@@ -0,0 +1,153 @@
+"""
+POST /schedule: маршрут проходит цеха по Workshops.process_order, а не по
+порядку строк или названий; без однозначного порядка план не строится.
+10 000 заказов по маршрутам в 3-10 цехов планируются быстрее секунды.
+"""
+import random
+import sqlite3
+import time
+
+import pytest
+
+from backend import scheduler
+
+from conftest import DB_PATH
+
+START = "2026-01-12T08:00:00"
+DUE = "2026-02-01T00:00:00"
+
+# строки, названия и техпроцесс упорядочены по-разному: раскрой, сборка, упаковка
+FLOW = [("Цех А: упаковка", 30), ("Цех Б: раскрой", 10), ("Цех В: сборка", 20)]
+
+
+def bump(db, *tables):
+    # внешний писатель сам увеличивает версии, как create_bd.py и импорт
+    db.executemany("UPDATE DataVersions SET version = version + 1 WHERE table_name = ?", [(t,) for t in tables])
+
+
+def add_workshops(db, workshops, employees=1):
+    with db:
+        db.executemany(
+            "INSERT INTO Workshops (workshop_name, workshop_type, num_employees, process_order) VALUES (?, 'Поток', ?, ?)",
+            [(name, employees, order) for name, order in workshops],
+        )
+        bump(db, "Workshops")
+
+
+def add_product(db, name, article, route):
+    with db:
+        cursor = db.execute(
+            "INSERT INTO Products (product_name, article, min_partner_cost, product_type_name, main_material_name)"
+            " VALUES (?, ?, 100, 'Стол', 'Дуб')",
+            (name, article),
+        )
+        db.executemany("INSERT INTO ProductWorkshops VALUES (?, ?, ?)", [(name, w, c) for w, c in route])
+        bump(db, "Products", "ProductWorkshops")
+    return cursor.lastrowid
+
+
+def plan(client, orders, **extra):
+    return client.post("/schedule", json={"orders": orders, "start": START, **extra})
+
+
+@pytest.fixture(scope="module")
+def db():
+    # одно соединение на модуль: данные цехов нужны нескольким тестам
+    conn = sqlite3.connect(DB_PATH)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def flow(client, db):
+    add_workshops(db, FLOW)
+    # маршрут записан не в порядке техпроцесса
+    return add_product(db, "Шкаф техпроцесса", 4_000_001, [("Цех А: упаковка", 1.0), ("Цех В: сборка", 2.0), ("Цех Б: раскрой", 0.5)])
+
+
+def test_route_follows_process_order(client, flow):
+    response = plan(client, [{"product_id": flow, "quantity": 2, "due_date": DUE}])
+    assert response.status_code == 200
+    body = response.json()
+    steps = {w["workshop_name"]: w["operations"][0] for w in body["workshops"]}
+    assert [w["workshop_name"] for w in body["workshops"]] == ["Цех Б: раскрой", "Цех В: сборка", "Цех А: упаковка"]
+    assert (steps["Цех Б: раскрой"]["start_hours"], steps["Цех Б: раскрой"]["end_hours"]) == (0, 1)
+    assert (steps["Цех В: сборка"]["start_hours"], steps["Цех В: сборка"]["end_hours"]) == (1, 5)
+    assert (steps["Цех А: упаковка"]["start_hours"], steps["Цех А: упаковка"]["end_hours"]) == (5, 7)
+    assert body["makespan_hours"] == 7
+    assert body["orders"][0]["completion"] == "2026-01-12T15:00:00"
+
+    # 7 часов при 7-часовом дне — конец того же дня, а не утро следующего
+    short_day = plan(client, [{"product_id": flow, "quantity": 2, "due_date": DUE}], hours_per_day=7).json()
+    assert short_day["orders"][0]["completion"] == "2026-01-12T15:00:00"
+    assert short_day["finish"] == "2026-01-12T15:00:00"
+
+
+def test_changed_process_order_is_picked_up(client, db, flow):
+    with db:
+        db.execute("UPDATE Workshops SET process_order = 5 WHERE workshop_name = 'Цех А: упаковка'")
+        bump(db, "Workshops")
+    try:
+        body = plan(client, [{"product_id": flow, "quantity": 1, "due_date": DUE}]).json()
+        assert [w["workshop_name"] for w in body["workshops"]][0] == "Цех А: упаковка"
+    finally:
+        with db:
+            db.execute("UPDATE Workshops SET process_order = 30 WHERE workshop_name = 'Цех А: упаковка'")
+            bump(db, "Workshops")
+
+
+@pytest.mark.parametrize("order", [None, 20])
+def test_ambiguous_order_is_rejected(client, db, order):
+    name = f"Цех Г: порядок {order}"
+    add_workshops(db, [(name, order)])
+    # без порядка или с порядком, как у сборки, в том же маршруте
+    route = [("Цех Б: раскрой", 1.0), ("Цех В: сборка", 1.0), (name, 1.0)]
+    product_id = add_product(db, f"Шкаф без порядка {order}", 4_000_010 + (order or 0), route)
+    response = plan(client, [{"product_id": product_id, "quantity": 1, "due_date": DUE}])
+    assert response.status_code == 409
+    assert str(product_id) in response.json()["detail"]
+
+
+def test_unknown_product_is_404(client, flow):
+    response = plan(client, [{"product_id": flow, "quantity": 1, "due_date": DUE}, {"product_id": 10**9, "quantity": 1, "due_date": DUE}])
+    assert response.status_code == 404
+    assert str(10**9) in response.json()["detail"]
+
+
+def test_ten_thousand_orders_under_a_second(client, db):
+    rng = random.Random(15)
+    workshops = [(f"Поток {n}", 100 + n) for n in range(10)]
+    with db:
+        db.executemany(
+            "INSERT INTO Workshops (workshop_name, workshop_type, num_employees, process_order) VALUES (?, 'Поток', ?, ?)",
+            [(name, 2 + n % 7, order) for n, (name, order) in enumerate(workshops)],
+        )
+        for i in range(500):
+            name = f"Изделие потока {i}"
+            db.execute(
+                "INSERT INTO Products (product_name, article, min_partner_cost, product_type_name, main_material_name)"
+                " VALUES (?, ?, 100, 'Стол', 'Дуб')",
+                (name, 4_100_000 + i),
+            )
+            route = rng.sample(workshops, rng.randint(3, 10))
+            db.executemany(
+                "INSERT INTO ProductWorkshops VALUES (?, ?, ?)",
+                [(name, w, round(rng.uniform(0.1, 3.0), 1)) for w, _ in route],
+            )
+        bump(db, "Workshops", "Products", "ProductWorkshops")
+    product_ids = [row[0] for row in db.execute("SELECT product_id FROM Products WHERE product_name LIKE 'Изделие потока %'")]
+    orders = [
+        {"product_id": rng.choice(product_ids), "quantity": rng.randint(1, 20), "due_date": f"2026-{rng.randint(2, 12):02d}-01T00:00:00"}
+        for _ in range(10_000)
+    ]
+
+    timings = []
+    for _ in range(3):
+        scheduler.clear_routes()
+        started = time.perf_counter()
+        response = plan(client, orders)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    operations = sum(len(w["operations"]) for w in response.json()["workshops"])
+    assert operations > 60_000
+    assert min(timings) < 1.0, timings
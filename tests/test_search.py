@@ -0,0 +1,109 @@
+"""
+GET /products/search: слова запроса ищутся по началу, кандидаты из FTS5
+упорядочиваются по BM25 без IDF; индекс следует за записью в Products.
+"""
+import sqlite3
+
+import pytest
+
+from backend import search
+
+from conftest import DB_PATH
+
+NAMES = [
+    "Буфет Ксилофон",
+    "Буфет Ксилофон Ксилофон",
+    "Буфет Ксилофон угловой с витриной",
+    "Буфет Ксилофонный",
+]
+
+
+def find(client, q, limit=10):
+    response = client.get("/products/search", params={"q": q, "limit": limit})
+    assert response.status_code == 200
+    return [row["product_name"] for row in response.json()]
+
+
+@pytest.fixture(scope="module")
+def products(client):
+    conn = sqlite3.connect(DB_PATH)
+    ids = {}
+    with conn:
+        for article, name in enumerate(NAMES, 7_000_001):
+            ids[name] = conn.execute(
+                "INSERT INTO Products (product_name, article, min_partner_cost, product_type_name, main_material_name)"
+                " VALUES (?, ?, 100, 'Стол', 'Дуб')",
+                (name, article),
+            ).lastrowid
+    conn.close()
+    return ids
+
+
+def test_ranking_weighs_frequency_against_length(client, products):
+    # два вхождения при трёх словах выше одного при двух, длинное наименование
+    # последним; при равном счёте короче наименование
+    assert find(client, "ксилофон") == [NAMES[1], NAMES[0], NAMES[3], NAMES[2]]
+
+
+def test_words_are_prefixes_joined_by_and(client, products):
+    assert find(client, "КСИЛ угл") == [NAMES[2]]
+    assert find(client, "7000002") == [NAMES[1]]
+    # слово длиннее PREFIX_MAX сначала ищется точно, затем как префикс
+    assert find(client, "ксилофонн") == [NAMES[3]]
+
+
+def test_fts_syntax_is_inert(client, products):
+    assert find(client, 'ксилофон OR "') == []
+    assert find(client, "ксилофон NEAR угл*") == []
+    assert find(client, '"*-') == []
+
+
+def test_index_follows_writes(client, products):
+    product_id = products[NAMES[0]]
+    update = {
+        "product_name": "Буфет Ксилограф",
+        "article": 7_000_001,
+        "min_partner_cost": 100,
+        "product_type_name": "Стол",
+        "main_material_name": "Дуб",
+    }
+    assert client.put(f"/products/{product_id}", json=update).status_code == 200
+    try:
+        assert find(client, "ксилог") == ["Буфет Ксилограф"]
+        assert NAMES[0] not in find(client, "ксилофон")
+    finally:
+        update["product_name"] = NAMES[0]
+        client.put(f"/products/{product_id}", json=update)
+
+    created = client.post("/products", json={**update, "product_name": "Буфет Ксилема", "article": 7_000_010}).json()
+    assert find(client, "ксилем") == ["Буфет Ксилема"]
+    assert client.delete(f"/products/{created['product_id']}").status_code == 200
+    assert find(client, "ксилем") == []
+
+
+def test_ranking_work_is_bounded(client, products):
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        conn.executemany(
+            "INSERT INTO Products (product_name, article, min_partner_cost, product_type_name, main_material_name)"
+            " VALUES (?, ?, 100, 'Стол', 'Дуб')",
+            [(f"Комод Ксерокс вариант {n}", 7_100_000 + n) for n in range(search.CANDIDATES + 50)],
+        )
+    conn.close()
+    rows = client.get("/products/search", params={"q": "ксерокс", "limit": 100}).json()
+    assert len(rows) == 100
+    # ранжируются только первые CANDIDATES совпадений индекса
+    names = {row["product_name"] for row in rows}
+    assert f"Комод Ксерокс вариант {search.CANDIDATES + 49}" not in names
+
+
+def test_rank_orders_candidates():
+    rows = [
+        (3, "Стол обеденный раздвижной", 100, "Столы"),
+        (2, "Стол Стол", 200, "Столы"),
+        (1, "Стул", 300, None),
+    ]
+    assert [row[0] for row in search.rank(rows, "стол", 10)] == [2, 3, 1]
+    assert [row[0] for row in search.rank(rows, "стол", 1)] == [2]
+    # без слов порядок кандидатов не меняется
+    assert search.rank(rows, "--", 2) == rows[:2]
@@ -0,0 +1,99 @@
+"""
+POST /calculate_raw_material/sweep: каждая ячейка сетки равна ответу
+/calculate_raw_material; сетка больше SWEEP_CHUNK_CELLS уходит потоком,
+больше SWEEP_MAX_CELLS — 400.
+"""
+import itertools
+
+from backend import config
+
+TYPES = ["Партия без коэффициента", "Партия 2.35", "Нет такого типа"]
+MATERIALS = ["Партия без потерь", "Партия 0.8", "Нет такого материала"]
+
+
+def sweep(client, **body):
+    response = client.post("/calculate_raw_material/sweep", json=body)
+    assert response.status_code == 200
+    return response
+
+
+def scalar(client, product_type, material, quantity, param1, param2):
+    body = {"product_type_name": product_type, "material_name": material, "quantity": quantity, "param1": param1, "param2": param2}
+    return client.post("/calculate_raw_material", json=body).json()["required_raw_material"]
+
+
+def test_cells_match_scalar_endpoint(client):
+    body = sweep(
+        client,
+        product_type_names=TYPES,
+        material_names=MATERIALS,
+        quantity={"start": 1, "stop": 5, "step": 2},
+        param1=[0.5, 1.3],
+        param2={"start": 0.1, "stop": 0.3, "step": 0.1},
+    ).json()
+    assert body["quantity"] == [1, 3, 5]
+    # значения диапазона — те, что ввели бы в форму калькулятора
+    assert body["param2"] == [0.1, 0.2, 0.3]
+    assert body["shape"] == [3, 3, 3, 2, 3]
+
+    axes = [body[name] for name in ("product_type_names", "material_names", "quantity", "param1", "param2")]
+    expected = [scalar(client, *cell) for cell in itertools.product(*axes)]
+    assert body["required_raw_material"] == expected
+    assert -1 in expected
+
+
+def test_halves_round_to_even(client):
+    # x.5 без потерь и коэффициента: как round() в скалярном расчёте
+    body = sweep(
+        client,
+        product_type_names=["Партия без коэффициента"],
+        material_names=["Партия без потерь"],
+        quantity=[1, 3, 5, 7],
+        param1=[0.5],
+        param2=[1.0],
+    ).json()
+    assert body["required_raw_material"] == [0, 2, 2, 4]
+
+
+def test_grid_over_max_cells_is_400(client, monkeypatch):
+    monkeypatch.setattr(config, "SWEEP_MAX_CELLS", 12)
+    body = {
+        "product_type_names": TYPES[:2],
+        "material_names": MATERIALS[:2],
+        "quantity": [1],
+        "param1": [1.0],
+        "param2": [1.0, 2.0, 3.0],
+    }
+    assert client.post("/calculate_raw_material/sweep", json=body).status_code == 200
+
+    # 16 ячеек; диапазон с крошечным шагом отклоняется до построения осей
+    for param2 in ([1.0, 2.0, 3.0, 4.0], {"start": 0.1, "stop": 1000.0, "step": 1e-9}):
+        response = client.post("/calculate_raw_material/sweep", json={**body, "param2": param2})
+        assert response.status_code == 400
+        assert str(config.SWEEP_MAX_CELLS) in response.json()["detail"]
+
+
+def test_stop_before_start_is_400(client):
+    body = {"quantity": {"start": 5, "stop": 1}, "param1": [1.0], "param2": [1.0]}
+    response = client.post("/calculate_raw_material/sweep", json=body)
+    assert response.status_code == 400
+    assert "quantity" in response.json()["detail"]
+
+
+def test_large_grid_is_streamed(client, monkeypatch):
+    body = {
+        "product_type_names": TYPES,
+        "material_names": MATERIALS,
+        "quantity": {"start": 1, "stop": 10},
+        "param1": {"start": 0.5, "stop": 2.5, "step": 0.5},
+        "param2": [0.7, 1.1, 2.3],
+    }
+    whole = sweep(client, **body)
+    assert whole.headers["content-length"] == str(len(whole.content))
+
+    # порции меньше строки param2 и не кратные ей: на склейке ничего не теряется
+    for chunk_cells in (2, 7):
+        monkeypatch.setattr(config, "SWEEP_CHUNK_CELLS", chunk_cells)
+        streamed = sweep(client, **body)
+        assert "content-length" not in streamed.headers
+        assert streamed.json() == whole.json()
@@ -0,0 +1,83 @@
+"""
+POST /workload: часы по цехам для портфеля заказов, цеха от самого
+загруженного; цех без сотрудников с работой всегда перегружен.
+"""
+import sqlite3
+
+import pytest
+
+from conftest import DB_PATH
+
+IDLE = "Цех без сотрудников"
+
+
+@pytest.fixture(scope="module")
+def products(client):
+    conn = sqlite3.connect(DB_PATH)
+    routes = {
+        "Комод нагрузки": [("Сборочный", 2.0), ("Покрасочный", 1.0)],
+        "Полка нагрузки": [("Сборочный", 0.5), (IDLE, 1.5)],
+        "Полка без маршрута": [],
+    }
+    ids = {}
+    with conn:
+        conn.execute("INSERT INTO Workshops (workshop_name, workshop_type, num_employees) VALUES (?, 'Сборка', 0)", (IDLE,))
+        for article, (name, route) in enumerate(routes.items(), 5_000_001):
+            ids[name] = conn.execute(
+                "INSERT INTO Products (product_name, article, min_partner_cost, product_type_name, main_material_name)"
+                " VALUES (?, ?, 100, 'Стол', 'Дуб')",
+                (name, article),
+            ).lastrowid
+            conn.executemany("INSERT INTO ProductWorkshops VALUES (?, ?, ?)", [(name, w, c) for w, c in route])
+    conn.close()
+    return ids
+
+
+def test_hours_are_summed_per_workshop(client, products):
+    response = client.post(
+        "/workload",
+        json={
+            "orders": [
+                {"product_id": products["Комод нагрузки"], "quantity": 3},
+                {"product_id": products["Полка нагрузки"], "quantity": 2},
+                {"product_id": products["Комод нагрузки"], "quantity": 1},
+                {"product_id": products["Полка без маршрута"], "quantity": 5},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    body = response.json()
+    loads = {w["workshop_name"]: w for w in body["workshops"]}
+    assert loads["Сборочный"]["total_hours"] == 2.0 * 4 + 0.5 * 2
+    assert loads["Покрасочный"]["total_hours"] == 4.0
+    assert loads[IDLE]["total_hours"] == 3.0
+    assert body["total_hours"] == 16.0
+    assert [w["rank"] for w in body["workshops"]] == [1, 2, 3]
+    # продукт без маршрута в часы не входит, но и не теряется молча
+    assert body["unresolved_products"] == [products["Полка без маршрута"]]
+    # без горизонта загрузка не считается
+    assert all(w["utilization"] is None and not w["overloaded"] for w in body["workshops"])
+
+
+def test_workshop_without_staff_is_overloaded(client, products):
+    body = client.post(
+        "/workload",
+        json={"orders": [{"product_id": products["Полка нагрузки"], "quantity": 1}], "horizon_hours": 100},
+    ).json()
+    loads = {w["workshop_name"]: w for w in body["workshops"]}
+    # в ответе — фактическая численность, часы делятся на одного
+    assert loads[IDLE]["num_employees"] == 0
+    assert loads[IDLE]["hours_per_employee"] == 1.5
+    assert loads[IDLE]["overloaded"] is True
+    assert loads["Сборочный"]["num_employees"] == 3
+    assert loads["Сборочный"]["overloaded"] is False
+    assert body["workshops"][0]["workshop_name"] == IDLE
+
+
+def test_unknown_products_are_404(client, products):
+    response = client.post(
+        "/workload",
+        json={"orders": [{"product_id": products["Комод нагрузки"], "quantity": 1}, {"product_id": 10**9, "quantity": 1}]},
+    )
+    assert response.status_code == 404
+    assert str(10**9) in response.json()["detail"]